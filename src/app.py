@@ -1,11 +1,20 @@
+import functools
 import logging.config
 import time
+from typing import Optional
 
 from cltl.mention_extraction.api import MentionExtractor
-from cltl.mention_extraction.default_extractor import DefaultMentionExtractor
-from cltl.nlp.api import NLP
-from cltl.nlp.spacy_nlp import SpacyNLP
+from cltl.mention_extraction.default_extractor import DefaultMentionExtractor, TextMentionDetector, \
+    TextPerspectiveDetector, ImagePerspectiveDetector, NewFaceMentionDetector, ObjectMentionDetector
+from cltl.mention_extraction.pipeline import DetectorPipeline
+from cltl.mention_extraction.salience import SalienceCache
+from cltl.nlp.api import NLP, ObjectType
+from cltl.nlp.cache import CachedNLP, NLPCache
+from cltl.nlp.pool import NLPPool, StopWordLanguageDetector
+from cltl.nlp.spacy_nlp import create_spacy_nlp
+from cltl_service.mention_extraction.response import ObjectResponseService
 from cltl_service.mention_extraction.service import MentionExtractionService
+from cltl_service.monitoring.tracing import Tracer
 
 logging.config.fileConfig('config/logging.config')
 
@@ -35,8 +44,52 @@ class NLPContainer(InfraContainer):
     @singleton
     def nlp(self) -> NLP:
         config = self.config_manager.get_config("cltl.nlp.spacy")
+        default_language = self.config_manager.get_config("cltl.language").get("language")
+        if "models" not in config:
+            return self._create_nlp(config.get('model'), default_language)
 
-        return SpacyNLP(config.get('model'))
+        models = {}
+        for language_model in config.get("models", multi=True):
+            language, model = language_model.split("=", 1)
+            models[language.strip()] = functools.partial(self._create_nlp, model.strip(), language.strip())
+
+        memory_budget = config.get_int("memory_budget_mb") * 1024 * 1024 if "memory_budget_mb" in config else None
+        max_models = config.get_int("max_models") if "max_models" in config else None
+        detect_language = "detect_language" in config and config.get_boolean("detect_language")
+        detector = StopWordLanguageDetector(models.keys()) if detect_language else None
+
+        return NLPPool(models, default_language, memory_budget, max_models, detector)
+
+    def _create_nlp(self, model: str, language: str) -> NLP:
+        config = self.config_manager.get_config("cltl.nlp.spacy")
+        parser = config.get_boolean("parser") if "parser" in config else True
+        nlp = create_spacy_nlp(
+            model, language, parser=parser,
+            tiered="tiered" in config and config.get_boolean("tiered"),
+            tiered_max_tokens=config.get_int("tiered_max_tokens") if "tiered_max_tokens" in config else 3,
+            chunked="chunked" in config and config.get_boolean("chunked"),
+            chunked_max_length=config.get_int("chunked_max_length") if "chunked_max_length" in config else 2000,
+            chunked_min_length=config.get_int("chunked_min_length") if "chunked_min_length" in config else 1000,
+            chunked_workers=config.get_int("chunked_workers") if "chunked_workers" in config else None,
+            chunked_processes="chunked_processes" not in config or config.get_boolean("chunked_processes"))
+
+        if self.nlp_cache is not None:
+            nlp = CachedNLP(nlp, self.nlp_cache)
+
+        return nlp
+
+    @property
+    def nlp_cache(self) -> Optional[NLPCache]:
+        # Not a singleton, as singletons can't be None; the cache is shared by the models of all languages
+        if not hasattr(self, "_nlp_cache"):
+            self._nlp_cache = None
+            if self.config_manager.has_config("cltl.nlp.cache"):
+                cache_config = self.config_manager.get_config("cltl.nlp.cache")
+                if cache_config.get_boolean("enabled"):
+                    max_size = cache_config.get_int("max_size_mb") if "max_size_mb" in cache_config else None
+                    self._nlp_cache = NLPCache(cache_config.get("path"), max_size * 1024 * 1024 if max_size else None)
+
+        return self._nlp_cache
 
     @property
     @singleton
@@ -51,6 +104,9 @@ class NLPContainer(InfraContainer):
     def stop(self):
         logger.info("Stop NLP service")
         self.nlp_service.stop()
+        self.nlp.close()
+        if self.nlp_cache is not None:
+            self.nlp_cache.close()
         super().stop()
 
 
@@ -58,13 +114,42 @@ class MentionExtractionContainer(InfraContainer):
     @property
     @singleton
     def mention_extractor(self) -> MentionExtractor:
-        return DefaultMentionExtractor()
+        # Each detector counts its own turns, utterances for text and frames for images
+        def salience():
+            return SalienceCache.from_config(self.config_manager, "cltl.mention_extraction.salience")
+
+        text_detector = DetectorPipeline.from_config(self.config_manager, "cltl.mention_extraction.pipeline.text",
+                                                     salience=salience(), annotation_types=TextMentionDetector.annotation_types)
+        face_detector = DetectorPipeline.from_config(self.config_manager, "cltl.mention_extraction.pipeline.face",
+                                                     salience=salience())
+        object_detector = DetectorPipeline.from_config(self.config_manager, "cltl.mention_extraction.pipeline.object",
+                                                       salience=salience(),
+                                                       default_types=[object_type.value for object_type in ObjectType])
+
+        tracer = self.mention_extraction_tracer
+
+        return DefaultMentionExtractor(text_detector if text_detector is not None else TextMentionDetector(salience()),
+                                       TextPerspectiveDetector(), ImagePerspectiveDetector(0.5),
+                                       face_detector if face_detector is not None else NewFaceMentionDetector(),
+                                       object_detector if object_detector is not None else ObjectMentionDetector(),
+                                       span=tracer.span if tracer else None)
+
+    @property
+    def mention_extraction_tracer(self) -> Optional[Tracer]:
+        # Not a singleton, as singletons can't be None
+        if not hasattr(self, "_mention_extraction_tracer"):
+            self._mention_extraction_tracer = Tracer.from_config(MentionExtractionService.__name__,
+                                                                 self.config_manager,
+                                                                 "cltl.mention_extraction.tracing")
+
+        return self._mention_extraction_tracer
 
     @property
     @singleton
     def mention_extraction_service(self) -> MentionExtractionService:
         return MentionExtractionService.from_config(self.mention_extractor,
-                                                    self.event_bus, self.resource_manager, self.config_manager)
+                                                    self.event_bus, self.resource_manager, self.config_manager,
+                                                    tracer=self.mention_extraction_tracer)
 
     def start(self):
         logger.info("Start Mention Extraction Service")
@@ -76,15 +161,34 @@ class MentionExtractionContainer(InfraContainer):
         self.mention_extraction_service.stop()
         super().stop()
 
-class ApplicationContainer(NLPContainer, MentionExtractionContainer):
-    logger.info("Initialized ApplicationContainer")
+class ObjectResponseContainer(InfraContainer):
+    @property
+    @singleton
+    def object_response_service(self) -> ObjectResponseService:
+        language = self.config_manager.get_config("cltl.language").get("language")
+
+        return ObjectResponseService.for_language(language, self.event_bus, self.resource_manager,
+                                                  self.config_manager)
 
     def start(self):
+        logger.info("Start Object Response Service")
         super().start()
+        self.object_response_service.start()
 
     def stop(self):
+        logger.info("Stop Object Response Service")
+        self.object_response_service.stop()
+        super().stop()
+
+class ApplicationContainer(NLPContainer, MentionExtractionContainer, ObjectResponseContainer):
+    logger.info("Initialized ApplicationContainer")
+
+    def start(self):
         super().start()
 
+    def stop(self):
+        super().stop()
+
     @property
     @singleton
     def event_bus(self):
@@ -1,7 +1,7 @@
 import abc
 import logging
 from dataclasses import dataclass, field
-from typing import List, Tuple
+from typing import List, Tuple, Optional, Dict
 
 from cltl.commons.discrete import UtteranceType
 from emissor.representation.scenario import Mention
@@ -9,6 +9,10 @@ from emissor.representation.scenario import Mention
 logger = logging.getLogger(__name__)
 
 
+# Groups of mentions with the scenario they belong to
+MentionBatch = List[Tuple[List[Mention], str]]
+
+
 @dataclass
 class Source:
     label: str
@@ -99,7 +103,25 @@ class ImagePerspective:
 
 
 class MentionExtractor(abc.ABC):
-    def extract_text_mentions(self, mentions: List[Mention], scenario_id: str) -> List[TextMention]:
+    def extract_text_mentions(self, mentions: List[Mention], scenario_id: str,
+                              index: Dict[str, Tuple[int, int]] = None) -> List[TextMention]:
+        """Extract mentions from the NLP annotations of a text signal.
+
+        Parameters
+        ----------
+        mentions : List[Mention]
+            The mentions with NLP annotations.
+        scenario_id : str
+            The identifier of the scenario.
+        index : Dict[str, Tuple[int, int]]
+            Optional index of the mentions by annotation type, mapping the type to the `[start, stop)`
+            range of mentions with that type.
+
+        Returns
+        -------
+        List[TextMention]
+            The extracted mentions.
+        """
         raise NotImplementedError()
 
     def extract_text_perspective(self, mentions: List[Mention], scenario_id: str) -> List[TextPerspective]:
@@ -112,4 +134,91 @@ class MentionExtractor(abc.ABC):
         raise NotImplementedError()
 
     def extract_face_perspective(self, mentions: List[Mention], scenario_id: str) -> List[ImagePerspective]:
-        raise NotImplementedError()
\ No newline at end of file
+        raise NotImplementedError()
+
+    def extract_text_mentions_batch(self, batch: MentionBatch,
+                                    indices: List[Optional[Dict[str, Tuple[int, int]]]] = None) -> List[List[TextMention]]:
+        """Extract mentions from multiple groups of mentions at once.
+
+        Groups are processed in order, such that the state kept per scenario evolves as if
+        :meth:`extract_text_mentions` was called for each group.
+
+        Parameters
+        ----------
+        batch : MentionBatch
+            Groups of mentions with the identifier of their scenario.
+        indices : List[Optional[Dict[str, Tuple[int, int]]]]
+            Optional index of the mentions of each group, see :meth:`extract_text_mentions`.
+
+        Returns
+        -------
+        List[List[TextMention]]
+            The extracted mentions for each group in the batch.
+        """
+        indices = indices if indices is not None else [None] * len(batch)
+
+        return [self.extract_text_mentions(mentions, scenario_id, index)
+                for (mentions, scenario_id), index in zip(batch, indices)]
+
+    def extract_text_perspective_batch(self, batch: MentionBatch) -> List[List[TextPerspective]]:
+        """See :meth:`extract_text_mentions_batch`."""
+        return [self.extract_text_perspective(mentions, scenario_id) for mentions, scenario_id in batch]
+
+    def extract_object_mentions_batch(self, batch: MentionBatch) -> List[List[ImageMention]]:
+        """See :meth:`extract_text_mentions_batch`."""
+        return [self.extract_object_mentions(mentions, scenario_id) for mentions, scenario_id in batch]
+
+    def extract_face_mentions_batch(self, batch: MentionBatch) -> List[List[ImageMention]]:
+        """See :meth:`extract_text_mentions_batch`."""
+        return [self.extract_face_mentions(mentions, scenario_id) for mentions, scenario_id in batch]
+
+    def extract_face_perspective_batch(self, batch: MentionBatch) -> List[List[ImagePerspective]]:
+        """See :meth:`extract_text_mentions_batch`."""
+        return [self.extract_face_perspective(mentions, scenario_id) for mentions, scenario_id in batch]
+
+    def clear_scenario(self, scenario_id: str) -> None:
+        """Release any state kept for the given scenario.
+
+        Parameters
+        ----------
+        scenario_id : str
+            The identifier of the scenario that was stopped or evicted.
+        """
+        pass
+
+    def get_scenario_state(self, scenario_id: str) -> Optional[dict]:
+        """Export the state kept for the given scenario.
+
+        Parameters
+        ----------
+        scenario_id : str
+            The identifier of the scenario.
+
+        Returns
+        -------
+        Optional[dict]
+            A JSON serializable representation of the scenario state, or None if there is no state.
+        """
+        return None
+
+    def set_scenario_state(self, scenario_id: str, state: dict) -> None:
+        """Restore the state for the given scenario as exported by :meth:`get_scenario_state`.
+
+        Parameters
+        ----------
+        scenario_id : str
+            The identifier of the scenario.
+        state : dict
+            The exported scenario state.
+        """
+        pass
+
+    def state_sizes(self) -> Dict[str, int]:
+        """Report the size of the state kept by the extractor, e.g. to monitor memory usage.
+
+        Returns
+        -------
+        Dict[str, int]
+            The number of entries of the state kept by the extractor by name.
+        """
+        return {}
@@ -1,7 +1,8 @@
 import abc
 import logging
+from contextlib import nullcontext
 from enum import Enum
-from typing import List
+from typing import List, Dict, Set, Any, Optional, Tuple, Iterable, Callable, ContextManager
 
 from cltl.combot.infra.time_util import timestamp_now
 from cltl.combot.event.emissor import ConversationalAgent
@@ -10,7 +11,8 @@ from emissor.representation.scenario import Mention, class_type, Annotation
 import cltl.nlp.api as nlp
 
 from cltl.mention_extraction.api import MentionExtractor, ImagePerspective, TextPerspective, Perspective, Source, \
-    TextMention, ImageMention, Entity
+    TextMention, ImageMention, Entity, MentionBatch
+from cltl.mention_extraction.salience import SalienceCache, salience_key
 
 logger = logging.getLogger(__name__)
 
@@ -20,6 +22,29 @@ _ACCEPTED_OBJECTS = {object_type.value.lower() for object_type in nlp.ObjectType
 
 _IMAGE_SOURCE = Source("front-camera", ["sensor"], "http://cltl.nl/leolani/inputs/front-camera")
 
+_ENTITY_ANNOTATIONS = (nlp.NamedEntity.__name__, nlp.Entity.__name__)
+_EXCLUDED_ENTITY_TYPES = frozenset((nlp.EntityType.SPEAKER, nlp.EntityType.HEARER))
+_EXCLUDED_ENTITY_LABELS = frozenset(entity_type.name.lower() for entity_type in _EXCLUDED_ENTITY_TYPES)
+
+
+def _no_span(name: str) -> ContextManager:
+    return nullcontext()
+
+
+def select_mentions(mentions: List[Mention], index: Any, annotation_types: Optional[Iterable[str]]) -> List[Mention]:
+    """Select the mentions with the given annotation types using an index of mention ranges by annotation type.
+
+    If there is no index or no annotation types are given, all mentions are returned.
+    """
+    if index is None or annotation_types is None:
+        return mentions
+
+    # Index received over the event bus may be deserialized as object instead of dict
+    index = index if isinstance(index, dict) else vars(index)
+    ranges = sorted(tuple(index[annotation_type]) for annotation_type in annotation_types if annotation_type in index)
+
+    return [mention for start, stop in ranges for mention in mentions[start:stop]]
+
 
 class MentionDetector(abc.ABC):
     """Detect mentions that contribute to knowledge.
@@ -27,31 +52,91 @@ class MentionDetector(abc.ABC):
     Select a subset of Mentions for further extraction, e.g. to prevent duplication or reduce
     the amount of information.
     """
+    # Annotation types of the mentions considered by the detector, None for all mentions
+    annotation_types: Optional[Tuple[str, ...]] = None
+
     def filter_mentions(self, mentions: List[Mention], scenario_id: str) -> List[Mention]:
         return mentions
 
+    def filter_batch(self, batch: MentionBatch) -> List[List[Mention]]:
+        """Filter multiple groups of mentions in order, with the same state semantics as :meth:`filter_mentions`."""
+        return [self.filter_mentions(mentions, scenario_id) for mentions, scenario_id in batch]
+
+    def clear_scenario(self, scenario_id: str) -> None:
+        """Release the state kept for the given scenario, if any."""
+        pass
+
+    def get_state(self, scenario_id: str) -> Any:
+        """Export the JSON serializable state kept for the given scenario, if any."""
+        return None
+
+    def set_state(self, scenario_id: str, state: Any) -> None:
+        """Restore the state for the given scenario as exported by :meth:`get_state`."""
+        pass
+
+    def state_size(self) -> int:
+        """The number of entries of the state kept by the detector across all scenarios."""
+        return 0
+
 
 class TextMentionDetector(MentionDetector):
+    annotation_types = _ENTITY_ANNOTATIONS
+
+    def __init__(self, salience: SalienceCache = None):
+        """
+        Parameters
+        ----------
+        salience : SalienceCache
+            If provided, repeated mentions of the same entity in a scenario are suppressed
+            unless they are salient again.
+        """
+        self._salience = salience
+
     def filter_mentions(self, mentions: List[Mention], scenario_id: str) -> List[Mention]:
+        if self._salience:
+            self._salience.next_turn(scenario_id)
+
         filtered = []
         for mention in mentions:
-            annotations = [annotation for annotation in mention.annotations if self._is_entity(annotation)]
+            annotations = [annotation for annotation in mention.annotations
+                           if self._is_entity(annotation) and self._is_salient(annotation, scenario_id)]
             if annotations:
                 filtered.append(Mention(mention.id, mention.segment, annotations))
 
         return filtered
 
+    def _is_salient(self, annotation, scenario_id):
+        if not self._salience:
+            return True
+
+        confidence = getattr(annotation.value, "confidence", 1.0)
+
+        return self._salience.is_salient(scenario_id, salience_key(annotation.value), confidence)
+
+    def clear_scenario(self, scenario_id: str) -> None:
+        if self._salience:
+            self._salience.clear_scenario(scenario_id)
+
+    def get_state(self, scenario_id: str) -> Any:
+        return self._salience.get_state(scenario_id) if self._salience else None
+
+    def set_state(self, scenario_id: str, state: Any) -> None:
+        if self._salience:
+            self._salience.set_state(scenario_id, state)
+
+    def state_size(self) -> int:
+        return self._salience.size() if self._salience else 0
+
     def _is_entity(self, annotation):
         if annotation.type == nlp.NamedEntity.__name__:
             return True
 
         if annotation.type == nlp.Entity.__name__:
-            if (isinstance(annotation.value.type, nlp.EntityType)
-                    and annotation.value.type not in [nlp.EntityType.SPEAKER, nlp.EntityType.HEARER]):
-                return True
-            if (isinstance(annotation.value.type, str)
-                    and annotation.value.type not in [nlp.EntityType.SPEAKER.name.lower(), nlp.EntityType.HEARER.name.lower()]):
-                return True
+            entity_type = annotation.value.type
+            if isinstance(entity_type, nlp.EntityType):
+                return entity_type not in _EXCLUDED_ENTITY_TYPES
+            if isinstance(entity_type, str):
+                return entity_type not in _EXCLUDED_ENTITY_LABELS
 
         return False
 
@@ -81,38 +166,91 @@ class ImagePerspectiveDetector(MentionDetector):
 
 class NewFaceMentionDetector(MentionDetector):
     def __init__(self):
-        self._scenario_id = None
-        self._faces = set()
+        self._faces: Dict[str, Set[str]] = dict()
 
     def filter_mentions(self, mentions: List[Mention], scenario_id: str) -> List[Mention]:
-        if scenario_id != self._scenario_id:
-            self._scenario_id = scenario_id
-            self._faces = set()
+        return self._filter_new(mentions, self._faces.setdefault(scenario_id, set()))
 
+    def filter_batch(self, batch: MentionBatch) -> List[List[Mention]]:
+        faces_by_scenario = dict()
+        filtered = []
+        for mentions, scenario_id in batch:
+            faces = faces_by_scenario.get(scenario_id)
+            if faces is None:
+                faces = faces_by_scenario[scenario_id] = self._faces.setdefault(scenario_id, set())
+            filtered.append(self._filter_new(mentions, faces))
+
+        return filtered
+
+    @staticmethod
+    def _filter_new(mentions: List[Mention], faces: Set[str]) -> List[Mention]:
         new_face_mentions = [mention for mention in mentions
                              if (mention.annotations
                                  and mention.annotations[0].value is not None
-                                 and mention.annotations[0].value not in self._faces)]
+                                 and mention.annotations[0].value not in faces)]
 
-        self._faces = self._faces | {mention.annotations[0].value for mention in new_face_mentions}
+        faces.update(mention.annotations[0].value for mention in new_face_mentions)
 
         return new_face_mentions
 
+    def clear_scenario(self, scenario_id: str) -> None:
+        self._faces.pop(scenario_id, None)
+
+    def get_state(self, scenario_id: str) -> Any:
+        return sorted(self._faces[scenario_id]) if scenario_id in self._faces else None
+
+    def set_state(self, scenario_id: str, state: Any) -> None:
+        if state is not None:
+            self._faces[scenario_id] = set(state)
+
+    def state_size(self) -> int:
+        return sum(len(faces) for faces in self._faces.values())
+
 
 class ObjectMentionDetector(MentionDetector):
     def __init__(self):
-        self._previous = set()
+        self._previous: Dict[str, Set[str]] = dict()
 
     def filter_mentions(self, mentions: List[Mention], scenario_id: str) -> List[Mention]:
+        observed, self._previous[scenario_id] = self._filter_observed(mentions, self._previous.get(scenario_id, set()))
+
+        return observed
+
+    def filter_batch(self, batch: MentionBatch) -> List[List[Mention]]:
+        previous = dict()
+        filtered = []
+        for mentions, scenario_id in batch:
+            scenario_previous = previous[scenario_id] if scenario_id in previous \
+                else self._previous.get(scenario_id, set())
+            observed, previous[scenario_id] = self._filter_observed(mentions, scenario_previous)
+            filtered.append(observed)
+
+        self._previous.update(previous)
+
+        return filtered
+
+    @staticmethod
+    def _filter_observed(mentions: List[Mention], previous: Set[str]) -> Tuple[List[Mention], Set[str]]:
         observed = [mention for mention in mentions
-                if (mention.annotations
-                    and mention.annotations[0].value is not None
-                    and mention.annotations[0].value.label.lower() in _ACCEPTED_OBJECTS
-                    and mention.annotations[0].value.label.lower() not in self._previous)]
+                    if (mention.annotations
+                        and mention.annotations[0].value is not None
+                        and mention.annotations[0].value.label.lower() in _ACCEPTED_OBJECTS
+                        and mention.annotations[0].value.label.lower() not in previous)]
 
-        self._previous = set(mention.annotations[0].value.label.lower() for mention in mentions)
+        return observed, set(mention.annotations[0].value.label.lower() for mention in mentions)
 
-        return observed
+    def clear_scenario(self, scenario_id: str) -> None:
+        self._previous.pop(scenario_id, None)
+
+    def get_state(self, scenario_id: str) -> Any:
+        return sorted(self._previous[scenario_id]) if scenario_id in self._previous else None
+
+    def set_state(self, scenario_id: str, state: Any) -> None:
+        if state is not None:
+            self._previous[scenario_id] = set(state)
+
+    def state_size(self) -> int:
+        return sum(len(previous) for previous in self._previous.values())
 
 
 class DefaultMentionExtractor(MentionExtractor):
@@ -120,34 +258,104 @@ class DefaultMentionExtractor(MentionExtractor):
                  text_perspective_detector: TextPerspectiveDetector,
                  image_perspective_detector: ImagePerspectiveDetector,
                  face_detector: MentionDetector,
-                 object_detector: MentionDetector):
+                 object_detector: MentionDetector,
+                 span: Callable[[str], ContextManager] = None):
+        """
+        If provided, `span` is called with the name of the extraction stage ("filtering" or "creation")
+        and used as context manager around the stage, e.g. to record trace spans.
+        """
         self._text_detector = text_detector
         self._text_perspective_detector = text_perspective_detector
         self._image_perspective_detector = image_perspective_detector
         self._face_detector = face_detector
         self._object_detector = object_detector
+        self._span = span if span else _no_span
+
+    def extract_text_mentions(self, mentions: List[Mention], scenario_id: str,
+                              index: Dict[str, Tuple[int, int]] = None) -> List[TextMention]:
+        mentions = select_mentions(mentions, index, self._text_detector.annotation_types)
 
-    def extract_text_mentions(self, mentions: List[Mention], scenario_id: str) -> List[TextMention]:
-        return [self.create_text_mention(mention, scenario_id)
-                for mention in self._text_detector.filter_mentions(mentions, scenario_id)]
+        return self._extract(self._text_detector, self.create_text_mention, mentions, scenario_id)
 
     def extract_text_perspective(self, mentions: List[Mention], scenario_id: str) -> List[TextPerspective]:
-        return [self.create_text_perspective(mention, scenario_id)
-                for mention in self._text_perspective_detector.filter_mentions(mentions, scenario_id)]
+        return self._extract(self._text_perspective_detector, self.create_text_perspective, mentions, scenario_id)
 
     def extract_object_mentions(self, mentions: List[Mention], scenario_id: str) -> List[ImageMention]:
-        return [self.create_object_mention(mention, scenario_id)
-                for mention in self._object_detector.filter_mentions(mentions, scenario_id)]
+        return self._extract(self._object_detector, self.create_object_mention, mentions, scenario_id)
 
     def extract_face_mentions(self, mentions: List[Mention], scenario_id: str) -> List[ImageMention]:
-        return [self.create_face_mention(mention, scenario_id)
-                for mention in self._face_detector.filter_mentions(mentions, scenario_id)]
+        return self._extract(self._face_detector, self.create_face_mention, mentions, scenario_id)
 
     def extract_face_perspective(self, mentions: List[Mention], scenario_id: str) -> List[ImagePerspective]:
-        return [self.create_image_perspective(mention, scenario_id)
-                for mention in self._image_perspective_detector.filter_mentions(mentions, scenario_id)]
+        return self._extract(self._image_perspective_detector, self.create_image_perspective, mentions, scenario_id)
+
+    def extract_text_mentions_batch(self, batch: MentionBatch,
+                                    indices: List[Optional[Dict[str, Tuple[int, int]]]] = None) -> List[List[TextMention]]:
+        if indices is not None:
+            batch = [(select_mentions(mentions, index, self._text_detector.annotation_types), scenario_id)
+                     for (mentions, scenario_id), index in zip(batch, indices)]
+
+        return self._extract_batch(self._text_detector, self.create_text_mention, batch)
+
+    def extract_text_perspective_batch(self, batch: MentionBatch) -> List[List[TextPerspective]]:
+        return self._extract_batch(self._text_perspective_detector, self.create_text_perspective, batch)
+
+    def extract_object_mentions_batch(self, batch: MentionBatch) -> List[List[ImageMention]]:
+        return self._extract_batch(self._object_detector, self.create_object_mention, batch)
+
+    def extract_face_mentions_batch(self, batch: MentionBatch) -> List[List[ImageMention]]:
+        return self._extract_batch(self._face_detector, self.create_face_mention, batch)
+
+    def extract_face_perspective_batch(self, batch: MentionBatch) -> List[List[ImagePerspective]]:
+        return self._extract_batch(self._image_perspective_detector, self.create_image_perspective, batch)
+
+    def _extract(self, detector: MentionDetector, create, mentions: List[Mention], scenario_id: str) -> list:
+        with self._span("filtering"):
+            filtered = detector.filter_mentions(mentions, scenario_id)
+
+        with self._span("creation"):
+            return [create(mention, scenario_id) for mention in filtered]
+
+    def _extract_batch(self, detector: MentionDetector, create, batch: MentionBatch) -> list:
+        timestamp = timestamp_now()
+        with self._span("filtering"):
+            filtered = detector.filter_batch(batch)
+
+        with self._span("creation"):
+            return [[create(mention, scenario_id, timestamp) for mention in mentions]
+                    for mentions, (_, scenario_id) in zip(filtered, batch)]
+
+    @property
+    def _detectors(self) -> Dict[str, MentionDetector]:
+        return {
+            "text": self._text_detector,
+            "text_perspective": self._text_perspective_detector,
+            "image_perspective": self._image_perspective_detector,
+            "face": self._face_detector,
+            "object": self._object_detector
+        }
+
+    def clear_scenario(self, scenario_id: str) -> None:
+        for detector in self._detectors.values():
+            detector.clear_scenario(scenario_id)
+
+    def get_scenario_state(self, scenario_id: str) -> Optional[dict]:
+        state = {name: detector.get_state(scenario_id) for name, detector in self._detectors.items()}
+
+        return {name: detector_state for name, detector_state in state.items() if detector_state is not None}
+
+    def set_scenario_state(self, scenario_id: str, state: dict) -> None:
+        # State received over the event bus may be deserialized as object instead of dict
+        state = state if isinstance(state, dict) else vars(state)
+        for name, detector in self._detectors.items():
+            detector.set_state(scenario_id, state.get(name))
+
+    def state_sizes(self) -> Dict[str, int]:
+        return {name: detector.state_size() for name, detector in self._detectors.items()}
+
+    def create_face_mention(self, mention: Mention, scenario_id: str, timestamp: int = None):
+        timestamp = timestamp if timestamp is not None else timestamp_now()
 
-    def create_face_mention(self, mention: Mention, scenario_id: str):
         image_id = mention.id
         image_path = mention.id
 
@@ -158,9 +366,11 @@ class DefaultMentionExtractor(MentionExtractor):
 
         return ImageMention(image_id, mention_id, _IMAGE_SOURCE, image_path, bounds,
                             Entity(face_id, ["face"], face_id, None), {},
-                            confidence, scenario_id, timestamp_now())
+                            confidence, scenario_id, timestamp)
+
+    def create_object_mention(self, mention: Mention, scenario_id: str, timestamp: int = None):
+        timestamp = timestamp if timestamp is not None else timestamp_now()
 
-    def create_object_mention(self, mention: Mention, scenario_id: str):
         image_id = mention.id
         image_path = mention.id
 
@@ -172,9 +382,11 @@ class DefaultMentionExtractor(MentionExtractor):
 
         return ImageMention(image_id, mention_id, _IMAGE_SOURCE, image_path, bounds,
                             Entity(object_label, [object_label], None, None), {},
-                            confidence, scenario_id, timestamp_now())
+                            confidence, scenario_id, timestamp)
+
+    def create_text_mention(self, mention: Mention, scenario_id: str, timestamp: int = None):
+        timestamp = timestamp if timestamp is not None else timestamp_now()
 
-    def create_text_mention(self, mention: Mention, scenario_id: str):
         author = self._get_speaker()
 
         utterance = ""
@@ -187,9 +399,11 @@ class DefaultMentionExtractor(MentionExtractor):
 
         return TextMention(scenario_id, signal_id, author, utterance, f"{segment.start} - {segment.stop}",
                            Entity(entity_text, [entity_type], None, None), {},
-                           confidence, scenario_id, timestamp_now())
+                           confidence, scenario_id, timestamp)
+
+    def create_text_perspective(self, mention, scenario_id, timestamp: int = None):
+        timestamp = timestamp if timestamp is not None else timestamp_now()
 
-    def create_text_perspective(self, mention, scenario_id):
         author = self._get_speaker()
 
         utterance = ""
@@ -200,9 +414,11 @@ class DefaultMentionExtractor(MentionExtractor):
         confidence = mention.annotations[0].value.confidence
 
         return TextPerspective(scenario_id, signal_id, author, utterance, f"{segment.start} - {segment.stop}",
-                               author, Perspective(perspective, confidence), scenario_id, timestamp_now())
+                               author, Perspective(perspective, confidence), scenario_id, timestamp)
+
+    def create_image_perspective(self, mention, scenario_id, timestamp: int = None):
+        timestamp = timestamp if timestamp is not None else timestamp_now()
 
-    def create_image_perspective(self, mention, scenario_id):
         # TODO
         image_id = mention.id
         image_path = mention.id
@@ -221,7 +437,7 @@ class DefaultMentionExtractor(MentionExtractor):
         confidence = primary_emotion.confidence
 
         return ImagePerspective(image_id, mention_id, _IMAGE_SOURCE, image_path, bounds,
-                                speaker, Perspective(perspective, confidence), scenario_id, timestamp_now())
+                                speaker, Perspective(perspective, confidence), scenario_id, timestamp)
 
     def _get_speaker(self):
         return Entity(ConversationalAgent.SPEAKER.name, [class_type(ConversationalAgent)], None, None)
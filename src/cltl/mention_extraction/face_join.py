@@ -0,0 +1,151 @@
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import asdict, replace
+from typing import Any, Dict, Hashable, List, Optional, Union
+
+from emissor.representation.scenario import Mention
+
+from cltl.mention_extraction.api import ImageMention, ImagePerspective
+
+logger = logging.getLogger(__name__)
+
+
+KEY_MENTION = "mention"
+KEY_IMAGE = "image"
+
+_IDENTITY = 0
+_PERSPECTIVE = 1
+
+# Marks a side of the join that arrived without a result, e.g. a face that was already known
+_FILTERED = object()
+
+
+FaceRecord = Union[ImageMention, ImagePerspective]
+
+
+def face_key(mention: Mention, key: str = KEY_MENTION) -> Hashable:
+    """Key of a face in a camera frame, the mention id or the image id and the bounds of the face."""
+    if key == KEY_MENTION:
+        return mention.id
+
+    segment = mention.segment[0]
+
+    return segment.container_id, tuple(segment.bounds)
+
+
+class _PendingFace:
+    def __init__(self, scenario_id: str, deadline: float):
+        self.scenario_id = scenario_id
+        self.deadline = deadline
+        self.sides: List[Any] = [None, None]
+
+    @property
+    def complete(self) -> bool:
+        return all(side is not None for side in self.sides)
+
+
+class FaceJoin:
+    """
+    Joins the face identity and the face emotion extracted for the same face in a camera frame.
+
+    Faces are matched by the id of the input mention or, with `key` set to `image`, by the image id and the
+    bounds of the face. When both the identity and the emotion of a face are available, a single
+    :class:`ImageMention` of the face identity with the dominant emotion as `perspective` is emitted. If only
+    one of them passed the detectors, it is emitted unchanged as soon as the event of the other side arrived,
+    or after `window` seconds. At most `max_pending` faces are buffered, the oldest faces are emitted first
+    when the buffer is full.
+
+    The join is not thread-safe.
+    """
+    def __init__(self, window: float = 0.5, max_pending: int = 256, key: str = KEY_MENTION):
+        if key not in (KEY_MENTION, KEY_IMAGE):
+            raise ValueError(f"Unsupported key {key}, expected one of {KEY_MENTION}, {KEY_IMAGE}")
+
+        self._window = window
+        self._max_pending = max_pending
+        self._key = key
+        self._pending: Dict[Hashable, _PendingFace] = OrderedDict()
+
+    @property
+    def window(self) -> float:
+        return self._window
+
+    def __len__(self):
+        return len(self._pending)
+
+    def add_identities(self, mentions: List[Mention], identities: List[ImageMention], scenario_id: str,
+                       now: float = None) -> List[FaceRecord]:
+        """
+        Add the face mentions of a face identity event and the :class:`ImageMention` extracted from them.
+
+        Returns the face records that are complete.
+        """
+        return self._add(_IDENTITY, mentions, identities, scenario_id, now)
+
+    def add_perspectives(self, mentions: List[Mention], perspectives: List[ImagePerspective], scenario_id: str,
+                         now: float = None) -> List[FaceRecord]:
+        """
+        Add the face mentions of a face emotion event and the :class:`ImagePerspective` extracted from them.
+
+        Returns the face records that are complete.
+        """
+        return self._add(_PERSPECTIVE, mentions, perspectives, scenario_id, now)
+
+    def expire(self, now: float = None) -> List[FaceRecord]:
+        """Emit the faces that are buffered for longer than the window."""
+        now = now if now is not None else time.monotonic()
+
+        expired = [key for key, pending in self._pending.items() if pending.deadline <= now]
+
+        return self._emit(expired)
+
+    def flush(self, scenario_id: str = None) -> List[FaceRecord]:
+        """Emit all buffered faces, or the faces of a scenario."""
+        keys = [key for key, pending in self._pending.items()
+                if scenario_id is None or pending.scenario_id == scenario_id]
+
+        return self._emit(keys)
+
+    def _add(self, side: int, mentions: List[Mention], results: List[FaceRecord], scenario_id: str,
+             now: Optional[float]) -> List[FaceRecord]:
+        now = now if now is not None else time.monotonic()
+        results_by_id = {result.detection: result for result in results}
+
+        complete = []
+        for mention in mentions:
+            key = face_key(mention, self._key)
+            pending = self._pending.get(key)
+            if not pending:
+                pending = self._pending[key] = _PendingFace(scenario_id, now + self._window)
+            pending.sides[side] = results_by_id.get(mention.id, _FILTERED)
+            if pending.complete and key not in complete:
+                complete.append(key)
+
+        records = self._emit(complete)
+
+        overflow = len(self._pending) - self._max_pending
+        if overflow > 0:
+            logger.debug("Face join buffer full, emit %s faces", overflow)
+            records += self._emit(list(self._pending.keys())[:overflow])
+
+        return records
+
+    def _emit(self, keys: List[Hashable]) -> List[FaceRecord]:
+        records = []
+        for key in keys:
+            pending = self._pending.pop(key)
+            identity, perspective = (side if side is not _FILTERED else None for side in pending.sides)
+            record = _combine(identity, perspective)
+            if record:
+                records.append(record)
+
+        return records
+
+
+def _combine(identity: Optional[ImageMention], perspective: Optional[ImagePerspective]) -> Optional[FaceRecord]:
+    if identity is None or perspective is None:
+        return identity if identity is not None else perspective
+
+    return replace(identity, perspective=asdict(perspective.perspective),
+                   timestamp=max(identity.timestamp, perspective.timestamp))
@@ -0,0 +1,368 @@
+import hashlib
+import logging
+from enum import Enum
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Set
+
+from emissor.representation.scenario import Mention
+
+from cltl.combot.infra.config import ConfigurationManager
+from cltl.mention_extraction.api import MentionBatch
+from cltl.mention_extraction.default_extractor import MentionDetector
+from cltl.mention_extraction.salience import SalienceCache, salience_key
+
+logger = logging.getLogger(__name__)
+
+
+STAGE_THRESHOLD = "threshold"
+STAGE_TYPES = "types"
+STAGE_NOVELTY = "novelty"
+STAGE_SAMPLING = "sampling"
+STAGE_SALIENCE = "salience"
+
+NOVELTY_SCENARIO = "scenario"
+NOVELTY_PREVIOUS = "previous"
+
+
+def value_label(value: Any) -> Optional[str]:
+    """Lower case label of an annotation value, e.g. the object label, entity type or emotion type."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return value.lower()
+
+    label = getattr(value, "label", None) or getattr(value, "type", None)
+    if isinstance(label, Enum):
+        label = label.name
+
+    return str(label).lower() if label is not None else None
+
+
+def _value(mention: Mention) -> Any:
+    return mention.annotations[0].value if mention.annotations else None
+
+
+class Stage:
+    """
+    Stage of a :class:`DetectorPipeline` that decides for a single mention if it is passed on.
+
+    :meth:`begin` and :meth:`end` are called before and after the mentions of an event are passed through
+    the pipeline, :meth:`begin` receives all mentions of the event, including those rejected by earlier stages.
+    Stages that keep state per scenario implement the state methods of :class:`MentionDetector`.
+    """
+    name: str = None
+
+    def begin(self, scenario_id: str, mentions: List[Mention]) -> None:
+        pass
+
+    def accept(self, mention: Mention, scenario_id: str) -> bool:
+        raise NotImplementedError()
+
+    def end(self, scenario_id: str) -> None:
+        pass
+
+    def clear_scenario(self, scenario_id: str) -> None:
+        pass
+
+    def get_state(self, scenario_id: str) -> Any:
+        return None
+
+    def set_state(self, scenario_id: str, state: Any) -> None:
+        pass
+
+    def state_size(self) -> int:
+        return 0
+
+
+class ThresholdStage(Stage):
+    """Accepts mentions with an annotation with at least the `threshold` confidence, 1.0 if not provided."""
+    name = STAGE_THRESHOLD
+
+    def __init__(self, threshold: float):
+        self._threshold = threshold
+
+    def accept(self, mention: Mention, scenario_id: str) -> bool:
+        return any(getattr(annotation.value, "confidence", 1.0) >= self._threshold
+                   for annotation in mention.annotations if annotation.value is not None)
+
+
+class TypeStage(Stage):
+    """
+    Accepts mentions by the label of the value of their first annotation, see :func:`value_label`.
+
+    If `include` is provided only the included labels are accepted, labels in `exclude` are rejected.
+    """
+    name = STAGE_TYPES
+
+    def __init__(self, include: Iterable[str] = None, exclude: Iterable[str] = ()):
+        self._include = frozenset(label.lower() for label in include) if include is not None else None
+        self._exclude = frozenset(label.lower() for label in exclude)
+
+    def accept(self, mention: Mention, scenario_id: str) -> bool:
+        label = value_label(_value(mention))
+
+        return (label is not None
+                and (self._include is None or label in self._include)
+                and label not in self._exclude)
+
+
+class NoveltyStage(Stage):
+    """
+    Accepts mentions of entities that were not mentioned before.
+
+    Entities are identified by the value of the first annotation if it is a string, e.g. a face id, and by its
+    label otherwise. With mode `scenario` an entity is accepted once per scenario, with mode `previous`
+    entities are accepted if they were not mentioned in the previous event of the scenario, e.g. the previous
+    camera frame. In mode `previous` all entities of the event are remembered, also if their mentions were
+    rejected by an earlier stage of the pipeline, as the :class:`ObjectMentionDetector` does.
+    """
+    name = STAGE_NOVELTY
+
+    def __init__(self, mode: str = NOVELTY_SCENARIO):
+        if mode not in (NOVELTY_SCENARIO, NOVELTY_PREVIOUS):
+            raise ValueError(f"Unsupported novelty mode {mode}, expected one of {NOVELTY_SCENARIO}, {NOVELTY_PREVIOUS}")
+
+        self._previous_only = mode == NOVELTY_PREVIOUS
+        self._seen: Dict[str, Set[Hashable]] = dict()
+        self._current: Set[Hashable] = set()
+
+    def begin(self, scenario_id: str, mentions: List[Mention]) -> None:
+        if self._previous_only:
+            self._current = {key for key in map(self._key, mentions) if key is not None}
+
+    def accept(self, mention: Mention, scenario_id: str) -> bool:
+        key = self._key(mention)
+        if key is None:
+            return False
+
+        if self._previous_only:
+            return key not in self._seen.get(scenario_id, ())
+
+        seen = self._seen.setdefault(scenario_id, set())
+        if key in seen:
+            return False
+        seen.add(key)
+
+        return True
+
+    def end(self, scenario_id: str) -> None:
+        if self._previous_only:
+            self._seen[scenario_id] = self._current
+            self._current = set()
+
+    @staticmethod
+    def _key(mention: Mention) -> Optional[Hashable]:
+        value = _value(mention)
+
+        return value if isinstance(value, str) else value_label(value)
+
+    def clear_scenario(self, scenario_id: str) -> None:
+        self._seen.pop(scenario_id, None)
+
+    def get_state(self, scenario_id: str) -> Any:
+        return sorted(self._seen[scenario_id]) if scenario_id in self._seen else None
+
+    def set_state(self, scenario_id: str, state: Any) -> None:
+        if state is not None:
+            self._seen[scenario_id] = set(state)
+
+    def state_size(self) -> int:
+        return sum(len(seen) for seen in self._seen.values())
+
+
+class SamplingStage(Stage):
+    """Accepts a share of `sample_rate` of the mentions, sampled deterministically by mention id."""
+    name = STAGE_SAMPLING
+
+    def __init__(self, sample_rate: float):
+        self._sample_rate = sample_rate
+
+    def accept(self, mention: Mention, scenario_id: str) -> bool:
+        if self._sample_rate >= 1:
+            return True
+
+        digest = hashlib.sha1(str(mention.id).encode("utf-8")).digest()
+
+        return int.from_bytes(digest[:8], "big") / 2 ** 64 < self._sample_rate
+
+
+class SalienceStage(Stage):
+    """Accepts mentions of entities that are salient in the scenario, see :class:`SalienceCache`."""
+    name = STAGE_SALIENCE
+
+    def __init__(self, salience: SalienceCache):
+        self._salience = salience
+
+    def begin(self, scenario_id: str, mentions: List[Mention]) -> None:
+        self._salience.next_turn(scenario_id)
+
+    def accept(self, mention: Mention, scenario_id: str) -> bool:
+        value = _value(mention)
+        if value is None:
+            return False
+
+        return self._salience.is_salient(scenario_id, salience_key(value), getattr(value, "confidence", 1.0))
+
+    def clear_scenario(self, scenario_id: str) -> None:
+        self._salience.clear_scenario(scenario_id)
+
+    def get_state(self, scenario_id: str) -> Any:
+        return self._salience.get_state(scenario_id)
+
+    def set_state(self, scenario_id: str, state: Any) -> None:
+        self._salience.set_state(scenario_id, state)
+
+    def state_size(self) -> int:
+        return self._salience.size()
+
+
+class DetectorPipeline(MentionDetector):
+    """
+    MentionDetector composed of a chain of stages that are applied in a single pass over the mentions.
+
+    Each mention is passed through the stages in order until a stage rejects it, mentions accepted by all
+    stages are returned unchanged. The number of mentions dropped by each stage is counted and logged every
+    `report_interval` events. The state of stages is exported and restored by stage name.
+    """
+    @classmethod
+    def from_config(cls, config_manager: ConfigurationManager, config_name: str, salience: SalienceCache = None,
+                    default_types: Iterable[str] = None,
+                    annotation_types: Iterable[str] = None) -> Optional["DetectorPipeline"]:
+        """
+        Create the pipeline if it is enabled in the configuration.
+
+        The `stages` option lists the stages in order, the stages are configured by the options `threshold`,
+        `types` and `exclude_types`, `novelty` (the mode) and `sample_rate`. The `salience` stage requires a
+        `salience` cache. If `types` is not configured, `default_types` are accepted by the types stage.
+        """
+        if not config_manager.has_config(config_name):
+            return None
+
+        config = config_manager.get_config(config_name)
+        if "enabled" in config and not config.get_boolean("enabled"):
+            return None
+
+        stages = []
+        for stage in config.get("stages", multi=True):
+            if stage == STAGE_THRESHOLD:
+                stages.append(ThresholdStage(config.get_float("threshold")))
+            elif stage == STAGE_TYPES:
+                include = config.get("types", multi=True) if "types" in config else default_types
+                exclude = config.get("exclude_types", multi=True) if "exclude_types" in config else ()
+                stages.append(TypeStage(include, exclude))
+            elif stage == STAGE_NOVELTY:
+                stages.append(NoveltyStage(config.get("novelty") if "novelty" in config else NOVELTY_SCENARIO))
+            elif stage == STAGE_SAMPLING:
+                stages.append(SamplingStage(config.get_float("sample_rate")))
+            elif stage == STAGE_SALIENCE:
+                if not salience:
+                    raise ValueError(f"Salience stage in {config_name} requires salience to be enabled")
+                stages.append(SalienceStage(salience))
+            else:
+                raise ValueError(f"Unsupported stage {stage} in {config_name}")
+
+        if "annotation_types" in config:
+            annotation_types = config.get("annotation_types", multi=True)
+
+        return cls(stages, annotation_types, name=config_name)
+
+    def __init__(self, stages: List[Stage], annotation_types: Iterable[str] = None, name: str = None,
+                 report_interval: int = 1000):
+        """
+        Parameters
+        ----------
+        stages : List[Stage]
+            The stages in the order they are applied, stage names must be unique.
+        annotation_types : Iterable[str]
+            Annotation types of the mentions considered by the detector, all mentions if not set.
+        name : str
+            Name of the pipeline used in log messages.
+        report_interval : int
+            Number of events after which the counters are logged.
+        """
+        names = [stage.name for stage in stages]
+        if len(set(names)) != len(names):
+            raise ValueError(f"Stage names must be unique: {names}")
+
+        self._stages = list(stages)
+        self.annotation_types = tuple(annotation_types) if annotation_types is not None else None
+        self._name = name if name else self.__class__.__name__
+        self._report_interval = report_interval
+
+        self._events = 0
+        self._mentions = 0
+        self._accepted = 0
+        self._dropped = [0] * len(self._stages)
+
+    def filter_mentions(self, mentions: List[Mention], scenario_id: str) -> List[Mention]:
+        accepted = self._filter(mentions, scenario_id, self._stages, self._dropped)
+        self._count(1, len(mentions), len(accepted))
+
+        return accepted
+
+    def filter_batch(self, batch: MentionBatch) -> List[List[Mention]]:
+        stages = self._stages
+        dropped = self._dropped
+
+        filtered = [self._filter(mentions, scenario_id, stages, dropped) for mentions, scenario_id in batch]
+        self._count(len(batch), sum(len(mentions) for mentions, _ in batch),
+                    sum(len(mentions) for mentions in filtered))
+
+        return filtered
+
+    @staticmethod
+    def _filter(mentions: List[Mention], scenario_id: str, stages: List[Stage], dropped: List[int]) -> List[Mention]:
+        for stage in stages:
+            stage.begin(scenario_id, mentions)
+
+        accepted = []
+        for mention in mentions:
+            for idx, stage in enumerate(stages):
+                if not stage.accept(mention, scenario_id):
+                    dropped[idx] += 1
+                    break
+            else:
+                accepted.append(mention)
+
+        for stage in stages:
+            stage.end(scenario_id)
+
+        return accepted
+
+    def counters(self) -> Dict[str, int]:
+        """Number of mentions received, dropped per stage and accepted."""
+        counters = {"received": self._mentions}
+        counters.update((stage.name, dropped) for stage, dropped in zip(self._stages, self._dropped))
+        counters["accepted"] = self._accepted
+
+        return counters
+
+    def clear_scenario(self, scenario_id: str) -> None:
+        for stage in self._stages:
+            stage.clear_scenario(scenario_id)
+
+    def get_state(self, scenario_id: str) -> Any:
+        state = {stage.name: stage.get_state(scenario_id) for stage in self._stages}
+        state = {name: stage_state for name, stage_state in state.items() if stage_state is not None}
+
+        return state if state else None
+
+    def set_state(self, scenario_id: str, state: Any) -> None:
+        if state is None:
+            return
+
+        # State received over the event bus may be deserialized as object instead of dict
+        state = state if isinstance(state, dict) else vars(state)
+        for stage in self._stages:
+            stage.set_state(scenario_id, state.get(stage.name))
+
+    def state_size(self) -> int:
+        return sum(stage.state_size() for stage in self._stages)
+
+    def _count(self, events: int, received: int, accepted: int):
+        reported = self._events // self._report_interval if self._report_interval else 0
+        self._events += events
+        self._mentions += received
+        self._accepted += accepted
+
+        if self._report_interval and self._events // self._report_interval > reported:
+            logger.info("Filtered mentions of %s events in %s: %s", self._events, self._name, self.counters())
@@ -0,0 +1,154 @@
+import abc
+import logging
+import random
+from collections import Counter
+from dataclasses import dataclass
+from string import Template
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from cltl.nlp.object_label_translation import dutch_labels
+
+logger = logging.getLogger(__name__)
+
+
+_OBJECT_RESPONSE = {
+        "tas": ["wat een mooie tas","waar heb je die tas gekocht", "Is die tas wel van u?", "U kunt uw tas ook achterlaten bij de garderobe"],
+        "bril": ["mooie bril, van Hans?", "Wat voor sterkte heeft u?", "Zo een mooie bril heb ik nog nooit gezien"],
+        "stropdas": ["wat een bijzondere stropdas"],
+        "jas": ["een leuk jas heb je aan", "Die jas staat u geweldig", "We hebben een mooie garderobe als u uw jas kwijt wilt"],
+        "rugzak": ["wat een fantastische rugzak","Passen er veel spullen in die mooie rugzak?", "Waar heeft u die mooie rugzak gekocht?"],
+        "paraplu": ["Jeetje, regent het buiten?", "Heeft u die paraplu nodig gehad vandaag?", "Wat een mooie paraplu heeft u"],
+        "wijnglas": ["Helaas mag uw consumptie niet mee de zaal in", "Houd uw wijnglas alstublieft niet in mijn buurt", "Houd u over het algemeen meer van witte of rode wijn?"],
+        "koffer": ["Bent u net op reis geweest met die mooie koffer?", "Wat een mooie koffer", "Wat een stijlvolle koffer"],
+        "boek": ["Wat voor leuks leest u?", "U zult uw boek niet nodig hebben in deze leuke voorstelling", "Bent u een lezer? bekijk vooral dan ook ons programmaboekje"],
+        "telefoon": ["Vergeet uw telefoon niet uit te zetten tijdens de voorstelling", "Mooie telefoon heeft u, die heeft vast veel gekost", "Mag ik ook eens bellen met uw telefoon?"],
+        "knuffelbeer": ["Wat een lieve knuffel heb jij"],
+        "tanden": ["Wat een mooie glimlach heeft u!", "Wat een mooie mond met tanden heeft u. U zou niet misstaan in een Colgate reclame"],
+        "cup": ["Helaas mag uw consumptie niet mee de zaal in", "Houd uw kop alstublieft niet in mijn buurt", "Houd u over het algemeen meer van koffie of thee?"],
+        "handbag": ["wat een mooie tas","waar heb je die tas gekocht"],
+        "glasses": ["mooie bril, van Hans?", "Wat voor sterkte heeft u?", "Zo een mooie bril heb ik nog nooit gezien"],
+        "tie": ["wat een bijzondere stropdas"],
+        "coat": ["een leuk jas heb je aan", "Die jas staat u geweldig", "We hebben een mooie garderobe als u uw jas kwijt wilt"],
+        "backpack": ["wat een fantastische rugzak","Passen er veel spullen in die mooie rugzak?", "Waar heeft u die mooie rugzak gekocht?"],
+        "umbrella": ["Jeetje, regent het buiten?", "Heeft u die paraplu nodig gehad vandaag?", "Wat een mooie paraplu heeft u."],
+        "wine glass": ["Helaas mag uw consumptie niet mee de zaal in", "Houd uw wijnglas alstublieft niet in mijn buurt", "Houd u over het algemeen meer van witte of rode wijn?"],
+        "suitcase": ["Bent u net op reis geweest met die mooie koffer?", "Wat een mooie koffer", "Wat een stijlvolle koffer"],
+        "book": ["Wat voor leuks leest u?", "U zult uw boek niet nodig hebben in deze leuke voorstelling", "Bent u een lezer? bekijk vooral dan ook ons programmaboekje"],
+        "cell phone": ["Vergeet uw telefoon niet uit te zetten tijdens de voorstelling", "Mooie telefoon heeft u, die heeft vast veel gekost", "Mag ik ook eens bellen met uw telefoon?", "Je mag wel een selfie nemen met je telefoon. Smile.", "Wil je misschien een selfie nemen? Vind ik geen probleem hoor."],
+        "teddy bear": ["Wat een lieve knuffel heb jij"],
+        "bird": ["Zie ik daar nu een vogel?", "Wat doet een vogel nu hier? Zie jij die ook?", "Kijk daar, een vogel."],
+        "laptop": ["Waarom heb jij een laptop bij je? Stop nu eens met werken", "Wat een mooie laptop. Programmeer jij zelf ook?", "Is die laptop van jou?"],
+    }
+
+
+class ResponseGenerator(abc.ABC):
+    """Generate a spoken response to objects observed in a scene."""
+    def respond(self, object_labels: List[str]) -> Optional[str]:
+        """
+        Parameters
+        ----------
+        object_labels : List[str]
+            The labels of the newly observed objects, one label per object instance.
+
+        Returns
+        -------
+        Optional[str]
+            The response utterance or None if there is nothing to respond.
+        """
+        raise NotImplementedError()
+
+
+@dataclass
+class PhraseTable:
+    """Phrases and templates for the object response in a language."""
+    template: Template
+    count_template: Template
+    conjunction: str
+    one: str
+    i_see: List[str]
+    greet_one: List[str]
+    greet_many: List[str]
+    forms: Dict[str, Tuple[str, str]]
+    follow_ups: Dict[str, List[str]]
+
+    def get_forms(self, label: str) -> Tuple[str, str]:
+        return self.forms[label] if label in self.forms else (label, label + "s")
+
+
+_ENGLISH_PHRASES = PhraseTable(
+    template=Template("$i_see $counts$greet$follow_up"),
+    count_template=Template("$count $label"),
+    conjunction="and",
+    one="a",
+    i_see=["I see", "I can see", "I think I see", "I observe"],
+    greet_one=["Nice to see you human!"],
+    greet_many=["Nice to see you folks!"],
+    forms={},
+    follow_ups={})
+
+
+_DUTCH_PHRASES = PhraseTable(
+    template=Template("$i_see $counts$greet$follow_up"),
+    count_template=Template("$count $label"),
+    conjunction="en",
+    one="een",
+    i_see=["Ik zie", "Zie ik dat goed", "Kijk daar heb je", "Wat zie ik nu!"],
+    greet_one=["Kijk een mens. Hoi", "Hallo jij daar", "Hallo hallo. Goed je te zien", "Leuk je te zien mens",
+               "Welkom en fijn dat je er bent", "Wat goed dat je gekomen bent", "Nou dat vind ik pas leuk je te zien",
+               "En wie hebben we hier dan", "Kom binnen, kom binnen", "Wat fijn dat je er bent"],
+    greet_many=["He mensen. Ik groet jullie", "Hallo, hoi, goed jullie te zien", "Aah dat wordt gezellig met jullie",
+                "Leuk jullie te zien", "Mensen, kom binnen", "Fijn, jullie zijn er ook",
+                "Welkom en fijn dat jullie er zijn", "Wat goed dat jullie gekomen zijn",
+                "Nou dat vind ik pas leuk jullie te zien", "En wie hebben we hier dan", "Kom binnen, kom binnen",
+                "Wat fijn dat jullie er zijn"],
+    forms={label: (forms[0], forms[-1]) for label, forms in dutch_labels.items()},
+    follow_ups=_OBJECT_RESPONSE)
+
+
+PHRASE_TABLES = {
+    "en": _ENGLISH_PHRASES,
+    "nl": _DUTCH_PHRASES
+}
+
+
+class PhraseResponseGenerator(ResponseGenerator):
+    """
+    Respond to observed objects by counting them, greeting observed persons and picking a follow-up
+    phrase for one of the objects, using the :class:`PhraseTable` of the configured language.
+    """
+    def __init__(self, language: str = "en", rng: random.Random = None):
+        if language not in PHRASE_TABLES:
+            raise ValueError(f"Unsupported language {language}, supported: {list(PHRASE_TABLES.keys())}")
+
+        self._phrases = PHRASE_TABLES[language]
+        self._rng = rng if rng else random.Random()
+
+    def respond(self, object_labels: List[str]) -> Optional[str]:
+        if not object_labels:
+            return None
+
+        object_counts = Counter(object_labels)
+
+        greet = ""
+        if "person" in object_counts:
+            greetings = self._phrases.greet_one if object_counts["person"] == 1 else self._phrases.greet_many
+            greet = ". " + self._rng.choice(greetings)
+
+        follow_ups = [label for label in object_counts if label != "person" and label in self._phrases.follow_ups]
+        follow_up = ". " + self._rng.choice(self._phrases.follow_ups[follow_ups[-1]]) if follow_ups else ""
+
+        return self._phrases.template.substitute(i_see=self._rng.choice(self._phrases.i_see),
+                                                 counts=self._format_counts(object_counts.items()),
+                                                 greet=greet, follow_up=follow_up)
+
+    def _format_counts(self, object_counts: Iterable[Tuple[str, int]]) -> str:
+        counts = []
+        for label, count in object_counts:
+            singular, plural = self._phrases.get_forms(label)
+            counts.append(self._phrases.count_template.substitute(count=count if count > 1 else self._phrases.one,
+                                                                  label=plural if count > 1 else singular))
+
+        if len(counts) < 2:
+            return "".join(counts)
+
+        return f"{', '.join(counts[:-1])} {self._phrases.conjunction} {counts[-1]}"
@@ -0,0 +1,133 @@
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from enum import Enum
+from typing import Any, Dict, Optional, Tuple
+
+from cltl.combot.infra.config import ConfigurationManager
+from cltl.combot.infra.time_util import timestamp_now
+
+logger = logging.getLogger(__name__)
+
+
+SalienceKey = Tuple[str, str]
+
+
+def salience_key(entity: Any) -> SalienceKey:
+    """Normalized text and type of an NLP entity or named entity, also if deserialized as plain object."""
+    text = " ".join(str(entity.text).lower().split())
+
+    entity_type = getattr(entity, "label", None) or getattr(entity, "type", None)
+    entity_type = entity_type.name if isinstance(entity_type, Enum) else str(entity_type)
+
+    return text, entity_type.lower()
+
+
+@dataclass
+class _Salience:
+    turn: int
+    timestamp: int
+    confidence: float
+
+
+class _ScenarioSalience:
+    def __init__(self):
+        self.turn = 0
+        self.entities: Dict[SalienceKey, _Salience] = OrderedDict()
+
+
+class SalienceCache:
+    """
+    Tracks the entities mentioned per scenario to suppress repeated mentions.
+
+    An entity is salient when it is mentioned for the first time in a scenario, when at least `min_turns`
+    turns or `min_seconds` seconds passed since it was last emitted, or when it is mentioned with a higher
+    confidence than before. At most `max_entities` entities are kept per scenario, the least recently
+    mentioned entities are evicted first.
+
+    Turns are counted per cache with :meth:`next_turn`, a cache must therefore only be used by a single
+    detector, e.g. counting utterances for text mentions or camera frames for image mentions.
+    """
+    @classmethod
+    def from_config(cls, config_manager: ConfigurationManager, config_name: str) -> Optional["SalienceCache"]:
+        """Create a new cache if it is enabled in the configuration."""
+        if not config_manager.has_config(config_name):
+            return None
+
+        config = config_manager.get_config(config_name)
+        if not config.get_boolean("enabled"):
+            return None
+
+        max_entities = config.get_int("max_entities") if "max_entities" in config else 256
+        min_turns = config.get_int("min_turns") if "min_turns" in config else None
+        min_seconds = config.get_float("min_seconds") if "min_seconds" in config else None
+
+        return cls(max_entities, min_turns, min_seconds)
+
+    def __init__(self, max_entities: int = 256, min_turns: int = None, min_seconds: float = None):
+        self._max_entities = max_entities
+        self._min_turns = min_turns
+        self._min_seconds_ms = int(min_seconds * 1000) if min_seconds else None
+        self._scenarios: Dict[str, _ScenarioSalience] = dict()
+        self._suppressed = 0
+
+    @property
+    def suppressed(self) -> int:
+        """The number of suppressed mentions."""
+        return self._suppressed
+
+    def next_turn(self, scenario_id: str) -> None:
+        self._scenarios.setdefault(scenario_id, _ScenarioSalience()).turn += 1
+
+    def is_salient(self, scenario_id: str, key: SalienceKey, confidence: float = 1.0, now: int = None) -> bool:
+        """Check if the entity is salient and record the mention if so."""
+        scenario = self._scenarios.setdefault(scenario_id, _ScenarioSalience())
+        now = now if now is not None else timestamp_now()
+
+        previous = scenario.entities.get(key)
+        if previous and not self._is_due(previous, scenario.turn, confidence, now):
+            scenario.entities.move_to_end(key)
+            self._suppressed += 1
+            logger.debug("Suppressed mention of %s in scenario %s (%s suppressed)", key, scenario_id, self._suppressed)
+            return False
+
+        scenario.entities[key] = _Salience(scenario.turn, now, confidence)
+        scenario.entities.move_to_end(key)
+        while len(scenario.entities) > self._max_entities:
+            scenario.entities.popitem(last=False)
+
+        return True
+
+    def _is_due(self, previous: _Salience, turn: int, confidence: float, now: int) -> bool:
+        return ((self._min_turns is not None and turn - previous.turn >= self._min_turns)
+                or (self._min_seconds_ms is not None and now - previous.timestamp >= self._min_seconds_ms)
+                or confidence > previous.confidence)
+
+    def clear_scenario(self, scenario_id: str) -> None:
+        self._scenarios.pop(scenario_id, None)
+
+    def get_state(self, scenario_id: str) -> Optional[dict]:
+        if scenario_id not in self._scenarios:
+            return None
+
+        scenario = self._scenarios[scenario_id]
+
+        return {
+            "turn": scenario.turn,
+            "entities": [[text, entity_type, salience.turn, salience.timestamp, salience.confidence]
+                         for (text, entity_type), salience in scenario.entities.items()]
+        }
+
+    def set_state(self, scenario_id: str, state: Any) -> None:
+        if state is None:
+            return
+
+        state = state if isinstance(state, dict) else vars(state)
+        scenario = _ScenarioSalience()
+        scenario.turn = state["turn"]
+        for text, entity_type, turn, timestamp, confidence in state["entities"]:
+            scenario.entities[(text, entity_type)] = _Salience(turn, timestamp, confidence)
+        self._scenarios[scenario_id] = scenario
+
+    def size(self) -> int:
+        return sum(len(scenario.entities) for scenario in self._scenarios.values())
@@ -1,24 +1,42 @@
 from emissor.persistence import ScenarioStorage
 from emissor.persistence.persistence import ScenarioController
 from emissor.processing.api import SignalProcessor
-from emissor.representation.scenario import Modality, Signal
+from emissor.representation.scenario import Modality, Signal, TextSignal
 from emissor.representation.scenario import Annotation, Mention
 from cltl.nlp.spacy_nlp import SpacyNLP
 from cltl.nlp.api import NLP, Token, NamedEntity, Entity
+from cltl.nlp.cache import CachedNLP, NLPCache
+from cltl.nlp.emissor_stream import chunked, read_signals, signal_path, SignalWriter
+from cltl.nlp.manifest import AnnotationManifest
 from cltl.combot.infra.time_util import timestamp_now
 import uuid
 from itertools import chain
+from typing import List
 import argparse
+import logging
+import os
 import sys
 
+logger = logging.getLogger(__name__)
+
+
+_ANNOTATION_TYPES = (Token.__name__, NamedEntity.__name__, Entity.__name__)
+
+
 class NLPAnnotator (SignalProcessor):
+    # Increase when the annotations created by the annotator change
+    VERSION = "1"
 
-    def __init__(self, model):
+    def __init__(self, model, nlp: NLP = None):
         """ an evaluator that will use reference metrics to approximate the quality of a conversation, across turns.
         params
         returns: None
         """
-        self._nlp= SpacyNLP(spacy_model=model)
+        self._nlp = nlp if nlp else SpacyNLP(spacy_model=model)
+
+    @property
+    def model_id(self) -> str:
+        return self._nlp.model_id
 
     def process_signal(self, scenario: ScenarioController, text_signal: Signal):
         if not text_signal.modality == Modality.TEXT:
@@ -35,32 +53,107 @@ class NLPAnnotator (SignalProcessor):
                     in chain(zip(token_segments, token_annotations),
                              zip(ner_segments, ner_annotations),
                              zip(entity_segments, entity_annotations))]
+        text_signal.mentions[:] = [mention for mention in text_signal.mentions if not self._is_nlp_mention(mention)]
         text_signal.mentions.extend(mentions)
 
+    def _is_nlp_mention(self, mention: Mention) -> bool:
+        return any(annotation.source == NLP.__name__ and annotation.type in _ANNOTATION_TYPES
+                   for annotation in mention.annotations)
+
     def _convert_to_segment_annotation(self, text_signal, type, collection):
         annotations = [Annotation(type, element, NLP.__name__, timestamp_now()) for element in collection]
         segments = [text_signal.ruler.get_offset(*element.segment) for element in collection]
 
         return segments, annotations
 
-def main(emissor_path:str, scenario:str,  model:str):
-    annotator = NLPAnnotator(model=model)
+
+def _annotate(annotator: NLPAnnotator, manifest: AnnotationManifest, scenario_ctrl: ScenarioController,
+              signals: List[TextSignal], force: bool = False) -> int:
+    """Annotate the signals that are not current in the manifest, returns the number of annotated signals."""
+    annotated = 0
+    for signal in signals:
+        if not force and manifest.is_current(signal):
+            continue
+        annotator.process_signal(scenario=scenario_ctrl, text_signal=signal)
+        manifest.update(signal)
+        annotated += 1
+
+    return annotated
+
+
+def annotate_streaming(annotator: NLPAnnotator, scenario_storage: ScenarioStorage, scenario: str,
+                       chunk_size: int = 100, force: bool = False):
+    """
+    Annotate the text signals of a scenario without loading the full scenario into memory.
+
+    Text signals are read incrementally and annotated in chunks of `chunk_size` signals, each chunk is
+    written to a temporary file that atomically replaces the text signal file when all signals are
+    annotated. The scenario metadata and signal files of other modalities are not rewritten.
+    Signals that are current in the :class:`AnnotationManifest` of the scenario are skipped, unless
+    `force` is set. If no signal needs to be annotated the text signal file is left unchanged.
+    """
+    scenario_ctrl = scenario_storage.load_scenario(scenario)
+    path = signal_path(scenario_storage, scenario_ctrl.scenario, Modality.TEXT)
+    if not path or not os.path.isfile(path):
+        logger.warning("No text signals in scenario %s", scenario)
+        return
+
+    manifest = AnnotationManifest.for_scenario(scenario_storage, scenario, annotator.model_id, NLPAnnotator.VERSION)
+    annotated = 0
+    with SignalWriter(path, TextSignal) as writer:
+        for chunk in chunked(read_signals(path, TextSignal), chunk_size):
+            annotated += _annotate(annotator, manifest, scenario_ctrl, chunk, force)
+            writer.write_all(chunk)
+            logger.debug("Annotated %s of %s text signals of scenario %s", annotated, writer.count, scenario)
+        if not annotated:
+            writer.discard()
+    manifest.save()
+
+    logger.info("Annotated %s of %s text signals of scenario %s", annotated, writer.count, scenario)
+
+
+def main(emissor_path:str, scenario:str,  model:str, streaming: bool = False, chunk_size: int = 100,
+         force: bool = False, nlp: NLP = None, cache: str = None):
+    if cache:
+        nlp = CachedNLP(nlp if nlp else SpacyNLP(spacy_model=model), NLPCache(cache))
+    annotator = NLPAnnotator(model=model, nlp=nlp)
     scenario_storage = ScenarioStorage(emissor_path)
+    if streaming:
+        annotate_streaming(annotator, scenario_storage, scenario, chunk_size, force)
+        return
+
     scenario_ctrl = scenario_storage.load_scenario(scenario)
     signals = scenario_ctrl.get_signals(Modality.TEXT)
-    for signal in signals:
-        annotator.process_signal(scenario=scenario_ctrl, text_signal=signal)
+    manifest = AnnotationManifest.for_scenario(scenario_storage, scenario, annotator.model_id, NLPAnnotator.VERSION)
+    annotated = _annotate(annotator, manifest, scenario_ctrl, signals, force)
+    logger.info("Annotated %s of %s text signals of scenario %s", annotated, len(signals), scenario)
+    if not annotated:
+        return
+
     #### Save the modified scenario to emissor
     scenario_storage.save_scenario(scenario_ctrl)
+    manifest.save()
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='Statistical evaluation emissor scenario')
     parser.add_argument('--emissor-path', type=str, required=False, help="Path to the emissor folder", default='')
     parser.add_argument('--scenario', type=str, required=False, help="Identifier of the scenario", default='')
     parser.add_argument('--model', type=str, required=False, help="Spacy model used for processing", default='')
+    parser.add_argument('--streaming', action='store_true',
+                        help="Read, annotate and write text signals incrementally instead of loading the full scenario")
+    parser.add_argument('--chunk-size', type=int, required=False, default=100,
+                        help="Number of text signals annotated at once in streaming mode")
+    parser.add_argument('--force', action='store_true',
+                        help="Annotate all text signals, including signals that were already annotated")
+    parser.add_argument('--cache', type=str, required=False,
+                        help="Path to a persistent NLP cache, texts in the cache are not analyzed again")
 
     args, _ = parser.parse_known_args()
     print('Input arguments', sys.argv)
     main(emissor_path=args.emissor_path,
          scenario=args.scenario,
-         model=args.model)
+         model=args.model,
+         streaming=args.streaming,
+         chunk_size=args.chunk_size,
+         force=args.force,
+         cache=args.cache)
@@ -1,7 +1,7 @@
 import abc
 import dataclasses
 from enum import Enum, auto
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 
 
 class POS(Enum):
@@ -148,5 +148,22 @@ class Doc:
 
 
 class NLP(abc.ABC):
+    @property
+    def model_id(self) -> str:
+        """Identifier of the model used for the analysis, including its version."""
+        return self.__class__.__name__
+
     def analyze(self, text: str) -> Doc:
-        raise NotImplementedError()
\ No newline at end of file
+        raise NotImplementedError()
+
+    def tokenize(self, text: str) -> Doc:
+        """Tokenize the text without further analysis. Tokens may not have a part-of-speech tag."""
+        return self.analyze(text)
+
+    def for_language(self, language: Optional[str]) -> "NLP":
+        """The NLP for texts in the given language, by default the NLP itself."""
+        return self
+
+    def close(self) -> None:
+        """Release resources held by the NLP, e.g. worker pools. NLPs that wrap another NLP close it as well."""
+        pass
@@ -0,0 +1,273 @@
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+from typing import Optional
+
+from cltl.nlp.api import NLP, Doc, Token, NamedEntity, Entity, POS, EntityType
+from cltl.nlp.manifest import text_hash
+
+logger = logging.getLogger(__name__)
+
+
+_EVICTION_INTERVAL = 100
+
+
+def serialize_doc(doc: Doc) -> str:
+    return json.dumps({
+        "tokens": [[token.text, token.pos.name, *token.segment] for token in doc.tokens],
+        "named_entities": [[entity.text, entity.label, *entity.segment] for entity in doc.named_entities],
+        "entities": [[entity.text, entity.type.name, *entity.segment] for entity in doc.entities],
+    }, separators=(",", ":"))
+
+
+def deserialize_doc(serialized: str) -> Doc:
+    doc = json.loads(serialized)
+
+    return Doc([Token(text, POS[pos], (start, end)) for text, pos, start, end in doc["tokens"]],
+               [NamedEntity(text, label, (start, end)) for text, label, start, end in doc["named_entities"]],
+               [Entity(text, EntityType[entity_type], (start, end)) for text, entity_type, start, end in doc["entities"]])
+
+
+class NLPCache:
+    """
+    Persistent cache of NLP results in a local sqlite database.
+
+    Results are keyed by the model id and the hash of the analyzed text. The database can be shared by
+    multiple processes, it is used in write-ahead logging mode so readers don't block writers. If the size of
+    the cached results exceeds `max_size` bytes, the least recently used results are evicted.
+    """
+    def __init__(self, path: str, max_size: int = None, timeout: float = 30.0, touch_interval: float = 60.0):
+        """
+        Parameters
+        ----------
+        path : str
+            Path of the sqlite database file.
+        max_size : int
+            Maximum size in bytes of the cached results, unlimited if not set.
+        timeout : float
+            Seconds to wait for a lock held by another connection.
+        touch_interval : float
+            Minimum number of seconds between updates of the access time of a cached result, to avoid a
+            write on every cache hit. Eviction is least recently used up to this resolution.
+        """
+        self._path = path
+        self._max_size = max_size
+        self._timeout = timeout
+        self._touch_interval = int(touch_interval * 1e9)
+        self._local = threading.local()
+        self._puts = 0
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        with self._connection() as connection:
+            connection.execute("CREATE TABLE IF NOT EXISTS docs ("
+                               "model TEXT NOT NULL, text_hash TEXT NOT NULL, doc TEXT NOT NULL, "
+                               "size INTEGER NOT NULL, accessed INTEGER NOT NULL, "
+                               "PRIMARY KEY (model, text_hash))")
+            connection.execute("CREATE INDEX IF NOT EXISTS docs_accessed ON docs (accessed)")
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite connections can't be shared between threads
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self._path, timeout=self._timeout)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+
+        return connection
+
+    def get(self, model_id: str, text: str) -> Optional[Doc]:
+        key = (model_id, text_hash(text))
+        connection = self._connection()
+        row = connection.execute("SELECT doc, accessed FROM docs WHERE model = ? AND text_hash = ?",
+                                 key).fetchone()
+        if row is None:
+            return None
+
+        now = time.time_ns()
+        if now - row[1] >= self._touch_interval:
+            with connection:
+                connection.execute("UPDATE docs SET accessed = ? WHERE model = ? AND text_hash = ?", (now,) + key)
+
+        return deserialize_doc(row[0])
+
+    def put(self, model_id: str, text: str, doc: Doc) -> None:
+        serialized = serialize_doc(doc)
+        with self._connection() as connection:
+            connection.execute("INSERT OR REPLACE INTO docs (model, text_hash, doc, size, accessed) "
+                               "VALUES (?, ?, ?, ?, ?)",
+                               (model_id, text_hash(text), serialized, len(serialized), time.time_ns()))
+
+        self._puts += 1
+        if self._max_size and self._puts % _EVICTION_INTERVAL == 0:
+            self.evict()
+
+    def size(self) -> int:
+        """Total size in bytes of the cached results."""
+        return self._connection().execute("SELECT COALESCE(SUM(size), 0) FROM docs").fetchone()[0]
+
+    def __len__(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+
+    def evict(self) -> int:
+        """Evict the least recently used results until the cache is within its maximum size."""
+        if not self._max_size:
+            return 0
+
+        connection = self._connection()
+        with connection:
+            excess = connection.execute("SELECT COALESCE(SUM(size), 0) FROM docs").fetchone()[0] - self._max_size
+            evict = []
+            for rowid, size in connection.execute("SELECT rowid, size FROM docs ORDER BY accessed, rowid"):
+                if excess <= 0:
+                    break
+                evict.append((rowid,))
+                excess -= size
+            connection.executemany("DELETE FROM docs WHERE rowid = ?", evict)
+        evicted = len(evict)
+
+        if evicted:
+            logger.info("Evicted %s results from NLP cache %s", evicted, self._path)
+
+        return evicted
+
+    def close(self) -> None:
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+
+class CachedNLP(NLP):
+    """
+    NLP that looks up results of the wrapped NLP in an :class:`NLPCache` before analyzing a text.
+    """
+    def __init__(self, nlp: NLP, cache: NLPCache):
+        self._nlp = nlp
+        self._cache = cache
+        self._hits = 0
+        self._misses = 0
+        self._lock = threading.Lock()
+
+    @property
+    def model_id(self) -> str:
+        return self._nlp.model_id
+
+    @property
+    def hits(self) -> int:
+        return self._hits
+
+    @property
+    def misses(self) -> int:
+        return self._misses
+
+    def analyze(self, text: str) -> Doc:
+        model_id = self._nlp.model_id
+        try:
+            doc = self._cache.get(model_id, text)
+        except sqlite3.Error:
+            logger.exception("Failed to read from NLP cache")
+            doc = None
+
+        with self._lock:
+            if doc is not None:
+                self._hits += 1
+            else:
+                self._misses += 1
+
+        if doc is not None:
+            return doc
+
+        doc = self._nlp.analyze(text)
+        try:
+            self._cache.put(model_id, text, doc)
+        except sqlite3.Error:
+            logger.exception("Failed to write to NLP cache")
+
+        return doc
+
+    def tokenize(self, text: str) -> Doc:
+        return self._nlp.tokenize(text)
+
+    def close(self) -> None:
+        # The cache may be shared by multiple NLPs and is closed by its owner
+        self._nlp.close()
+
+
+def warm(nlp: CachedNLP, emissor_path: str, scenarios=None) -> None:
+    """Analyze the text signals of emissor scenarios to fill the cache."""
+    from emissor.persistence import ScenarioStorage
+    from emissor.representation.scenario import Modality, TextSignal
+
+    from cltl.nlp.emissor_stream import read_signals, signal_path
+
+    storage = ScenarioStorage(emissor_path)
+    for scenario_id in scenarios if scenarios else storage.list_scenarios():
+        scenario = storage.load_scenario(scenario_id).scenario
+        path = signal_path(storage, scenario, Modality.TEXT)
+        if not path or not os.path.isfile(path):
+            continue
+
+        for signal in read_signals(path, TextSignal):
+            nlp.analyze(signal.text)
+
+        logger.info("Warmed NLP cache with scenario %s (hits: %s, misses: %s)", scenario_id, nlp.hits, nlp.misses)
+
+
+def main(emissor_path: str, scenarios, model: str, cache_path: str, max_size: int = None, **nlp_args):
+    from cltl.nlp.spacy_nlp import create_spacy_nlp
+
+    cache = NLPCache(cache_path, max_size)
+    # Analyze with the same wrappers as the application, as they are part of the model id of the cached results
+    nlp = CachedNLP(create_spacy_nlp(model, **nlp_args), cache)
+    try:
+        warm(nlp, emissor_path, scenarios)
+    finally:
+        nlp.close()
+    cache.evict()
+
+    print(f"Cache hits: {nlp.hits}, misses: {nlp.misses}, entries: {len(cache)}, size: {cache.size()} bytes")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Warm the NLP cache with the text signals of emissor scenarios')
+    parser.add_argument('--emissor-path', type=str, required=True, help="Path to the emissor folder")
+    parser.add_argument('--scenario', type=str, nargs='*', required=False,
+                        help="Identifiers of the scenarios, all scenarios if not set")
+    parser.add_argument('--model', type=str, required=False, help="Spacy model used for processing",
+                        default='en_core_web_sm')
+    parser.add_argument('--cache', type=str, required=True, help="Path to the cache database")
+    parser.add_argument('--max-size', type=int, required=False, help="Maximum size of the cache in MB")
+    parser.add_argument('--language', type=str, required=False, help="Language of the model", default='en')
+    parser.add_argument('--no-parser', action='store_true', help="Analyze without the dependency parser")
+    parser.add_argument('--tiered', action='store_true', help="Analyze short texts with the tiered NLP")
+    parser.add_argument('--tiered-max-tokens', type=int, required=False, default=3,
+                        help="Maximum number of tokens of texts handled by the cheap tiers")
+    parser.add_argument('--chunked', action='store_true', help="Analyze long texts in chunks")
+    parser.add_argument('--chunked-max-length', type=int, required=False, default=2000,
+                        help="Maximum length of the chunks")
+    parser.add_argument('--chunked-min-length', type=int, required=False, default=1000,
+                        help="Minimum length of the chunks")
+
+    args, _ = parser.parse_known_args()
+    print('Input arguments', sys.argv)
+    logging.basicConfig(level=logging.INFO)
+    main(emissor_path=args.emissor_path,
+         scenarios=args.scenario,
+         model=args.model,
+         cache_path=args.cache,
+         max_size=args.max_size * 1024 * 1024 if args.max_size else None,
+         language=args.language,
+         parser=not args.no_parser,
+         tiered=args.tiered,
+         tiered_max_tokens=args.tiered_max_tokens,
+         chunked=args.chunked,
+         chunked_max_length=args.chunked_max_length,
+         chunked_min_length=args.chunked_min_length)
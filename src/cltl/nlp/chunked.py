@@ -0,0 +1,167 @@
+import logging
+import os
+import re
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple
+
+from cltl.nlp.api import NLP, Doc
+from cltl.nlp.incremental import _shift
+
+logger = logging.getLogger(__name__)
+
+
+# Whitespace after a sentence end or a paragraph break, the whitespace belongs to the preceding chunk
+_BOUNDARY = re.compile(r"(?<=[.!?])\s+|\n\s*\n")
+_WHITESPACE = re.compile(r"\s+")
+
+# NLP of a worker process of the ChunkedNLP
+_worker_nlp: Optional[NLP] = None
+
+
+def _init_worker(nlp_factory: Callable[[], NLP]):
+    global _worker_nlp
+    _worker_nlp = nlp_factory()
+
+
+def _analyze_in_worker(text: str) -> Doc:
+    return _worker_nlp.analyze(text)
+
+
+def split(text: str, chunk_length: int, max_length: int) -> List[Tuple[int, int]]:
+    """
+    Split the text into chunks at sentence or paragraph boundaries.
+
+    Sentences are combined into chunks of up to `chunk_length` characters. Sentences that are longer than
+    `max_length` are split at whitespace, or within a word if there is no whitespace.
+
+    Returns
+    -------
+    List[Tuple[int, int]]
+        Start and end offset of the chunks in the text.
+    """
+    sentences = []
+    start = 0
+    for match in _BOUNDARY.finditer(text):
+        if match.end() > start:
+            sentences.append((start, match.end()))
+            start = match.end()
+    if start < len(text):
+        sentences.append((start, len(text)))
+
+    chunks = []
+    for start, end in (segment for sentence in sentences for segment in _limit(text, *sentence, max_length)):
+        if chunks and end - chunks[-1][0] <= chunk_length:
+            chunks[-1] = (chunks[-1][0], end)
+        else:
+            chunks.append((start, end))
+
+    return chunks
+
+
+def _limit(text: str, start: int, end: int, max_length: int):
+    while end - start > max_length:
+        breaks = [match.end() for match in _WHITESPACE.finditer(text, start + 1, start + max_length)]
+        split_at = breaks[-1] if breaks else start + max_length
+        yield start, split_at
+        start = split_at
+
+    yield start, end
+
+
+class ChunkedNLP(NLP):
+    """
+    Analyzes long texts in chunks in parallel.
+
+    Texts longer than `min_length` characters are split at sentence or paragraph boundaries into chunks,
+    about one per worker, of at most `max_length` characters. The chunks are analyzed in parallel and the
+    results are merged into a single :class:`Doc` with offsets relative to the original text. Shorter texts
+    are analyzed in the calling thread.
+
+    Chunks are analyzed in a thread pool with the wrapped NLP, or, if an `nlp_factory` is provided, in a
+    pool of worker processes that each create their own NLP with the factory. spaCy holds the GIL for most
+    of the analysis, so only worker processes scale with the number of cores. The factory must be picklable,
+    e.g. a module level function or a `functools.partial` of a class.
+
+    Annotations that would span multiple sentences, e.g. dependency relations, are not available across
+    chunk boundaries.
+    """
+    def __init__(self, nlp: NLP, max_length: int = 2000, min_length: int = 1000, workers: int = None,
+                 nlp_factory: Callable[[], NLP] = None):
+        """
+        Parameters
+        ----------
+        nlp : NLP
+            The NLP used for short texts, and for the chunks if no `nlp_factory` is provided.
+        max_length : int
+            Maximum length of a chunk in characters.
+        min_length : int
+            Minimum length of a text in characters to be analyzed in chunks. Sentences are combined into chunks
+            of up to this length even if this results in fewer chunks than workers.
+        workers : int
+            Number of parallel workers, by default the number of CPUs.
+        nlp_factory : Callable[[], NLP]
+            Factory of the NLP in worker processes, if not set chunks are analyzed in threads.
+        """
+        if max_length <= 0:
+            raise ValueError(f"max_length must be positive, was {max_length}")
+
+        self._nlp = nlp
+        self._max_length = max_length
+        self._min_length = min_length
+        self._workers = workers if workers else os.cpu_count() or 1
+        self._nlp_factory = nlp_factory
+
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+
+    @property
+    def model_id(self) -> str:
+        return f"{self._nlp.model_id}+chunked{self._max_length}"
+
+    def analyze(self, text: str) -> Doc:
+        if len(text) <= self._min_length:
+            return self._nlp.analyze(text)
+
+        chunk_length = min(self._max_length, max(-(-len(text) // self._workers), self._min_length))
+        chunks = split(text, chunk_length, self._max_length)
+        if len(chunks) == 1:
+            return self._nlp.analyze(text)
+
+        logger.debug("Analyze text of length %s in %s chunks", len(text), len(chunks))
+        texts = [text[start:end] for start, end in chunks]
+        docs = list(self._get_executor().map(self._analyze_function(), texts))
+
+        return _concat([_shift(doc, start) for doc, (start, _) in zip(docs, chunks)])
+
+    def tokenize(self, text: str) -> Doc:
+        return self._nlp.tokenize(text)
+
+    def close(self) -> None:
+        """Shut down the worker pool, it is restarted on the next long text."""
+        with self._lock:
+            if self._executor:
+                self._executor.shutdown()
+                self._executor = None
+
+        self._nlp.close()
+
+    def _analyze_function(self) -> Callable[[str], Doc]:
+        return _analyze_in_worker if self._nlp_factory else self._nlp.analyze
+
+    def _get_executor(self) -> Executor:
+        with self._lock:
+            if not self._executor:
+                if self._nlp_factory:
+                    self._executor = ProcessPoolExecutor(self._workers, initializer=_init_worker,
+                                                         initargs=(self._nlp_factory,))
+                else:
+                    self._executor = ThreadPoolExecutor(self._workers, thread_name_prefix="ChunkedNLP")
+
+            return self._executor
+
+
+def _concat(docs: List[Doc]) -> Doc:
+    return Doc([token for doc in docs for token in doc.tokens],
+               [entity for doc in docs for entity in doc.named_entities],
+               [entity for doc in docs for entity in doc.entities])
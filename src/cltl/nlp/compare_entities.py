@@ -0,0 +1,128 @@
+import argparse
+import logging
+import sys
+import time
+from dataclasses import dataclass
+from typing import Iterable, List, Set, Tuple
+
+from cltl.nlp.api import NLP, Entity
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ComparisonReport:
+    texts: int
+    reference_entities: int
+    candidate_entities: int
+    matched_entities: int
+    reference_seconds: float
+    candidate_seconds: float
+
+    @property
+    def precision(self) -> float:
+        return self.matched_entities / self.candidate_entities if self.candidate_entities else 1.0
+
+    @property
+    def recall(self) -> float:
+        return self.matched_entities / self.reference_entities if self.reference_entities else 1.0
+
+    @property
+    def f1(self) -> float:
+        total = self.precision + self.recall
+
+        return 2 * self.precision * self.recall / total if total else 0.0
+
+    @property
+    def speedup(self) -> float:
+        return self.reference_seconds / self.candidate_seconds if self.candidate_seconds else 0.0
+
+    def summary(self) -> str:
+        return (f"texts: {self.texts}, entities: {self.reference_entities} (reference) / "
+                f"{self.candidate_entities} (candidate), precision: {self.precision:.3f}, "
+                f"recall: {self.recall:.3f}, f1: {self.f1:.3f}, "
+                f"time: {self.reference_seconds:.2f}s (reference) / {self.candidate_seconds:.2f}s (candidate), "
+                f"speedup: {self.speedup:.2f}")
+
+
+def _entity_keys(entities: Iterable[Entity]) -> Set[Tuple[Tuple[int, int], str]]:
+    return {(tuple(entity.segment), entity.type.name) for entity in entities}
+
+
+def _analyze(nlp: NLP, texts: List[str]) -> Tuple[List[Set[Tuple[Tuple[int, int], str]]], float]:
+    start = time.perf_counter()
+    docs = [nlp.analyze(text) for text in texts]
+    duration = time.perf_counter() - start
+
+    return [_entity_keys(doc.entities) for doc in docs], duration
+
+
+def compare(reference: NLP, candidate: NLP, texts: Iterable[str]) -> ComparisonReport:
+    """
+    Compare the entities and speed of a candidate NLP against a reference NLP.
+
+    Entities are matched by segment and type, the entities of the reference are considered correct.
+
+    Parameters
+    ----------
+    reference : NLP
+        The reference NLP, e.g. the parser based :class:`SpacyNLP`.
+    candidate : NLP
+        The NLP that is evaluated against the reference.
+    texts : Iterable[str]
+        The texts to analyze.
+
+    Returns
+    -------
+    ComparisonReport
+        Entity counts, matches and the analysis time of both NLPs.
+    """
+    texts = list(texts)
+    reference_entities, reference_seconds = _analyze(reference, texts)
+    candidate_entities, candidate_seconds = _analyze(candidate, texts)
+
+    for text, expected, actual in zip(texts, reference_entities, candidate_entities):
+        if expected != actual:
+            logger.debug("Entities differ for '%s': missing %s, additional %s",
+                         text, sorted(expected - actual), sorted(actual - expected))
+
+    return ComparisonReport(len(texts),
+                            sum(len(entities) for entities in reference_entities),
+                            sum(len(entities) for entities in candidate_entities),
+                            sum(len(expected & actual)
+                                for expected, actual in zip(reference_entities, candidate_entities)),
+                            reference_seconds, candidate_seconds)
+
+
+def load_corpus(path: str) -> List[str]:
+    """Load a text corpus with one text per line, empty lines are skipped."""
+    with open(path) as corpus_file:
+        return [line.strip() for line in corpus_file if line.strip()]
+
+
+def main(corpus: str, model: str):
+    from cltl.nlp.spacy_nlp import SpacyNLP
+
+    texts = load_corpus(corpus)
+    reference = SpacyNLP(spacy_model=model)
+    candidate = SpacyNLP(spacy_model=model, parser=False)
+
+    # Warm up both pipelines before timing
+    reference.analyze(texts[0] if texts else "")
+    candidate.analyze(texts[0] if texts else "")
+
+    report = compare(reference, candidate, texts)
+    print(report.summary())
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compare parser based and parser-free entity extraction')
+    parser.add_argument('--corpus', type=str, required=True, help="Path to a text file with one text per line")
+    parser.add_argument('--model', type=str, required=False, help="Spacy model used for processing",
+                        default='en_core_web_sm')
+    parser.add_argument('--verbose', action='store_true', help="Log texts with different entities")
+
+    args, _ = parser.parse_known_args()
+    print('Input arguments', sys.argv)
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO)
+    main(corpus=args.corpus, model=args.model)
@@ -0,0 +1,173 @@
+import json
+import logging
+import os
+import re
+import tempfile
+from itertools import islice
+from typing import Iterable, Iterator, List, Optional, TypeVar, Type
+
+from emissor.persistence import ScenarioStorage
+from emissor.representation.scenario import Modality, Scenario, Signal
+from emissor.representation.util import marshal, unmarshal
+
+logger = logging.getLogger(__name__)
+
+
+_WHITESPACE = re.compile(r"[\s,]*")
+
+S = TypeVar("S", bound=Signal)
+
+
+def signal_path(storage: ScenarioStorage, scenario: Scenario, modality: Modality) -> Optional[str]:
+    """The path of the signal file of a modality in the scenario, if the scenario has signals of that modality."""
+    modality_key = modality.name.lower()
+    if modality_key not in scenario.signals:
+        return None
+
+    return os.path.join(storage.base_path, scenario.id, scenario.signals[modality_key])
+
+
+def read_signals(path: str, cls: Type[S], read_size: int = 1024 * 1024) -> Iterator[S]:
+    """
+    Read the signals from an emissor signal file incrementally.
+
+    The file is read in blocks of `read_size` characters and signals are deserialized one at a time,
+    such that only the current block and signal are kept in memory.
+
+    Parameters
+    ----------
+    path : str
+        Path to the signal file, containing a JSON array of signals.
+    cls : Type[Signal]
+        The type of the signals in the file.
+    read_size : int
+        Number of characters read at once.
+
+    Returns
+    -------
+    Iterator[Signal]
+        The signals in the order of the file.
+    """
+    decoder = json.JSONDecoder()
+    with open(path) as json_file:
+        buffer, position, eof = "", 0, False
+
+        def fill():
+            nonlocal buffer, position, eof
+            block = json_file.read(read_size)
+            eof = not block
+            buffer, position = buffer[position:] + block, 0
+
+        while not eof and not buffer.strip():
+            fill()
+        buffer = buffer.lstrip()
+        if not buffer:
+            return
+        if not buffer.startswith("["):
+            raise ValueError(f"Expected a JSON array of signals in {path}")
+        position = 1
+
+        while True:
+            position = _WHITESPACE.match(buffer, position).end()
+            if position == len(buffer) and not eof:
+                fill()
+                continue
+            if buffer.startswith("]", position):
+                return
+
+            try:
+                _, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                fill()
+                continue
+
+            yield unmarshal(buffer[position:end], cls=cls)
+            position = end
+
+
+def chunked(signals: Iterable[S], chunk_size: int) -> Iterator[List[S]]:
+    iterator = iter(signals)
+    chunk = list(islice(iterator, chunk_size))
+    while chunk:
+        yield chunk
+        chunk = list(islice(iterator, chunk_size))
+
+
+def copy_mode(tmp_path: str, path: str) -> None:
+    """
+    Set the permissions of a temporary file that replaces `path` to those of `path`.
+
+    Temporary files are created readable by the owner only, if `path` doesn't exist the permissions of a new
+    file are used.
+    """
+    try:
+        mode = os.stat(path).st_mode
+    except FileNotFoundError:
+        umask = os.umask(0)
+        os.umask(umask)
+        mode = 0o666 & ~umask
+
+    os.chmod(tmp_path, mode)
+
+
+class SignalWriter:
+    """
+    Writes signals one at a time to an emissor signal file.
+
+    Signals are written to a temporary file next to the target, which replaces the target atomically
+    when the writer is closed without error. On errors the target is left unchanged.
+    """
+    def __init__(self, path: str, cls: Type[S]):
+        self._path = path
+        self._cls = cls
+        self._file = None
+        self._tmp_path = None
+        self._count = 0
+        self._discarded = False
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    def __enter__(self) -> "SignalWriter":
+        directory, file_name = os.path.split(os.path.abspath(self._path))
+        fd, self._tmp_path = tempfile.mkstemp(prefix=f".{file_name}.", suffix=".tmp", dir=directory)
+        self._file = os.fdopen(fd, "w")
+        self._file.write("[")
+        self._count = 0
+        self._discarded = False
+
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        try:
+            if exc_type is None and not self._discarded:
+                self._file.write("\n]")
+                self._file.flush()
+                os.fsync(self._file.fileno())
+            self._file.close()
+
+            if exc_type is None and not self._discarded:
+                copy_mode(self._tmp_path, self._path)
+                os.replace(self._tmp_path, self._path)
+                logger.debug("Wrote %s signals to %s", self._count, self._path)
+        finally:
+            if os.path.exists(self._tmp_path):
+                os.remove(self._tmp_path)
+            self._file = None
+            self._tmp_path = None
+
+    def write(self, signal: S) -> None:
+        self._file.write(",\n" if self._count else "\n")
+        self._file.write(marshal(signal, cls=self._cls))
+        self._count += 1
+
+    def write_all(self, signals: Iterable[S]) -> None:
+        for signal in signals:
+            self.write(signal)
+
+    def discard(self) -> None:
+        """Leave the target unchanged when the writer is closed."""
+        self._discarded = True
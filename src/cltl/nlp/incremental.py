@@ -0,0 +1,157 @@
+import dataclasses
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from cltl.nlp.api import NLP, Doc, POS, Token
+
+logger = logging.getLogger(__name__)
+
+
+_SENTENCE_BOUNDARIES = (".", "!", "?")
+
+
+@dataclass
+class _StablePrefix:
+    text: str
+    doc: Doc
+    published: int = 0
+    tail: Optional[Doc] = None
+
+
+def _shift(doc: Doc, offset: int) -> Doc:
+    if not offset:
+        return doc
+
+    def shift(elements):
+        return [dataclasses.replace(element, segment=(element.segment[0] + offset, element.segment[1] + offset))
+                for element in elements]
+
+    return Doc(shift(doc.tokens), shift(doc.named_entities), shift(doc.entities))
+
+
+def _before(doc: Doc, offset: int) -> Doc:
+    def before(elements):
+        return [element for element in elements if element.segment[1] <= offset]
+
+    return Doc(before(doc.tokens), before(doc.named_entities), before(doc.entities))
+
+
+def _between(doc: Doc, start: int, end: int) -> Doc:
+    def between(elements):
+        return [element for element in elements if element.segment[0] >= start and element.segment[1] <= end]
+
+    return Doc(between(doc.tokens), between(doc.named_entities), between(doc.entities))
+
+
+def _merge(prefix: Doc, suffix: Doc) -> Doc:
+    return Doc(prefix.tokens + suffix.tokens,
+               prefix.named_entities + suffix.named_entities,
+               prefix.entities + suffix.entities)
+
+
+class IncrementalNLP:
+    """
+    Incremental analysis of texts that grow over time, e.g. partial hypotheses of streaming ASR.
+
+    The analysis of the stable prefix of a text, i.e. up to the last completed sentence, is kept per
+    signal id. On updates of the text only the remainder after the stable prefix is analyzed, as long
+    as the stable prefix did not change. Annotations after the last completed sentence are provisional,
+    they are replaced by the next update and not included in the delta until their sentence is completed,
+    the text is marked as `final`, or the signal is flushed with :meth:`flush`.
+    """
+    def __init__(self, nlp: NLP, max_signals: int = 64, boundaries: Iterable[str] = _SENTENCE_BOUNDARIES):
+        self._nlp = nlp
+        self._max_signals = max_signals
+        self._boundaries = set(boundaries)
+        self._prefixes = OrderedDict()
+
+    def analyze(self, signal_id: str, text: str, language: Optional[str] = None,
+                final: bool = False) -> Tuple[Doc, Doc]:
+        """
+        Analyze the current text of a signal.
+
+        Parameters
+        ----------
+        signal_id : str
+            The identifier of the signal.
+        text : str
+            The full current text of the signal.
+        language : Optional[str]
+            The language of the text, if provided the text is analyzed with the NLP for the language,
+            see :meth:`NLP.for_language`.
+        final : bool
+            If the text is the final text of the signal, the delta includes the provisional annotations
+            and the state of the signal is cleared.
+
+        Returns
+        -------
+        Tuple[Doc, Doc]
+            The analysis of the full text and the delta, i.e. the analysis of the sentences that were
+            completed since the previous update, including the last sentence if the text ends with a
+            sentence boundary. Offsets in both are relative to the full text.
+        """
+        prefix = self._prefixes.pop(signal_id, None)
+        if not prefix or not text.startswith(prefix.text):
+            if prefix:
+                logger.debug("Stable prefix of signal %s changed, analyze full text", signal_id)
+            prefix = _StablePrefix("", Doc([], [], []))
+
+        nlp = self._nlp.for_language(language) if language else self._nlp
+        remainder = _shift(nlp.analyze(text[len(prefix.text):]), len(prefix.text))
+
+        if final:
+            return _merge(prefix.doc, remainder), _between(remainder, prefix.published, len(text))
+
+        boundary = self._stable_boundary(remainder)
+        published = self._completed(remainder) or boundary or prefix.published
+        delta = _between(remainder, prefix.published, published)
+        tail = _between(remainder, published, len(text))
+
+        if boundary:
+            stable_prefix = _StablePrefix(text[:boundary], _merge(prefix.doc, _before(remainder, boundary)), published,
+                                          tail)
+        else:
+            stable_prefix = _StablePrefix(prefix.text, prefix.doc, published, tail)
+
+        self._prefixes[signal_id] = stable_prefix
+        while len(self._prefixes) > self._max_signals:
+            self._prefixes.popitem(last=False)
+
+        return _merge(prefix.doc, remainder), delta
+
+    def flush(self, signal_id: str) -> Optional[Doc]:
+        """
+        Clear the state of a signal and return its provisional annotations of the last analyzed text,
+        i.e. the annotations after the last completed sentence, with offsets relative to the full text.
+        Returns None if the signal is unknown.
+        """
+        prefix = self._prefixes.pop(signal_id, None)
+
+        return prefix.tail if prefix else None
+
+    def clear(self, signal_id: str) -> None:
+        self._prefixes.pop(signal_id, None)
+
+    def state_sizes(self) -> Dict[str, int]:
+        return {"prefixes": len(self._prefixes)}
+
+    def _stable_boundary(self, doc: Doc) -> int:
+        """The start of the first token after the last completed sentence, if any."""
+        tokens = self._tokens(doc)
+        for token, next_token in zip(reversed(tokens[:-1]), reversed(tokens[1:])):
+            if token.text in self._boundaries:
+                return next_token.segment[0]
+
+        return 0
+
+    def _completed(self, doc: Doc) -> int:
+        """The end of the text if it ends with a sentence boundary."""
+        tokens = self._tokens(doc)
+
+        return tokens[-1].segment[1] if tokens and tokens[-1].text in self._boundaries else 0
+
+    @staticmethod
+    def _tokens(doc: Doc) -> List[Token]:
+        return [token for token in doc.tokens if token.pos != POS.SPACE and token.text.strip()]
@@ -0,0 +1,78 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from typing import Dict
+
+from emissor.persistence import ScenarioStorage
+from emissor.representation.scenario import TextSignal
+
+from cltl.nlp.emissor_stream import copy_mode
+
+logger = logging.getLogger(__name__)
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class AnnotationManifest:
+    """
+    Manifest of the text signals of a scenario that were annotated.
+
+    For each annotated signal the hash of its text, the model and the version of the annotator are recorded.
+    Signals with an unchanged entry don't need to be annotated again.
+    """
+    FILE_NAME = "nlp_manifest.json"
+
+    @classmethod
+    def for_scenario(cls, storage: ScenarioStorage, scenario_id: str, model_id: str, annotator_version: str):
+        return cls(os.path.join(storage.base_path, scenario_id, cls.FILE_NAME), model_id, annotator_version)
+
+    def __init__(self, path: str, model_id: str, annotator_version: str):
+        self._path = path
+        self._model_id = model_id
+        self._annotator_version = annotator_version
+        self._entries: Dict[str, dict] = self._load(path)
+        self._dirty = False
+
+    @staticmethod
+    def _load(path: str) -> Dict[str, dict]:
+        if not os.path.isfile(path):
+            return {}
+
+        with open(path) as json_file:
+            return json.load(json_file).get("signals", {})
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _entry(self, signal: TextSignal) -> dict:
+        return {"text_hash": text_hash(signal.text), "model": self._model_id, "annotator": self._annotator_version}
+
+    def is_current(self, signal: TextSignal) -> bool:
+        return self._entries.get(signal.id) == self._entry(signal)
+
+    def update(self, signal: TextSignal) -> None:
+        self._entries[signal.id] = self._entry(signal)
+        self._dirty = True
+
+    def save(self) -> None:
+        """Write the manifest atomically, if it was updated."""
+        if not self._dirty:
+            return
+
+        directory, file_name = os.path.split(os.path.abspath(self._path))
+        fd, tmp_path = tempfile.mkstemp(prefix=f".{file_name}.", suffix=".tmp", dir=directory)
+        try:
+            with os.fdopen(fd, "w") as json_file:
+                json.dump({"signals": self._entries}, json_file, indent=2)
+            copy_mode(tmp_path, self._path)
+            os.replace(tmp_path, self._path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        self._dirty = False
+        logger.debug("Saved manifest with %s signals to %s", len(self._entries), self._path)
@@ -0,0 +1,184 @@
+import gc
+import importlib
+import logging
+import os
+import re
+import threading
+from collections import Counter, OrderedDict
+from typing import Callable, Dict, Iterable, Mapping, Optional
+
+from cltl.nlp.api import NLP, Doc
+
+logger = logging.getLogger(__name__)
+
+
+_WORD = re.compile(r"\w+")
+
+
+def _resident_memory() -> Optional[int]:
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def stop_words(language: str) -> frozenset:
+    """Lower case stop words of a language from spaCy's language data, empty if not available."""
+    try:
+        module = importlib.import_module(f"spacy.lang.{language}.stop_words")
+    except ImportError:
+        logger.warning("No stop words available for language %s", language)
+        return frozenset()
+
+    return frozenset(word.lower() for word in module.STOP_WORDS)
+
+
+class StopWordLanguageDetector:
+    """
+    Cheap language identification by the share of stop words of a language in a text.
+
+    Stop words are taken from spaCy's language data. Returns `None` if the text contains no distinctive stop
+    words, e.g. for very short texts, such that the caller can fall back to a default language.
+    """
+    def __init__(self, languages: Iterable[str]):
+        words_by_language = {language: stop_words(language) for language in languages}
+        # Stop words shared by languages don't discriminate between them
+        shared = Counter(word for words in words_by_language.values() for word in words)
+        self._stop_words = {language: frozenset(word for word in words if shared[word] == 1)
+                            for language, words in words_by_language.items()}
+
+    def __call__(self, text: str) -> Optional[str]:
+        words = [word.lower() for word in _WORD.findall(text)]
+        scores = {language: sum(word in language_words for word in words)
+                  for language, language_words in self._stop_words.items()}
+        language, score = max(scores.items(), key=lambda item: item[1], default=(None, 0))
+        if not score or list(scores.values()).count(score) > 1:
+            return None
+
+        return language
+
+
+class NLPPool(NLP):
+    """
+    Pool of NLP models by language that are loaded on first use.
+
+    Loaded models are kept in least recently used order. When the resident memory attributed to the loaded
+    models exceeds `memory_budget`, or more than `max_models` are loaded, the least recently used models
+    are released. The memory of a model is estimated from the growth of the resident memory of the process
+    while it is loaded, which is only available on Linux. Released memory may not be returned to the
+    operating system immediately.
+
+    :meth:`for_language` provides the model for a language. :meth:`analyze` and :meth:`tokenize` use the
+    language detected by `detect_language`, if provided, and the `default_language` otherwise.
+    """
+    def __init__(self, models: Mapping[str, Callable[[], NLP]], default_language: str,
+                 memory_budget: int = None, max_models: int = None,
+                 detect_language: Callable[[str], Optional[str]] = None):
+        """
+        Parameters
+        ----------
+        models : Mapping[str, Callable[[], NLP]]
+            Factories of the NLP by language.
+        default_language : str
+            Language used for texts without language information.
+        memory_budget : int
+            Maximum memory in bytes of the loaded models.
+        max_models : int
+            Maximum number of loaded models.
+        detect_language : Callable[[str], Optional[str]]
+            Language identification used for texts without language information.
+        """
+        if default_language not in models:
+            raise ValueError(f"No model for the default language {default_language}, "
+                             f"available: {list(models.keys())}")
+
+        self._models = dict(models)
+        self._default_language = default_language
+        self._memory_budget = memory_budget
+        self._max_models = max_models
+        self._detect_language = detect_language
+
+        self._loaded: Dict[str, NLP] = OrderedDict()
+        self._memory: Dict[str, int] = {}
+        self._lock = threading.RLock()
+
+    @property
+    def model_id(self) -> str:
+        return self.for_language(self._default_language).model_id
+
+    @property
+    def languages(self) -> Iterable[str]:
+        return tuple(self._models.keys())
+
+    @property
+    def loaded(self) -> Dict[str, int]:
+        """Estimated memory in bytes of the loaded models by language."""
+        with self._lock:
+            return {language: self._memory.get(language, 0) for language in self._loaded}
+
+    def language(self, text: str) -> str:
+        """Language of the text, detected or the default language."""
+        language = self._detect_language(text) if self._detect_language else None
+
+        return language if language in self._models else self._default_language
+
+    def for_language(self, language: Optional[str]) -> NLP:
+        if language not in self._models:
+            if language:
+                logger.debug("No model for language %s, use %s", language, self._default_language)
+            language = self._default_language
+
+        with self._lock:
+            if language in self._loaded:
+                self._loaded.move_to_end(language)
+                return self._loaded[language]
+
+            return self._load(language)
+
+    def analyze(self, text: str) -> Doc:
+        return self.for_language(self.language(text)).analyze(text)
+
+    def tokenize(self, text: str) -> Doc:
+        return self.for_language(self.language(text)).tokenize(text)
+
+    def close(self) -> None:
+        """Release all loaded models."""
+        with self._lock:
+            for language in list(self._loaded):
+                self.release(language)
+
+    def release(self, language: str) -> None:
+        with self._lock:
+            nlp = self._loaded.pop(language, None)
+            if nlp is not None:
+                nlp.close()
+                memory = self._memory.pop(language, 0)
+                gc.collect()
+                logger.info("Released NLP model for language %s (%.1f MB)", language, memory / 2 ** 20)
+
+    def _load(self, language: str) -> NLP:
+        before = _resident_memory()
+        nlp = self._models[language]()
+        after = _resident_memory()
+
+        self._loaded[language] = nlp
+        self._memory[language] = max(after - before, 0) if before is not None and after is not None else 0
+        logger.info("Loaded NLP model %s for language %s (%.1f MB)",
+                    nlp.model_id, language, self._memory[language] / 2 ** 20)
+
+        self._evict(keep=language)
+
+        return nlp
+
+    def _evict(self, keep: str):
+        def exceeded():
+            return ((self._max_models and len(self._loaded) > self._max_models)
+                    or (self._memory_budget and sum(self._memory.values()) > self._memory_budget))
+
+        while exceeded():
+            language = next((language for language in self._loaded if language != keep), None)
+            if language is None:
+                logger.warning("NLP model for language %s exceeds the memory budget", keep)
+                break
+            self.release(language)
@@ -1,55 +1,201 @@
+import functools
 import logging
 from enum import Enum
-from typing import List
+from typing import List, Dict, Iterable
 
 import spacy
+from spacy.matcher import PhraseMatcher
+from spacy.util import filter_spans
 
 from cltl.nlp.api import NLP, Doc, NamedEntity, POS, Token, Entity, EntityType, ObjectType
+from cltl.nlp.chunked import ChunkedNLP
+from cltl.nlp.object_label_translation import OBJECT_SYNONYMS
+from cltl.nlp.tiered import TieredNLP
 
 logger = logging.getLogger(__name__)
 
 
-_ACCEPTED_OBJECTS = {object_type.name.lower() for object_type in ObjectType}
 _RELATIONS = ('nsubj', 'nsubjpass', 'dobj', 'prep', 'pcomp', 'acomp')
+# Parts of speech of tokens that can precede an object noun within its noun phrase
+_MODIFIER_POS = ('DET', 'ADJ', 'NUM', 'PRON', 'ADV', 'PART')
+_NOUN_POS = ('NOUN', 'PROPN')
 
 
 class SpacyNLP(NLP):
-    def __init__(self, spacy_model: str = "en_core_web_sm", relations: List[str] = _RELATIONS):
-        self._nlp = spacy.load(spacy_model)
+    def __init__(self, spacy_model: str = "en_core_web_sm", relations: List[str] = _RELATIONS,
+                 object_synonyms: Dict[str, Iterable[str]] = None, parser: bool = True):
+        """
+        Parameters
+        ----------
+        spacy_model : str
+            The spaCy model to use.
+        relations : List[str]
+            Dependency relations of entities.
+        object_synonyms : Dict[str, Iterable[str]]
+            Additional surface forms for object types, e.g. translations, by `ObjectType` value. By default
+            the translations of object types for the language of the model, if available.
+        parser : bool
+            If `False`, the dependency parser is not loaded and entities are extracted with rules on
+            part-of-speech tags and lemmas only, which is faster but less accurate.
+        """
+        self._parser = parser
+        self._nlp = spacy.load(spacy_model) if parser else spacy.load(spacy_model, exclude=["parser"])
         self._relations = set(relations)
+        if object_synonyms is None:
+            object_synonyms = OBJECT_SYNONYMS.get(self._nlp.lang, {})
+        self._object_matchers = self._create_object_matchers(object_synonyms)
+
+    def _create_object_matchers(self, object_synonyms: Dict[str, Iterable[str]]):
+        lemma_matcher = PhraseMatcher(self._nlp.vocab, attr="LEMMA")
+        for object_type, pattern in zip(ObjectType, self._nlp.pipe(object_type.value for object_type in ObjectType)):
+            lemma_matcher.add(object_type.name, [pattern])
+
+        synonym_matcher = PhraseMatcher(self._nlp.vocab, attr="LOWER")
+        for object_type in ObjectType:
+            synonyms = object_synonyms.get(object_type.value, ())
+            if synonyms:
+                synonym_matcher.add(object_type.name, [self._nlp.make_doc(synonym.lower()) for synonym in synonyms])
+
+        return lemma_matcher, synonym_matcher
+
+    @property
+    def model_id(self) -> str:
+        meta = self._nlp.meta
+
+        model_id = f"{meta.get('lang')}_{meta.get('name')}-{meta.get('version')}"
+
+        return model_id if self._parser else model_id + "-noparser"
 
     def analyze(self, text: str) -> Doc:
         doc = self._nlp(text)
 
         tokens = [Token(token.text, POS[token.pos_], (token.idx, token.idx + len(token.text))) for token in doc]
         named_entities = [NamedEntity(entity.text, entity.label_, (entity.start_char, entity.end_char)) for entity in doc.ents]
-        entities = self._analyze_entities(doc)
+        entities = self._analyze_entities(doc) if self._parser else self._analyze_entities_without_parser(doc)
 
         return Doc(tokens, named_entities, entities)
 
+    def tokenize(self, text: str) -> Doc:
+        doc = self._nlp.make_doc(text)
+        tokens = [Token(token.text, self._lexical_pos(token), (token.idx, token.idx + len(token.text)))
+                  for token in doc]
+
+        return Doc(tokens, [], [])
+
+    def _lexical_pos(self, token):
+        if token.is_space:
+            return POS.SPACE
+        if token.is_punct:
+            return POS.PUNCT
+        if token.like_num:
+            return POS.NUM
+
+        return POS.X
+
     def _analyze_entities(self, doc):
         predicates = {}
 
-        entities = []
+        entities = self._analyze_objects(doc)
         for token in doc:
             if token.dep_ in self._relations:
                 head_id = token.head.i
                 if head_id not in predicates:
                     predicates[head_id] = dict()
 
-                type = None
-                if token.pos_ == "PRON":
-                    if token.text.lower() == 'i':
-                        type = EntityType.SPEAKER
-                    elif token.text.lower() == 'you':
-                        type = EntityType.HEARER
-                elif token.pos_ == "NOUN":
-                    if token.lemma_.lower() in _ACCEPTED_OBJECTS:
-                        type = EntityType.OBJECT
-
+                type = self._pronoun_type(token)
                 if type:
                     entities.append(Entity(token.text, type, (token.idx, token.idx + len(token.text))))
 
                 predicates[head_id][token.dep_] = token.lemma_
 
-        return entities
+        return sorted(entities, key=lambda entity: entity.segment)
+
+    def _pronoun_type(self, token):
+        if token.pos_ != "PRON":
+            return None
+        if token.text.lower() == 'i':
+            return EntityType.SPEAKER
+        if token.text.lower() == 'you':
+            return EntityType.HEARER
+
+        return None
+
+    def _match_objects(self, doc):
+        matches = [span for matcher in self._object_matchers for span in matcher(doc, as_spans=True)]
+
+        return filter_spans(matches)
+
+    def _analyze_objects(self, doc):
+        return [Entity(span.text, EntityType.OBJECT, (span.start_char, span.end_char))
+                for span in self._match_objects(doc) if span.root.dep_ in self._relations]
+
+    def _analyze_entities_without_parser(self, doc):
+        """
+        Approximates the entities of :meth:`_analyze_entities` without dependency relations: all speaker and
+        hearer pronouns, and object nouns that are neither part of a compound nor the object of a preposition.
+        """
+        entities = [Entity(token.text, type, (token.idx, token.idx + len(token.text)))
+                    for token, type in ((token, self._pronoun_type(token)) for token in doc) if type]
+        entities += [Entity(span.text, EntityType.OBJECT, (span.start_char, span.end_char))
+                     for span in self._match_objects(doc) if self._is_argument(doc, span)]
+
+        return sorted(entities, key=lambda entity: entity.segment)
+
+    def _is_argument(self, doc, span):
+        if span[-1].pos_ not in _NOUN_POS:
+            return False
+        if span.end < len(doc) and doc[span.end].pos_ in _NOUN_POS:
+            return False
+
+        start = span.start
+        while start > 0 and doc[start - 1].pos_ in _MODIFIER_POS:
+            start -= 1
+
+        return start == 0 or doc[start - 1].pos_ != "ADP"
+
+
+def create_spacy_nlp(model: str, language: str = "en", parser: bool = True,
+                     tiered: bool = False, tiered_max_tokens: int = 3,
+                     chunked: bool = False, chunked_max_length: int = 2000, chunked_min_length: int = 1000,
+                     chunked_workers: int = None, chunked_processes: bool = True) -> NLP:
+    """
+    Create a :class:`SpacyNLP`, optionally wrapped in a :class:`ChunkedNLP` and a :class:`TieredNLP`.
+
+    The wrappers are part of the model id, the same arguments must be used wherever results of the NLP are
+    shared, e.g. in the :class:`cltl.nlp.cache.NLPCache`.
+
+    Parameters
+    ----------
+    model : str
+        The spaCy model to use.
+    language : str
+        Language of the model, used to select the stop words of the tiered NLP.
+    parser : bool
+        Whether to load the dependency parser.
+    tiered : bool
+        Analyze short texts with cheaper tiers, see :class:`TieredNLP`.
+    tiered_max_tokens : int
+        Maximum number of tokens of texts handled by the cheaper tiers.
+    chunked : bool
+        Analyze long texts in chunks in parallel, see :class:`ChunkedNLP`.
+    chunked_max_length : int
+        Maximum length of the chunks.
+    chunked_min_length : int
+        Minimum length of the chunks.
+    chunked_workers : int
+        Number of parallel workers, by default the number of CPUs.
+    chunked_processes : bool
+        Analyze the chunks in worker processes instead of threads.
+    """
+    nlp = SpacyNLP(model, parser=parser)
+
+    if chunked:
+        # spaCy holds the GIL for most of the analysis, chunks are analyzed in parallel only in processes
+        nlp_factory = functools.partial(SpacyNLP, model, parser=parser) if chunked_processes else None
+        nlp = ChunkedNLP(nlp, max_length=chunked_max_length, min_length=chunked_min_length,
+                         workers=chunked_workers, nlp_factory=nlp_factory)
+
+    if tiered:
+        nlp = TieredNLP(nlp, max_tokens=tiered_max_tokens, language=language)
+
+    return nlp
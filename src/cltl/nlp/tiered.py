@@ -0,0 +1,138 @@
+import logging
+import re
+import threading
+from collections import Counter
+from typing import Dict, Iterable, Mapping
+
+from cltl.nlp.api import NLP, Doc, ObjectType
+from cltl.nlp.object_label_translation import OBJECT_SYNONYMS
+from cltl.nlp.pool import stop_words as language_stop_words
+
+logger = logging.getLogger(__name__)
+
+
+TIER_TOKENS = "tokens"
+TIER_FULL = "full"
+
+_WORD = re.compile(r"[\w'-]+")
+
+_BACKCHANNELS = ("ok", "okay", "yes", "yeah", "yep", "yup", "no", "nope", "mm", "mmm", "hm", "hmm", "mhm",
+                 "mm-hmm", "uh-huh", "uh", "um", "uhm", "ah", "oh", "right", "sure", "alright", "thanks",
+                 "thank", "cool", "great", "nice", "fine", "hi", "hello", "hey", "bye", "goodbye", "ja", "nee")
+_PRONOUNS = ("i", "you", "me", "my", "mine", "myself", "your", "yours", "yourself", "ik", "jij", "je", "u")
+
+
+def _object_words(object_synonyms: Mapping[str, Iterable[str]]) -> Iterable[str]:
+    terms = [object_type.value for object_type in ObjectType]
+    terms += [synonym for synonyms in object_synonyms.values() for synonym in synonyms if synonym]
+
+    # Multi-word terms only match if their last word is present
+    for words in filter(None, (_WORD.findall(term.lower()) for term in terms)):
+        yield words[-1]
+        yield words[-1] + "s"
+        yield words[-1] + "es"
+
+
+class TieredNLP(NLP):
+    """
+    Runs a fast lexical pre-check before the full analysis of a text.
+
+    Texts that consist only of backchannels and stop words, and short texts without pronouns, object terms,
+    capitalized words (after the first word) or numbers are only tokenized, as the full analysis would not
+    yield entities for them. All other texts are fully analyzed. The share of texts on each tier is logged
+    every `report_interval` texts and is available from :meth:`tier_shares`.
+
+    Note that named entities in short texts that consist of a single capitalized word, e.g. "Paris", are
+    not detected on the tokens tier.
+    """
+    def __init__(self, nlp: NLP, max_tokens: int = 3, backchannels: Iterable[str] = _BACKCHANNELS,
+                 stop_words: Iterable[str] = None, pronouns: Iterable[str] = _PRONOUNS,
+                 object_synonyms: Mapping[str, Iterable[str]] = None, report_interval: int = 1000,
+                 language: str = "en"):
+        """
+        Parameters
+        ----------
+        nlp : NLP
+            The NLP used for tokenization and full analysis.
+        max_tokens : int
+            Maximum number of words of a text without entity indicators that is only tokenized.
+        backchannels : Iterable[str]
+            Backchannels and interjections, e.g. "ok" or "mm-hmm".
+        stop_words : Iterable[str]
+            Function words that don't indicate entities, by default the stop words of the `language`.
+        pronouns : Iterable[str]
+            Pronouns that indicate speaker or hearer entities.
+        object_synonyms : Mapping[str, Iterable[str]]
+            Additional surface forms of object types by `ObjectType` value, by default the translations of
+            object types for the `language`, if available.
+        report_interval : int
+            Number of texts after which the share of texts on each tier is logged.
+        language : str
+            The language of the texts analyzed by the `nlp`.
+        """
+        if stop_words is None:
+            stop_words = language_stop_words(language)
+        if object_synonyms is None:
+            object_synonyms = OBJECT_SYNONYMS.get(language, {})
+
+        self._nlp = nlp
+        self._max_tokens = max_tokens
+        self._function_words = frozenset(word.lower() for word in backchannels) \
+                               | frozenset(word.lower() for word in stop_words)
+        self._entity_words = frozenset(word.lower() for word in pronouns) | frozenset(_object_words(object_synonyms))
+        self._report_interval = report_interval
+
+        self._tiers = Counter()
+        self._lock = threading.Lock()
+
+    @property
+    def model_id(self) -> str:
+        return f"{self._nlp.model_id}+tiered"
+
+    def analyze(self, text: str) -> Doc:
+        tier = self.tier(text)
+        self._count(tier)
+
+        if tier == TIER_TOKENS:
+            return self._nlp.tokenize(text)
+
+        return self._nlp.analyze(text)
+
+    def tokenize(self, text: str) -> Doc:
+        return self._nlp.tokenize(text)
+
+    def close(self) -> None:
+        self._nlp.close()
+
+    def tier(self, text: str) -> str:
+        """The tier on which the text is analyzed."""
+        words = _WORD.findall(text)
+        lower_words = [word.lower() for word in words]
+
+        if any(word in self._entity_words for word in lower_words):
+            return TIER_FULL
+        if any(char.isdigit() for word in words for char in word):
+            return TIER_FULL
+        if any(word[0].isupper() and lower not in self._function_words
+               for word, lower in zip(words[1:], lower_words[1:])):
+            return TIER_FULL
+
+        content_words = [word for word in lower_words if word not in self._function_words]
+        if not content_words or len(words) <= self._max_tokens:
+            return TIER_TOKENS
+
+        return TIER_FULL
+
+    def tier_shares(self) -> Dict[str, float]:
+        with self._lock:
+            total = sum(self._tiers.values())
+            return {tier: self._tiers[tier] / total if total else 0.0 for tier in (TIER_TOKENS, TIER_FULL)}
+
+    def _count(self, tier: str):
+        with self._lock:
+            self._tiers[tier] += 1
+            total = sum(self._tiers.values())
+
+        if self._report_interval and total % self._report_interval == 0:
+            logger.info("Analyzed %s texts, share per tier: %s", total,
+                        {tier: round(share, 3) for tier, share in self.tier_shares().items()})
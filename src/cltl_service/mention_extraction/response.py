@@ -0,0 +1,94 @@
+import logging
+from typing import Any, List
+
+from cltl.combot.event.emissor import TextSignalEvent
+from cltl.commons.discrete import UtteranceType
+from cltl.combot.infra.config import ConfigurationManager
+from cltl.combot.infra.event import Event, EventBus
+from cltl.combot.infra.resource import ResourceManager
+from cltl.combot.infra.time_util import timestamp_now
+from cltl.combot.infra.topic_worker import TopicWorker
+from emissor.representation.scenario import TextSignal
+
+from cltl.mention_extraction.response import ResponseGenerator, PhraseResponseGenerator
+from cltl_service.publishing.coalescing import unbatch
+
+logger = logging.getLogger(__name__)
+
+
+def _get(obj: Any, key: str) -> Any:
+    return obj.get(key) if isinstance(obj, dict) else getattr(obj, key, None)
+
+
+class ObjectResponseService:
+    """
+    Service that responds to object mentions published by the MentionExtractionService with a text signal.
+
+    Input events with a :class:`BatchEvent` payload, if coalescing is enabled for the output topic of the
+    MentionExtractionService, are processed as separate events.
+    """
+    @classmethod
+    def from_config(cls, response_generator: ResponseGenerator, event_bus: EventBus,
+                    resource_manager: ResourceManager, config_manager: ConfigurationManager):
+        config = config_manager.get_config("cltl.mention_extraction.response")
+
+        return cls(config.get("topic_in"), config.get("topic_out"), response_generator, event_bus, resource_manager)
+
+    @classmethod
+    def for_language(cls, language: str, event_bus: EventBus, resource_manager: ResourceManager,
+                     config_manager: ConfigurationManager):
+        return cls.from_config(PhraseResponseGenerator(language), event_bus, resource_manager, config_manager)
+
+    def __init__(self, input_topic: str, output_topic: str, response_generator: ResponseGenerator,
+                 event_bus: EventBus, resource_manager: ResourceManager):
+        self._response_generator = response_generator
+
+        self._event_bus = event_bus
+        self._resource_manager = resource_manager
+
+        self._input_topic = input_topic
+        self._output_topic = output_topic
+
+        self._topic_worker = None
+
+    def start(self):
+        self._topic_worker = TopicWorker([self._input_topic], self._event_bus, provides=[self._output_topic],
+                                         buffer_size=4,
+                                         resource_manager=self._resource_manager, processor=self._process,
+                                         name=self.__class__.__name__)
+        self._topic_worker.start().wait()
+
+    def stop(self):
+        if not self._topic_worker:
+            return
+
+        self._topic_worker.stop()
+        self._topic_worker.await_stop()
+        self._topic_worker = None
+
+    def _process(self, event: Event[List[dict]]):
+        for single_event in unbatch(event):
+            self._respond(single_event)
+
+    def _respond(self, event: Event[List[dict]]):
+        object_mentions = [mention for mention in event.payload if self._is_object_mention(mention)]
+        if not object_mentions:
+            return
+
+        utterance = self._response_generator.respond([_get(_get(mention, "item"), "label")
+                                                      for mention in object_mentions])
+        if not utterance:
+            return
+
+        scenario_id = _get(object_mentions[0], "context_id")
+        signal = TextSignal.for_scenario(scenario_id, timestamp_now(), timestamp_now(), None, utterance)
+        self._event_bus.publish(self._output_topic, Event.for_payload(TextSignalEvent.for_agent(signal)))
+        logger.debug("Responded to %s object mentions in scenario %s", len(object_mentions), scenario_id)
+
+    def _is_object_mention(self, mention: Any) -> bool:
+        if _get(mention, "utterance_type") != UtteranceType.IMAGE_MENTION:
+            return False
+
+        item_type = _get(_get(mention, "item"), "type")
+
+        return bool(item_type) and "face" not in item_type
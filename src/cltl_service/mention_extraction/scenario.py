@@ -0,0 +1,168 @@
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterable, Optional, Set
+
+from cltl.combot.infra.time_util import timestamp_now
+
+logger = logging.getLogger(__name__)
+
+
+def get_scenario_id(payload: Any) -> Optional[str]:
+    """
+    Get the scenario identifier from an event payload if it is available.
+
+    Uses an explicit `scenario_id` attribute of the payload, the scenario of scenario events or
+    the scenario of the signal contained in the payload.
+    """
+    scenario_id = getattr(payload, "scenario_id", None)
+    if scenario_id:
+        return scenario_id
+
+    scenario = getattr(payload, "scenario", None)
+    if scenario and getattr(scenario, "id", None):
+        return scenario.id
+
+    signal = getattr(payload, "signal", None)
+    if signal and getattr(signal, "time", None):
+        return signal.time.container_id
+
+    return None
+
+
+class SignalScenarios:
+    """
+    Keeps the scenario of recent signals, to resolve the scenario of events that only refer to a signal.
+
+    Face and object recognition events contain mentions with a segment of the image signal, but no
+    scenario information. Their scenario is resolved from the container of the mention segments, if the
+    signal was registered with :meth:`add`. At most `max_signals` signals are kept.
+    """
+    def __init__(self, max_signals: int = 1024):
+        self._max_signals = max_signals
+        self._signals = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._signals)
+
+    def add(self, signal: Any) -> None:
+        scenario_id = getattr(getattr(signal, "time", None), "container_id", None)
+        if not scenario_id:
+            return
+
+        self._signals[signal.id] = scenario_id
+        self._signals.move_to_end(signal.id)
+        while len(self._signals) > self._max_signals:
+            self._signals.popitem(last=False)
+
+    def resolve(self, payload: Any) -> Optional[str]:
+        """
+        The scenario of the payload, see :func:`get_scenario_id`, of the signal referred to by a `signal_id`
+        attribute or of the signals its mentions refer to.
+        """
+        scenario_id = get_scenario_id(payload)
+        if scenario_id:
+            return scenario_id
+
+        signal_id = getattr(payload, "signal_id", None)
+        if signal_id and signal_id in self._signals:
+            return self._signals[signal_id]
+
+        for mention in getattr(payload, "mentions", None) or ():
+            for segment in getattr(mention, "segment", None) or ():
+                scenario_id = self._signals.get(getattr(segment, "container_id", None))
+                if scenario_id:
+                    return scenario_id
+
+        return None
+
+
+@dataclass
+class ScenarioState:
+    """
+    State of the MentionExtractionService that is scoped to a single scenario.
+    """
+    scenario_id: str
+    active_intentions: Set[str] = field(default_factory=set)
+    object_event_cnt: int = 0
+    last_active: int = field(default_factory=timestamp_now)
+
+
+class ScenarioRegistry:
+    """
+    Keeps the state of concurrently active scenarios.
+
+    Scenarios are kept in order of their last activity. If the number of scenarios exceeds
+    `max_scenarios`, the least recently active scenario is evicted. Scenarios without activity
+    for more than `idle_timeout` seconds are evicted on :meth:`evict_idle`.
+    Evicted and stopped scenarios are reported to the `on_remove` callback.
+    """
+    def __init__(self, max_scenarios: int = None, idle_timeout: float = None,
+                 on_remove: Callable[[str], None] = None):
+        self._scenarios = OrderedDict()
+        self._max_scenarios = max_scenarios
+        self._idle_timeout_ms = int(idle_timeout * 1000) if idle_timeout else None
+        self._on_remove = on_remove
+
+    def __contains__(self, scenario_id: str) -> bool:
+        return scenario_id in self._scenarios
+
+    def __len__(self) -> int:
+        return len(self._scenarios)
+
+    @property
+    def scenario_ids(self) -> Iterable[str]:
+        return tuple(self._scenarios.keys())
+
+    @property
+    def states(self) -> Iterable[ScenarioState]:
+        """The states of all scenarios, without updating their activity."""
+        return tuple(self._scenarios.values())
+
+    @property
+    def current(self) -> Optional[ScenarioState]:
+        """The most recently active scenario, if any."""
+        return next(reversed(self._scenarios.values())) if self._scenarios else None
+
+    def start(self, scenario_id: str, active_intentions: Set[str] = None) -> ScenarioState:
+        if scenario_id in self._scenarios:
+            return self.get(scenario_id)
+
+        state = ScenarioState(scenario_id, set(active_intentions) if active_intentions else set())
+        self._scenarios[scenario_id] = state
+        logger.info("Started scenario %s (%s active)", scenario_id, len(self._scenarios))
+
+        while self._max_scenarios and len(self._scenarios) > self._max_scenarios:
+            evicted_id = next(iter(self._scenarios))
+            logger.warning("Maximum of %s concurrent scenarios reached, evicting scenario %s",
+                           self._max_scenarios, evicted_id)
+            self.remove(evicted_id)
+
+        return state
+
+    def get(self, scenario_id: str) -> Optional[ScenarioState]:
+        state = self._scenarios.get(scenario_id)
+        if state:
+            state.last_active = timestamp_now()
+            self._scenarios.move_to_end(scenario_id)
+
+        return state
+
+    def remove(self, scenario_id: str) -> Optional[ScenarioState]:
+        state = self._scenarios.pop(scenario_id, None)
+        if state and self._on_remove:
+            self._on_remove(scenario_id)
+
+        return state
+
+    def evict_idle(self, now: int = None) -> None:
+        if not self._idle_timeout_ms:
+            return
+
+        now = now if now is not None else timestamp_now()
+        while self._scenarios:
+            scenario_id, state = next(iter(self._scenarios.items()))
+            if now - state.last_active <= self._idle_timeout_ms:
+                break
+            logger.info("Evicting idle scenario %s", scenario_id)
+            self.remove(scenario_id)
@@ -1,58 +1,50 @@
 import logging
-from dataclasses import asdict
-from typing import List
+import threading
+import time
+import warnings
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, List, Optional, Tuple
 
 import cltl_service.face_emotion_extraction.schema
 from cltl.combot.event.emissor import AnnotationEvent, ScenarioEvent, ScenarioStarted, ScenarioStopped
 from cltl.combot.infra.config import ConfigurationManager
 from cltl.combot.infra.event import Event, EventBus
 from cltl.combot.infra.resource import ResourceManager
-from cltl.combot.infra.topic_worker import TopicWorker
 from cltl_service.emotion_extraction.schema import EmotionRecognitionEvent
 from cltl_service.object_recognition.schema import ObjectRecognitionEvent
 from cltl_service.vector_id.schema import VectorIdentityEvent
 from emissor.representation.scenario import class_type
 
 from cltl.mention_extraction.api import MentionExtractor
-from cltl.mention_extraction import object_label_translation
+from cltl.mention_extraction.face_join import FaceJoin
+from cltl_service.mention_extraction.scenario import ScenarioRegistry, SignalScenarios, get_scenario_id
+from cltl_service.mention_extraction.sharding import ScenarioShard, ScenarioHandoff, ShardedEventBus, ShardRouter
+from cltl_service.mention_extraction.snapshot import ScenarioSnapshot, ServiceSnapshot, SnapshotStore
+from cltl_service.monitoring.memory import MemoryWatchdog
+from cltl_service.monitoring.tracing import Tracer, activate, span, trace_serialization
+from cltl_service.publishing.coalescing import CoalescingEventBus, unbatch
+from cltl_service.scheduling.staleness import StalenessPolicy, StalenessAwareTopicWorker
 
 logger = logging.getLogger(__name__)
 
 
-_OBJECT_RESPONSE = {        
-        "tas": ["wat een mooie tas","waar heb je die tas gekocht"],
-        "bril": ["mooie bril, van Hans?"],
-        "stropdas": ["wat een bijzondere stropdas"],
-        "jas": ["een leuk jas heb je aan", "Die jas staat u geweldig", "We hebben een mooie garderobe als u uw jas kwijt wilt"],
-        "rugzak": ["wat een fantastische rugzak","Passen er veel spullen in die mooie rugzak?", "Waar heeft u die mooie rugzak gekocht?"],
-        "paraplu": ["Jeetje, regent het buiten?", "Heeft u die paraplu nodig gehad vandaag?", "Wat een mooie paraplu heeft u"],
-        "wijnglas": ["Helaas mag uw consumptie niet mee de zaal in", "Houd uw wijnglas alstublieft niet in mijn buurt", "Houd u over het algemeen meer van witte of rode wijn?"],
-        "koffer": ["Bent u net op reis geweest met die mooie koffer?", "Wat een mooie koffer", "Wat een stijlvolle koffer"],
-        "boek": ["Wat voor leuks leest u?", "U zult uw boek niet nodig hebben in deze leuke voorstelling", "Bent u een lezer? bekijk vooral dan ook ons programmaboekje"],
-        "telefoon": ["Vergeet uw telefoon niet uit te zetten tijdens de voorstelling", "Mooie telefoon heeft u, die heeft vast veel gekost", "Mag ik ook eens bellen met uw telefoon?"],
-        "knuffelbeer": ["Wat een lieve knuffel heb jij"],
-        "bril": ["Wat voor sterkte heeft u?", "Zo een mooie bril heb ik nog nooit gezien"],
-        "tas": ["Is die tas wel van u?", "U kunt uw tas ook achterlaten bij de garderobe"], 
-        "tanden": ["Wat een mooie glimlach heeft u!", "Wat een mooie mond met tanden heeft u. U zou niet misstaan in een Colgate reclame"],
-        "cup": ["Helaas mag uw consumptie niet mee de zaal in", "Houd uw kop alstublieft niet in mijn buurt", "Houd u over het algemeen meer van koffie of thee?"],
-        "handbag": ["wat een mooie tas","waar heb je die tas gekocht"],
-        "glasses": ["mooie bril, van Hans?"],
-        "tie": ["wat een bijzondere stropdas"],
-        "coat": ["een leuk jas heb je aan", "Die jas staat u geweldig", "We hebben een mooie garderobe als u uw jas kwijt wilt"],
-        "backpack": ["wat een fantastische rugzak","Passen er veel spullen in die mooie rugzak?", "Waar heeft u die mooie rugzak gekocht?"],
-        "umbrella": ["Jeetje, regent het buiten?", "Heeft u die paraplu nodig gehad vandaag?", "Wat een mooie paraplu heeft u."],
-        "wine glass": ["Helaas mag uw consumptie niet mee de zaal in", "Houd uw wijnglas alstublieft niet in mijn buurt", "Houd u over het algemeen meer van witte of rode wijn?"],
-        "suitcase": ["Bent u net op reis geweest met die mooie koffer?", "Wat een mooie koffer", "Wat een stijlvolle koffer"],
-        "book": ["Wat voor leuks leest u?", "U zult uw boek niet nodig hebben in deze leuke voorstelling", "Bent u een lezer? bekijk vooral dan ook ons programmaboekje"],
-        "cell phone": ["Vergeet uw telefoon niet uit te zetten tijdens de voorstelling", "Mooie telefoon heeft u, die heeft vast veel gekost", "Mag ik ook eens bellen met uw telefoon?", "Je mag wel een selfie nemen met je telefoon. Smile.", "Wil je misschien een selfie nemen? Vind ik geen probleem hoor."],
-        "teddy bear": ["Wat een lieve knuffel heb jij"],
-        "bird": ["Zie ik daar nu een vogel?", "Wat doet een vogel nu hier? Zie jij die ook?", "Kijk daar, een vogel."],
-        "laptop": ["Waarom heb jij een laptop bij je? Stop nu eens met werken", "Wat een mooie laptop. Programmeer jij zelf ook?", "Is die laptop van jou?"],
-        "glasses": ["Wat voor sterkte heeft u?", "Zo een mooie bril heb ik nog nooit gezien"],
-        "tas": ["Is die tas wel van u?", "U kunt uw tas ook achterlaten bij de garderobe"], 
-        "tanden": ["Wat een mooie glimlach heeft u!", "Wat een mooie mond met tanden heeft u. U zou niet misstaan in een Colgate reclame"]
-    }
-    
+_FORWARDED_BUFFER_SIZE = 1024
+
+_DATA_EVENT_TYPES = frozenset([AnnotationEvent.__name__, VectorIdentityEvent.__name__,
+                               ObjectRecognitionEvent.__name__, class_type(EmotionRecognitionEvent),
+                               class_type(cltl_service.face_emotion_extraction.schema.EmotionRecognitionEvent)])
+
+
+@dataclass
+class _Extraction:
+    """Mentions of an input event, extracted together with the mentions of consecutive events of the same type."""
+    extract_batch: Callable
+    mentions: list
+    scenario_id: str
+    index: Optional[Dict[str, Tuple[int, int]]] = None
+    join: Optional[Callable] = None
+
 
 class MentionExtractionService:
     """
@@ -62,8 +54,8 @@ class MentionExtractionService:
     def from_config(cls, mention_extractor: MentionExtractor,
                     event_bus: EventBus,
                     resource_manager: ResourceManager,
-                    config_manager: ConfigurationManager):
-        langconfig = config_manager.get_config("cltl.language")
+                    config_manager: ConfigurationManager,
+                    tracer: Tracer = None):
         config = config_manager.get_config("cltl.mention_extraction.events")
         object_rate = int(config.get("object_rate"))
         input_topics = config.get("topics_in", multi=True)
@@ -72,141 +64,532 @@ class MentionExtractionService:
         scenario_topic = config.get("topic_scenario")
         intentions = config.get("intentions", multi=True)
         intention_topic = config.get("topic_intention")
-        language = langconfig.get("language")
+        signal_topics = config.get("topics_signal", multi=True) if "topics_signal" in config else []
+
+        max_scenarios = config.get_int("max_scenarios") if "max_scenarios" in config else None
+        scenario_timeout = config.get_float("scenario_timeout") if "scenario_timeout" in config else None
+
+        shard = None
+        handoff_topic = None
+        router = None
+        if config_manager.has_config("cltl.mention_extraction.sharding"):
+            shard_config = config_manager.get_config("cltl.mention_extraction.sharding")
+            shard = ScenarioShard(shard_config.get("replica_id"), shard_config.get("replicas", multi=True))
+            handoff_topic = shard_config.get("topic_handoff")
+            sharded_topics = input_topics + [scenario_topic, intention_topic, handoff_topic]
+            sharded_event_bus = ShardedEventBus(event_bus, shard, [topic for topic in sharded_topics if topic])
+            if shard_config.get_boolean("route"):
+                router = ShardRouter(event_bus, sharded_event_bus, [topic for topic in sharded_topics
+                                                                    if topic and topic != handoff_topic])
+            event_bus = sharded_event_bus
+
+        memory_watchdog = MemoryWatchdog.from_config(cls.__name__, config_manager, "cltl.mention_extraction.memory")
+        staleness = StalenessPolicy.from_config(config_manager, "cltl.mention_extraction.staleness")
+        # The output topic is consumed outside of this package, batches are only published on it if it is
+        # listed explicitly in the topics of the coalescing configuration
+        event_bus = CoalescingEventBus.from_config(event_bus, config_manager, "cltl.mention_extraction.coalescing",
+                                                   [])
+        if not tracer:
+            tracer = Tracer.from_config(cls.__name__, config_manager, "cltl.mention_extraction.tracing")
+
+        face_join = None
+        if config_manager.has_config("cltl.mention_extraction.face_join"):
+            join_config = config_manager.get_config("cltl.mention_extraction.face_join")
+            if join_config.get_boolean("enabled"):
+                window = join_config.get_float("window") if "window" in join_config else 0.5
+                max_pending = join_config.get_int("max_pending") if "max_pending" in join_config else 256
+                key = join_config.get("key") if "key" in join_config else "mention"
+                face_join = FaceJoin(window, max_pending, key)
+
+        snapshots = SnapshotStore.from_config(config_manager, "cltl.mention_extraction.snapshot")
 
         return cls(mention_extractor, scenario_topic, input_topics, output_topic, intentions, intention_topic,
-                   event_bus, resource_manager, language, object_rate)
+                   event_bus, resource_manager, object_rate=object_rate, max_scenarios=max_scenarios,
+                   scenario_timeout=scenario_timeout, shard=shard, handoff_topic=handoff_topic, router=router, memory_watchdog=memory_watchdog, staleness=staleness,
+                   tracer=tracer, face_join=face_join, snapshots=snapshots, signal_topics=signal_topics)
 
     def __init__(self, mention_extractor: MentionExtractor,
                  scenario_topic: str, input_topics: List[str], output_topic: str, intentions: List[str], intention_topic: str,
-                 event_bus: EventBus, resource_manager: ResourceManager, language: str = "en", object_rate: int = 5):
+                 event_bus: EventBus, resource_manager: ResourceManager, language: str = None, object_rate: int = 5,
+                 *, max_scenarios: int = None, scenario_timeout: float = None,
+                 shard: ScenarioShard = None, handoff_topic: str = None,
+                 handoff: Callable[[ScenarioHandoff], None] = None, router: ShardRouter = None,
+                 memory_watchdog: MemoryWatchdog = None, staleness: StalenessPolicy = None, tracer: Tracer = None,
+                 face_join: FaceJoin = None, snapshots: SnapshotStore = None, signal_topics: List[str] = None):
+        """
+        The `language` is deprecated and ignored, responses to object mentions are generated by the
+        :class:`ObjectResponseService`.
+
+        Events are assigned to a scenario by their payload, see :func:`get_scenario_id`. Face and object events
+        are assigned to the scenario of the image signal their mentions refer to, which requires the image
+        signal events to be received on one of the `signal_topics`. If only a single scenario is active and
+        sharding is disabled, events without scenario information are assigned to that scenario, otherwise
+        they are dropped.
+
+        Sharding is enabled by providing a `shard`, in which case the `event_bus` is expected to be a
+        :class:`ShardedEventBus` for the input topics of the service. Only events of scenarios owned by
+        the shard are processed, other events are forwarded to the owning replica, or skipped if they were
+        published to all replicas. When the shard
+        members change, the state of scenarios that moved to another replica is passed to the `handoff`
+        callback, by default it is published on the `handoff_topic`.
+
+        If a `memory_watchdog` is provided, it is run while the service is started and reports the size
+        of the state kept by the service and the mention extractor, and the number of buffered input events.
+
+        With a `staleness` policy, events older than the budget of their topic are dropped before processing.
+        Budgets should only be configured for input topics, not for scenario, intention or handoff events.
+
+        Input events with a :class:`BatchEvent` payload, published by a :class:`CoalescingEventBus`, are
+        processed as separate events. Consecutive events of the same type in a batch are extracted together
+        with the batch methods of the :class:`MentionExtractor`, control events in between are applied in
+        order. If the `event_bus` is a :class:`CoalescingEventBus` itself, buffered
+        events are flushed when the service is stopped.
+
+        With a `tracer`, spans for the time in the queue, serialization and publishing are recorded for
+        annotation events with a `trace_id`. Spans for filtering and creation are recorded if the tracer is
+        also passed to the mention extractor.
+
+        With a `face_join`, face identity mentions and face perspectives of the same face in a camera frame
+        are published as a single record. Faces buffered by the join are published after its window expired,
+        when their scenario stops and when the service is stopped.
+
+        With a `snapshots` store, the state of the service and the mention extractor is written periodically
+        and when the service is stopped. On start, scenarios of a valid snapshot are restored, such that after
+        a restart events of the same scenario are processed with the previous state, e.g. faces and objects
+        that were already seen are not mentioned again. Snapshots are captured and written in a background
+        thread.
+        """
+        if language is not None:
+            warnings.warn("The language of the MentionExtractionService is ignored, use the ObjectResponseService",
+                          DeprecationWarning, stacklevel=2)
+
         self._event_bus = event_bus
         self._resource_manager = resource_manager
 
         self._mention_extractor = mention_extractor
 
         self._input_topics = input_topics + [scenario_topic, intention_topic]
+        if handoff_topic:
+            self._input_topics.append(handoff_topic)
+        self._signal_topics = set(signal_topics) if signal_topics else set()
+        self._input_topics += [topic for topic in self._signal_topics if topic not in self._input_topics]
         self._output_topic = output_topic
 
         self._intention_topic = intention_topic if intention_topic else None
         self._intentions = set(intentions) if intentions else {}
-        self._active_intentions = {}
+        self._default_intentions = set()
 
         self._topic_worker = None
         self._app = None
 
-        self._scenario_id = None
+        self._scenarios = ScenarioRegistry(max_scenarios, scenario_timeout,
+                                           on_remove=self._mention_extractor.clear_scenario)
+        self._signal_scenarios = SignalScenarios()
+        self._unresolved = 0
+        if not self._signal_topics and (shard or max_scenarios != 1):
+            logger.warning("No signal topics configured, face and object events can only be assigned to a "
+                           "scenario if a single scenario is active and sharding is disabled, otherwise they "
+                           "are dropped")
 
-        self._object_event_cnt = 0
         self._object_rate = object_rate
 
-        self._language = language
+        self._shard = shard
+        self._handoff_topic = handoff_topic
+        self._handoff = handoff if handoff else self._publish_handoff
+        self._router = router
+        self._forwarded = OrderedDict()
+        self._lock = threading.RLock()
+
+        self._staleness = staleness
+        self._tracer = tracer
+
+        self._face_join = face_join
+        self._face_join_stop = threading.Event()
+        self._face_join_thread = None
+
+        self._snapshots = snapshots
+
+        self._memory_watchdog = memory_watchdog
+        if self._memory_watchdog:
+            self._memory_watchdog.register_state("service", self._state_sizes)
+            self._memory_watchdog.register_state("extractor", self._extractor_state_sizes)
 
     def start(self):
-        self._topic_worker = TopicWorker(self._input_topics, self._event_bus, provides=[self._output_topic],
-                                         buffer_size=64,
-                                         resource_manager=self._resource_manager, processor=self._process,
-                                         name=self.__class__.__name__)
+        if self._memory_watchdog:
+            self._memory_watchdog.start()
+        if self._router:
+            self._router.start()
+        if self._snapshots:
+            self._restore(self._snapshots.load())
+
+        self._topic_worker = StalenessAwareTopicWorker(self._input_topics, self._event_bus,
+                                                       provides=[self._output_topic],
+                                                       buffer_size=64,
+                                                       resource_manager=self._resource_manager,
+                                                       processor=self._process,
+                                                       name=self.__class__.__name__,
+                                                       staleness=self._staleness,
+                                                       on_dequeue=self._trace_queue if self._tracer else None)
         self._topic_worker.start().wait()
 
+        if self._face_join is not None:
+            self._face_join_stop.clear()
+            self._face_join_thread = threading.Thread(target=self._expire_faces, name="FaceJoin", daemon=True)
+            self._face_join_thread.start()
+
+        if self._snapshots:
+            self._snapshots.start(self._snapshot)
+
     def stop(self):
         if not self._topic_worker:
-            pass
+            return
 
         self._topic_worker.stop()
         self._topic_worker.await_stop()
         self._topic_worker = None
 
+        if self._face_join_thread:
+            self._face_join_stop.set()
+            self._face_join_thread.join()
+            self._face_join_thread = None
+            with self._lock:
+                self._publish_mentions(self._face_join.flush())
+
+        if self._snapshots:
+            self._snapshots.stop()
+
+        if self._router:
+            self._router.stop()
+        if isinstance(self._event_bus, CoalescingEventBus):
+            self._event_bus.close()
+        if self._tracer:
+            self._tracer.close()
+        if self._memory_watchdog:
+            self._memory_watchdog.stop()
+
+    @property
+    def dropped(self) -> int:
+        """
+        Number of input events dropped because the buffer was full, they were stale or their scenario could not
+        be resolved. Events without mentions after filtering by the mention detectors are not counted.
+        """
+        topic_worker = self._topic_worker
+
+        return (topic_worker.dropped if topic_worker else 0) + self._unresolved
+
+    def _state_sizes(self):
+        topic_worker = self._topic_worker
+        with self._lock:
+            return {
+                "buffer": topic_worker.buffered if topic_worker else 0,
+                "scenarios": len(self._scenarios),
+                "active_intentions": sum(len(scenario.active_intentions) for scenario in self._scenarios.states),
+                "forwarded": len(self._forwarded),
+                "signals": len(self._signal_scenarios),
+                "face_join": len(self._face_join) if self._face_join is not None else 0,
+            }
+
+    def _extractor_state_sizes(self):
+        with self._lock:
+            return self._mention_extractor.state_sizes()
+
+    def _snapshot(self) -> ServiceSnapshot:
+        with self._lock:
+            scenarios = [ScenarioSnapshot(scenario.scenario_id, sorted(scenario.active_intentions),
+                                          scenario.object_event_cnt,
+                                          self._mention_extractor.get_scenario_state(scenario.scenario_id))
+                         for scenario in self._scenarios.states]
+
+            return ServiceSnapshot.create(self._default_intentions, scenarios)
+
+    def _restore(self, snapshot: Optional[ServiceSnapshot]):
+        if not snapshot:
+            return
+
+        with self._lock:
+            self._default_intentions = set(snapshot.default_intentions)
+            # Scenarios are stored in order of their activity
+            for scenario_snapshot in snapshot.scenarios:
+                if self._shard and not self._shard.owns(scenario_snapshot.scenario_id):
+                    continue
+                scenario = self._scenarios.start(scenario_snapshot.scenario_id,
+                                                 set(scenario_snapshot.active_intentions))
+                scenario.object_event_cnt = scenario_snapshot.object_event_cnt
+                if scenario_snapshot.extractor_state:
+                    self._mention_extractor.set_scenario_state(scenario_snapshot.scenario_id,
+                                                               scenario_snapshot.extractor_state)
+
+        logger.info("Restored %s scenarios from snapshot %s", len(self._scenarios), self._snapshots.path)
+
+    def _expire_faces(self):
+        while not self._face_join_stop.wait(self._face_join.window / 2):
+            with self._lock:
+                self._publish_mentions(self._face_join.expire())
+
+    def update_shard_members(self, members: List[str]):
+        """
+        Update the members of the shard and hand over scenarios that are no longer owned by this replica.
+        """
+        if not self._shard:
+            raise ValueError("Sharding is not enabled")
+
+        with self._lock:
+            self._shard.update_members(members)
+            for scenario_id in self._scenarios.scenario_ids:
+                if not self._shard.owns(scenario_id):
+                    scenario = self._scenarios.get(scenario_id)
+                    handoff = ScenarioHandoff.create(scenario_id, self._shard.replica_id,
+                                                     self._shard.owner(scenario_id),
+                                                     scenario.active_intentions, scenario.object_event_cnt,
+                                                     self._mention_extractor.get_scenario_state(scenario_id))
+                    self._scenarios.remove(scenario_id)
+                    logger.info("Hand over scenario %s to replica %s", scenario_id, handoff.target)
+                    self._handoff(handoff)
+
+    def _publish_handoff(self, handoff: ScenarioHandoff):
+        if not self._handoff_topic:
+            logger.warning("No handoff topic configured, dropped state of scenario %s", handoff.scenario_id)
+            return
+
+        self._event_bus.publish(self._handoff_topic, Event.for_payload(handoff))
+
+    def _accept_handoff(self, handoff: ScenarioHandoff):
+        scenario = self._scenarios.start(handoff.scenario_id, set(handoff.active_intentions))
+        scenario.object_event_cnt = handoff.object_event_cnt
+        if handoff.extractor_state:
+            self._mention_extractor.set_scenario_state(handoff.scenario_id, handoff.extractor_state)
+        logger.info("Took over scenario %s from replica %s", handoff.scenario_id, handoff.source)
+
+    def _forward(self, event: Event) -> bool:
+        """
+        Forward events of scenarios owned by another replica.
+
+        Events without scenario id in the payload are published to all replicas, they are only processed
+        by the replica owning the scenario of their signal and skipped by the other replicas. Events with
+        a scenario id that are not owned, e.g. after a membership change, are forwarded to the owner once,
+        identified by :func:`_event_key`, and processed locally if they are received again.
+        """
+        scenario_id = self._signal_scenarios.resolve(event.payload)
+        if not scenario_id or self._shard.owns(scenario_id):
+            return False
+
+        if not get_scenario_id(event.payload):
+            logger.debug("Skipped %s of scenario %s owned by replica %s",
+                         event.payload.type, scenario_id, self._shard.owner(scenario_id))
+            return True
+
+        key = _event_key(event)
+        if key in self._forwarded:
+            return False
+
+        self._forwarded[key] = None
+        if len(self._forwarded) > _FORWARDED_BUFFER_SIZE:
+            self._forwarded.popitem(last=False)
+
+        logger.debug("Forward event %s of scenario %s to replica %s",
+                     key, scenario_id, self._shard.owner(scenario_id))
+        self._event_bus.publish(event.metadata.topic, event)
+
+        return True
+
+    def _trace_queue(self, event: Event, received: int):
+        if received is None:
+            return
+
+        now = time.time()
+        for single_event in unbatch(event):
+            trace_id = _trace_id(single_event)
+            if self._tracer.is_sampled(trace_id):
+                self._tracer.record("queue_wait", trace_id, received / 1000, now)
+
     def _process(self, event: Event):
+        with self._lock:
+            pending = []
+            for single_event in unbatch(event):
+                if pending and getattr(single_event.payload, "type", None) not in _DATA_EVENT_TYPES:
+                    self._extract(pending)
+                    pending = []
+
+                trace_id = _trace_id(single_event)
+                with activate(self._tracer, trace_id):
+                    extraction = self._process_event(single_event)
+                    if extraction and self._tracer and self._tracer.is_sampled(trace_id):
+                        # Extract traced events separately to record their spans
+                        self._extract([extraction])
+                        extraction = None
+
+                if not extraction:
+                    continue
+                if pending and pending[-1].extract_batch != extraction.extract_batch:
+                    self._extract(pending)
+                    pending = []
+                pending.append(extraction)
+
+            self._extract(pending)
+
+    def _process_event(self, event: Event) -> Optional[_Extraction]:
+        """
+        Apply control events and return the mentions to be extracted from data events, if any.
+        """
+        self._scenarios.evict_idle()
+
+        if self._handoff_topic and event.metadata.topic == self._handoff_topic:
+            self._accept_handoff(event.payload)
+            return None
+
+        if event.metadata.topic in self._signal_topics:
+            self._signal_scenarios.add(event.payload.signal)
+            return None
+
+        if self._shard and self._forward(event):
+            return None
+
         if event.metadata.topic == self._intention_topic:
-            self._active_intentions = {intention.label for intention in event.payload.intentions}
-            logger.info("Set active intentions to %s", self._active_intentions)
-            return
+            self._set_intentions(event)
+            return None
 
         if event.payload.type == ScenarioStarted.__name__:
-            self._scenario_id = event.payload.scenario.id
-            return
+            self._scenarios.start(event.payload.scenario.id, self._default_intentions)
+            return None
         if event.payload.type == ScenarioStopped.__name__:
-            self._scenario_id = None
-            return
+            if self._face_join is not None:
+                self._publish_mentions(self._face_join.flush(event.payload.scenario.id))
+            self._scenarios.remove(event.payload.scenario.id)
+            return None
         if event.payload.type == ScenarioEvent.__name__:
-            return
+            return None
 
-        if not self._scenario_id:
-            logger.debug("No active scenario, skipping %s", event.payload.type)
-            return
+        scenario_id = self._get_scenario_id(event)
+        if not scenario_id:
+            self._unresolved += 1
+            log = logger.warning if self._unresolved % 100 == 1 else logger.debug
+            log("Dropped %s without scenario information (%s dropped, %s scenarios active)",
+                event.payload.type, self._unresolved, len(self._scenarios))
+            return None
 
-        if self._intentions and not (self._active_intentions & self._intentions):
+        scenario = self._scenarios.get(scenario_id)
+        if not scenario:
+            logger.debug("No active scenario %s, skipping %s", scenario_id, event.payload.type)
+            return None
+
+        if self._intentions and not (scenario.active_intentions & self._intentions):
             logger.debug("Skipped event outside intention %s, active: %s (%s)",
-                         self._intentions, self._active_intentions, event)
-            return
+                         self._intentions, scenario.active_intentions, event)
+            return None
 
-        mention_factory = None
+        extract_batch = None
+        join = None
+        index = None
         if event.payload.type == AnnotationEvent.__name__:
-            mention_factory = self._mention_extractor.extract_text_mentions
+            extract_batch = self._mention_extractor.extract_text_mentions_batch
+            # Index of mentions by annotation type, only provided by the NLPService
+            index = getattr(event.payload, "index", None)
         elif event.payload.type == VectorIdentityEvent.__name__:
-            mention_factory = self._mention_extractor.extract_face_mentions
+            extract_batch = self._mention_extractor.extract_face_mentions_batch
+            join = self._face_join.add_identities if self._face_join is not None else None
         elif event.payload.type == ObjectRecognitionEvent.__name__:
-            if self._object_event_cnt % self._object_rate == 0:
-                mention_factory = self._mention_extractor.extract_object_mentions
-            self._object_event_cnt += 1
+            if scenario.object_event_cnt % self._object_rate == 0:
+                extract_batch = self._mention_extractor.extract_object_mentions_batch
+            scenario.object_event_cnt += 1
         elif event.payload.type == class_type(EmotionRecognitionEvent):
-            mention_factory = self._mention_extractor.extract_text_perspective
+            extract_batch = self._mention_extractor.extract_text_perspective_batch
         elif event.payload.type == class_type(cltl_service.face_emotion_extraction.schema.EmotionRecognitionEvent):
-            mention_factory = self._mention_extractor.extract_face_perspective
+            extract_batch = self._mention_extractor.extract_face_perspective_batch
+            join = self._face_join.add_perspectives if self._face_join is not None else None
         else:
             raise ValueError("Unsupported event type %s", event.payload.type)
 
-        mentions = mention_factory(event.payload.mentions, self._scenario_id) if mention_factory else None
+        if not extract_batch:
+            return None
 
-        if mentions:
-            logger.debug("Detected %s mentions from %s", len(mentions), mention_factory.__name__)
-            self._event_bus.publish(self._output_topic, Event.for_payload([asdict(mention) for mention in mentions]))
-
-        # TODO Temporary code to create a better conversation
-        if mentions and event.payload.type == ObjectRecognitionEvent.__name__:
-            from collections import Counter
-            from random import choice
-            from cltl.combot.infra.time_util import timestamp_now
-            from cltl.combot.event.emissor import TextSignalEvent
-            from emissor.representation.scenario import TextSignal
-
-            logger.debug("Detected %s mentions from %s", len(mentions), mention_factory.__name__)
-            object_counts = Counter(mention.item.label for mention in mentions)
-            GREET = ""
-            FOLLOW_UP =""
-            if self._language=="nl":
-                I_SEE = ["Ik zie", "Zie ik dat goed", "Kijk daar heb je","Wat zie ik nu!"]
-                I_GREET_ONE = ["Kijk een mens. Hoi", "Hallo jij daar", "Hallo hallo. Goed je te zien","Leuk je te zien mens", "Welkom en fijn dat je er bent", "Wat goed dat je gekomen bent", "Nou dat vind ik pas leuk je te zien", "En wie hebben we hier dan", "Kom binnen, kom binnen", "Wat fijn dat je er bent"]
-                I_GREET_TWO = ["He mensen. Ik groet jullie", "Hallo, hoi, goed jullie te zien","Aah dat wordt gezellig met jullie", "Leuk jullie te zien", "Mensen, kom binnen", "Fijn, jullie zijn er ook", "Welkom en fijn dat jullie er zijn", "Wat goed dat jullie gekomen zijn", "Nou dat vind ik pas leuk jullie te zien", "En wie hebben we hier dan", "Kom binnen, kom binnen", "Wat fijn dat jullie er zijn"]
-                dutch_counts = []
-                for object, cnt in object_counts.items():
-                    forms = object_label_translation.to_dutch(object)
-                    dutch_counts.append({'singular': forms[0], 'plural':forms[1], 'cnt': cnt})
-                    if object == "person":
-                        if cnt==1:
-                            GREET = ". "+ choice(I_GREET_ONE)
-                        else:
-                            GREET = ". "+ choice(I_GREET_TWO)
-                    elif object in _OBJECT_RESPONSE:
-                        FOLLOW_UP = ". " + choice(_OBJECT_RESPONSE[object])
-                object_counts = dutch_counts
-                counts = ', '.join([f"{result['cnt'] if result['cnt'] > 1 else 'een'} {result['plural'] if result['cnt']> 1 else result['singular']}"
-                                for result in object_counts])
-                counts = (counts[::-1].replace(' ,', ' ne ', 1))[::-1]
+        return _Extraction(extract_batch, event.payload.mentions, scenario.scenario_id, index, join)
+
+    def _set_intentions(self, event: Event):
+        """
+        Set the active intentions of the scenario of the event, or of all scenarios if the event is not
+        scoped to a scenario, i.e. carries no scenario or signal information. Intentions of events that are
+        not scoped are also used for scenarios started later.
+        """
+        active_intentions = {intention.label for intention in event.payload.intentions}
+
+        scenario_id = self._signal_scenarios.resolve(event.payload)
+        if scenario_id:
+            scenario = self._scenarios.get(scenario_id)
+            if scenario:
+                scenario.active_intentions = active_intentions
+                logger.info("Set active intentions to %s for scenario %s", active_intentions, scenario_id)
             else:
-                I_SEE = ["I see", "I can see", "I think I see", "I observe",]
-                counts = ', '.join([f"{count if count > 1 else 'a'} {label}{'s' if count> 1 else ''}"
-                                    for label, count in object_counts.items()])
-                counts = (counts[::-1].replace(' ,', ' dna ', 1))[::-1]
-                if "person" in object_counts:
-                    cnt = object_counts["person"]
-                    if cnt==1:
-                        GREET = ". Nice to see you human!"
-                    else:
-                        GREET = ". Nice to see you folks!"
-
-            utterance =  f"{choice(I_SEE)} {counts}{GREET}{FOLLOW_UP}"
-
-            signal = TextSignal.for_scenario(self._scenario_id, timestamp_now(), timestamp_now(), None, utterance)
-            self._event_bus.publish("cltl.topic.text_out", Event.for_payload(TextSignalEvent.for_agent(signal)))
+                logger.debug("No active scenario %s, skipping intentions %s", scenario_id, active_intentions)
+            return
+
+        self._default_intentions = active_intentions
+        for scenario in self._scenarios.states:
+            scenario.active_intentions = set(active_intentions)
+        logger.info("Set active intentions to %s for all scenarios (%s active)",
+                    active_intentions, len(self._scenarios))
+
+    def _extract(self, extractions: List[_Extraction]):
+        """
+        Extract the mentions of consecutive events of the same type in a single pass of the mention extractor
+        and publish them per event.
+        """
+        if not extractions:
+            return
+
+        extract_batch = extractions[0].extract_batch
+        batch = [(extraction.mentions, extraction.scenario_id) for extraction in extractions]
+        if extract_batch == self._mention_extractor.extract_text_mentions_batch:
+            results = extract_batch(batch, [extraction.index for extraction in extractions])
+        else:
+            results = extract_batch(batch)
+
+        for extraction, mentions in zip(extractions, results):
+            if extraction.join:
+                mentions = extraction.join(extraction.mentions, mentions, extraction.scenario_id)
+
+            if mentions:
+                logger.debug("Detected %s mentions from %s", len(mentions), extract_batch.__name__)
+                self._publish_mentions(mentions)
+
+    def _publish_mentions(self, mentions):
+        if mentions:
+            payload = [asdict(mention) for mention in mentions]
+            trace_serialization(self._tracer, payload)
+            with span(self._tracer, "publish"):
+                self._event_bus.publish(self._output_topic, Event.for_payload(payload))
+
+    def _get_scenario_id(self, event: Event) -> Optional[str]:
+        """
+        Resolve the scenario an event belongs to.
+
+        Uses the scenario information in the payload or of the signals it refers to if available. Otherwise
+        falls back to the active scenario if that is unambiguous, i.e. there is a single active scenario and
+        no other replica may own other scenarios.
+        """
+        scenario_id = self._signal_scenarios.resolve(event.payload)
+        if scenario_id:
+            return scenario_id
+
+        if not self._shard and len(self._scenarios) == 1:
+            return self._scenarios.current.scenario_id
+
+        return None
+
+
+def _event_key(event: Event) -> str:
+    """
+    Stable id of the payload of an event.
+
+    Events split from a batch get a new event id, therefore the id of the first mention in the payload is
+    used if available.
+    """
+    mentions = getattr(event.payload, "mentions", None)
+    if mentions:
+        return mentions[0].id
+
+    return event.id
+
+
+def _trace_id(event: Event) -> Optional[str]:
+    """Correlation id of the event, provided by the NLPService for annotation events."""
+    return getattr(event.payload, "trace_id", None)
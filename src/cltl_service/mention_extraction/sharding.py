@@ -0,0 +1,188 @@
+import bisect
+import hashlib
+import logging
+from dataclasses import dataclass
+from threading import RLock
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from cltl.combot.infra.event import Event, EventBus
+
+from cltl_service.mention_extraction.scenario import get_scenario_id
+
+logger = logging.getLogger(__name__)
+
+
+def _hash(key: str) -> int:
+    return int(hashlib.md5(key.encode("utf-8")).hexdigest()[:16], 16)
+
+
+class HashRing:
+    """
+    Consistent hash ring that assigns keys to a set of members.
+
+    Each member is placed on the ring with a number of virtual nodes, such that adding or removing
+    a member only moves the keys of that member.
+    """
+    def __init__(self, members: Iterable[str], virtual_nodes: int = 64):
+        self._virtual_nodes = virtual_nodes
+        self._members = tuple(sorted(set(members)))
+        if not self._members:
+            raise ValueError("HashRing requires at least one member")
+
+        nodes = sorted((_hash(f"{member}#{idx}"), member)
+                       for member in self._members for idx in range(virtual_nodes))
+        self._hashes = [node_hash for node_hash, _ in nodes]
+        self._nodes = [member for _, member in nodes]
+
+    @property
+    def members(self) -> Tuple[str, ...]:
+        return self._members
+
+    def owner(self, key: str) -> str:
+        idx = bisect.bisect(self._hashes, _hash(key)) % len(self._hashes)
+
+        return self._nodes[idx]
+
+
+class ScenarioShard:
+    """
+    Membership of a service replica in a sharded deployment.
+
+    A replica owns the scenarios that are assigned to it by consistent hashing of the scenario id.
+    """
+    def __init__(self, replica_id: str, members: Iterable[str], virtual_nodes: int = 64):
+        self._replica_id = replica_id
+        self._virtual_nodes = virtual_nodes
+        self._lock = RLock()
+        self._ring = None
+        self.update_members(members)
+
+    @property
+    def replica_id(self) -> str:
+        return self._replica_id
+
+    @property
+    def members(self) -> Tuple[str, ...]:
+        return self._ring.members
+
+    def update_members(self, members: Iterable[str]) -> None:
+        ring = HashRing(members, self._virtual_nodes)
+        with self._lock:
+            self._ring = ring
+        logger.info("Updated members of shard %s to %s", self._replica_id, ring.members)
+
+    def owner(self, scenario_id: str) -> str:
+        with self._lock:
+            return self._ring.owner(scenario_id)
+
+    def owns(self, scenario_id: str) -> bool:
+        return self.owner(scenario_id) == self._replica_id
+
+    @staticmethod
+    def routing_topic(topic: str, replica_id: str) -> str:
+        return f"{topic}.shard.{replica_id}"
+
+
+@dataclass
+class ScenarioHandoff:
+    """
+    Scenario state handed over from one replica to another after a membership change.
+    """
+    type: str
+    scenario_id: str
+    source: str
+    target: str
+    active_intentions: List[str]
+    object_event_cnt: int
+    extractor_state: Optional[dict]
+
+    @classmethod
+    def create(cls, scenario_id: str, source: str, target: str, active_intentions: Iterable[str],
+               object_event_cnt: int, extractor_state: Optional[dict]):
+        return cls(cls.__name__, scenario_id, source, target, sorted(active_intentions), object_event_cnt,
+                   extractor_state)
+
+
+class ShardedEventBus(EventBus):
+    """
+    EventBus that routes events on sharded topics to the replica owning their scenario.
+
+    Events on sharded topics are published with the routing key of the owning replica, events
+    without scenario id are published to all replicas. Replicas only process those events if they own
+    the scenario of the signal of the event, see :class:`MentionExtractionService`. Subscriptions to
+    sharded topics only receive events routed to the local replica. Handlers receive events with the original
+    topic name. Other topics are passed on to the underlying EventBus unchanged.
+    """
+    def __init__(self, event_bus: EventBus, shard: ScenarioShard, sharded_topics: Iterable[str]):
+        self._event_bus = event_bus
+        self._shard = shard
+        self._sharded_topics = set(sharded_topics)
+        self._handlers: Dict[Tuple[str, Callable], Callable] = {}
+        self._lock = RLock()
+
+    @property
+    def shard(self) -> ScenarioShard:
+        return self._shard
+
+    def publish(self, topic: str, event: Event) -> None:
+        if topic not in self._sharded_topics:
+            self._event_bus.publish(topic, event)
+            return
+
+        scenario_id = get_scenario_id(event.payload)
+        replicas = (self._shard.owner(scenario_id),) if scenario_id else self._shard.members
+        for replica_id in replicas:
+            self._event_bus.publish(ScenarioShard.routing_topic(topic, replica_id), event)
+
+    def subscribe(self, topic: str, handler: Callable[[Event], None]) -> None:
+        if topic not in self._sharded_topics:
+            self._event_bus.subscribe(topic, handler)
+            return
+
+        def sharded_handler(event):
+            handler(Event.with_topic(event, topic))
+
+        with self._lock:
+            self._handlers[(topic, handler)] = sharded_handler
+        self._event_bus.subscribe(ScenarioShard.routing_topic(topic, self._shard.replica_id), sharded_handler)
+
+    def unsubscribe(self, topic: str, handler: Callable[[Event], None] = None) -> None:
+        if topic not in self._sharded_topics:
+            self._event_bus.unsubscribe(topic, handler)
+            return
+
+        with self._lock:
+            sharded_handler = self._handlers.pop((topic, handler), None) if handler else None
+        self._event_bus.unsubscribe(ScenarioShard.routing_topic(topic, self._shard.replica_id), sharded_handler)
+
+    @property
+    def topics(self) -> Iterable[str]:
+        return self._event_bus.topics
+
+
+class ShardRouter:
+    """
+    Routes events from producers that are not shard aware to the owning replicas.
+
+    Subscribes to the plain topics on the underlying EventBus and republishes them on the
+    :class:`ShardedEventBus`. When running multiple routers on an EventBus that delivers events of
+    a topic to all subscribers, e.g. the in-memory EventBus, only a single router must be used.
+    """
+    def __init__(self, event_bus: EventBus, sharded_event_bus: ShardedEventBus, topics: Iterable[str]):
+        self._event_bus = event_bus
+        self._sharded_event_bus = sharded_event_bus
+        self._topics = tuple(topics)
+
+    def start(self):
+        for topic in self._topics:
+            self._event_bus.subscribe(topic, self._route)
+
+    def stop(self):
+        for topic in self._topics:
+            try:
+                self._event_bus.unsubscribe(topic, self._route)
+            except:
+                logger.exception("Failed to unsubscribe router from %s", topic)
+
+    def _route(self, event: Event):
+        self._sharded_event_bus.publish(event.metadata.topic, event)
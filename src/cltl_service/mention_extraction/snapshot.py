@@ -0,0 +1,175 @@
+import dataclasses
+import gzip
+import json
+import logging
+import os
+import threading
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+from cltl.combot.infra.config import ConfigurationManager
+from cltl.combot.infra.time_util import timestamp_now
+
+logger = logging.getLogger(__name__)
+
+
+SNAPSHOT_VERSION = 1
+
+
+@dataclass
+class ScenarioSnapshot:
+    """
+    State of a scenario in a :class:`ServiceSnapshot`.
+    """
+    scenario_id: str
+    active_intentions: List[str]
+    object_event_cnt: int
+    extractor_state: Optional[dict]
+
+
+@dataclass
+class ServiceSnapshot:
+    """
+    Snapshot of the state of the MentionExtractionService, including the state of the mention extractor
+    as exported by :meth:`MentionExtractor.get_scenario_state`.
+    """
+    version: int
+    timestamp: int
+    default_intentions: List[str]
+    scenarios: List[ScenarioSnapshot]
+
+    @classmethod
+    def create(cls, default_intentions, scenarios: List[ScenarioSnapshot]):
+        return cls(SNAPSHOT_VERSION, timestamp_now(), sorted(default_intentions), scenarios)
+
+    def to_json(self) -> str:
+        return json.dumps(dataclasses.asdict(self), separators=(",", ":"))
+
+    @classmethod
+    def from_json(cls, serialized: str) -> "ServiceSnapshot":
+        snapshot = json.loads(serialized)
+        if snapshot.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported snapshot version {snapshot.get('version')}, expected {SNAPSHOT_VERSION}")
+
+        return cls(snapshot["version"], snapshot["timestamp"], snapshot["default_intentions"],
+                   [ScenarioSnapshot(**scenario) for scenario in snapshot["scenarios"]])
+
+
+class SnapshotStore:
+    """
+    Stores snapshots of the service state in a local file for warm restarts.
+
+    While started, a snapshot is captured and written in a background thread every `interval` seconds if
+    the state changed, and once more on :meth:`stop`. Snapshots are written atomically by replacing the file,
+    compressed with gzip if the path ends with `.gz`. Snapshots older than `max_age` seconds are not loaded.
+    """
+    @classmethod
+    def from_config(cls, config_manager: ConfigurationManager, config_name: str) -> Optional["SnapshotStore"]:
+        if not config_manager.has_config(config_name):
+            return None
+
+        config = config_manager.get_config(config_name)
+        if "enabled" in config and not config.get_boolean("enabled"):
+            return None
+
+        interval = config.get_float("interval") if "interval" in config else 30.0
+        max_age = config.get_float("max_age") if "max_age" in config else None
+
+        return cls(config.get("path"), interval, max_age)
+
+    def __init__(self, path: str, interval: float = 30.0, max_age: float = None):
+        """
+        Parameters
+        ----------
+        path : str
+            Path of the snapshot file.
+        interval : float
+            Interval in seconds in which snapshots are captured.
+        max_age : float
+            Maximum age in seconds of a snapshot that is loaded, unlimited if not set.
+        """
+        self._path = path
+        self._interval = interval
+        self._max_age_ms = int(max_age * 1000) if max_age else None
+
+        self._capture = None
+        self._last_written = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    def load(self, now: int = None) -> Optional[ServiceSnapshot]:
+        """Load the stored snapshot, if there is a valid snapshot that is not outdated."""
+        if not os.path.isfile(self._path):
+            return None
+
+        try:
+            with self._open("rt") as snapshot_file:
+                snapshot = ServiceSnapshot.from_json(snapshot_file.read())
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning("Ignored invalid snapshot %s: %s", self._path, e)
+            return None
+
+        now = now if now is not None else timestamp_now()
+        if self._max_age_ms and now - snapshot.timestamp > self._max_age_ms:
+            logger.info("Ignored outdated snapshot %s from %s", self._path, snapshot.timestamp)
+            return None
+
+        return snapshot
+
+    def write(self, snapshot: ServiceSnapshot) -> bool:
+        """Write the snapshot if it differs from the last written snapshot."""
+        # The timestamp changes with every snapshot and is not compared
+        serialized = snapshot.to_json()
+        content = dataclasses.replace(snapshot, timestamp=0).to_json()
+        if content == self._last_written:
+            return False
+
+        directory = os.path.dirname(os.path.abspath(self._path))
+        os.makedirs(directory, exist_ok=True)
+
+        tmp_path = f"{self._path}.tmp"
+        with self._open("wt", tmp_path) as snapshot_file:
+            snapshot_file.write(serialized)
+        os.replace(tmp_path, self._path)
+
+        self._last_written = content
+        logger.debug("Wrote snapshot with %s scenarios to %s", len(snapshot.scenarios), self._path)
+
+        return True
+
+    def start(self, capture: Callable[[], ServiceSnapshot]) -> None:
+        """Start to write snapshots provided by `capture` periodically."""
+        self._capture = capture
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="SnapshotStore", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the periodic snapshots and write a final snapshot."""
+        if not self._thread:
+            return
+
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self._write_captured()
+
+    def _run(self):
+        while not self._stop.wait(self._interval):
+            self._write_captured()
+
+    def _write_captured(self):
+        try:
+            self.write(self._capture())
+        except:
+            logger.exception("Failed to write snapshot to %s", self._path)
+
+    def _open(self, mode: str, path: str = None):
+        path = path if path else self._path
+
+        return gzip.open(path, mode, encoding="utf-8") if self._path.endswith(".gz") \
+            else open(path, mode[0], encoding="utf-8")
@@ -0,0 +1,170 @@
+import logging
+import threading
+import tracemalloc
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+from cltl.combot.infra.config import ConfigurationManager
+
+logger = logging.getLogger(__name__)
+
+
+_MB = 1024 * 1024
+
+# Watchdogs of all services in the process share tracemalloc, tracing is stopped by the last watchdog
+_tracing_lock = threading.Lock()
+_tracing_users = 0
+_tracing_started = False
+
+
+def _start_tracing(frames: int):
+    global _tracing_users, _tracing_started
+    with _tracing_lock:
+        if not _tracing_users and not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+            _tracing_started = True
+        _tracing_users += 1
+
+
+def _stop_tracing():
+    global _tracing_users, _tracing_started
+    with _tracing_lock:
+        _tracing_users -= 1
+        if not _tracing_users and _tracing_started:
+            tracemalloc.stop()
+            _tracing_started = False
+
+
+@dataclass
+class MemoryReport:
+    traced_memory: int
+    peak_memory: int
+    top_diff: List[str]
+    state_sizes: Dict[str, int]
+
+
+class MemoryWatchdog:
+    """
+    Periodically reports memory usage of a service.
+
+    The watchdog takes tracemalloc snapshots in the configured interval and logs the top
+    allocation differences to the previous snapshot, together with the size of the state
+    kept by the service. Warnings are logged when the traced memory or any of the state
+    sizes exceed the configured thresholds.
+
+    Tracing is only started when the watchdog is started, services that don't create a
+    watchdog are not affected. If multiple watchdogs run in the same process, tracing is
+    stopped when the last of them is stopped, and only if it was started by a watchdog.
+    """
+    @classmethod
+    def from_config(cls, name: str, config_manager: ConfigurationManager,
+                    config_name: str) -> Optional["MemoryWatchdog"]:
+        if not config_manager.has_config(config_name):
+            return None
+
+        config = config_manager.get_config(config_name)
+        if "enabled" in config and not config.get_boolean("enabled"):
+            return None
+
+        interval = config.get_float("interval") if "interval" in config else 60.0
+        top_n = config.get_int("top_n") if "top_n" in config else 10
+        memory_threshold = int(config.get_float("memory_threshold") * _MB) if "memory_threshold" in config else None
+        state_threshold = config.get_int("state_threshold") if "state_threshold" in config else None
+
+        return cls(name, interval, top_n, memory_threshold, state_threshold)
+
+    def __init__(self, name: str, interval: float = 60.0, top_n: int = 10,
+                 memory_threshold: int = None, state_threshold: int = None, frames: int = 1):
+        """
+        Parameters
+        ----------
+        name : str
+            Name of the monitored service.
+        interval : float
+            Interval in seconds between snapshots.
+        top_n : int
+            Number of allocation differences to report.
+        memory_threshold : int
+            Traced memory in bytes above which a warning is logged.
+        state_threshold : int
+            Size of any reported state above which a warning is logged.
+        frames : int
+            Number of frames stored by tracemalloc per allocation.
+        """
+        self._name = name
+        self._interval = interval
+        self._top_n = top_n
+        self._memory_threshold = memory_threshold
+        self._state_threshold = state_threshold
+        self._state_sizes: Dict[str, Callable[[], Dict[str, int]]] = {}
+        self._frames = frames
+
+        self._snapshot = None
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def register_state(self, name: str, state_sizes: Callable[[], Dict[str, int]]):
+        """
+        Register a function that provides the sizes of state kept by the service, e.g. number of entries.
+        Reported sizes are prefixed with the given name.
+        """
+        self._state_sizes[name] = state_sizes
+
+    def start(self):
+        if self._thread:
+            return
+
+        _start_tracing(self._frames)
+        self._snapshot = tracemalloc.take_snapshot()
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name=f"MemoryWatchdog-{self._name}", daemon=True)
+        self._thread.start()
+        logger.info("Started memory watchdog for %s (interval: %ss)", self._name, self._interval)
+
+    def stop(self):
+        if not self._thread:
+            return
+
+        self._stop_event.set()
+        self._thread.join()
+        self._thread = None
+        self._snapshot = None
+
+        _stop_tracing()
+        logger.info("Stopped memory watchdog for %s", self._name)
+
+    def _run(self):
+        while not self._stop_event.wait(self._interval):
+            try:
+                self.check()
+            except:
+                logger.exception("Failed to check memory for %s", self._name)
+
+    def check(self) -> MemoryReport:
+        snapshot = tracemalloc.take_snapshot()
+        top_diff = [str(stat) for stat in snapshot.compare_to(self._snapshot, "lineno")[:self._top_n]] \
+            if self._snapshot else []
+        self._snapshot = snapshot
+
+        traced_memory, peak_memory = tracemalloc.get_traced_memory()
+        state_sizes = {f"{name}.{state}": size
+                       for name, sizes in self._state_sizes.items() for state, size in sizes().items()}
+
+        logger.info("Memory of %s: %.1f MB (peak %.1f MB), state sizes: %s",
+                    self._name, traced_memory / _MB, peak_memory / _MB, state_sizes)
+        # The allocation diff is needed to diagnose a leak when the threshold is exceeded
+        exceeded = self._memory_threshold and traced_memory > self._memory_threshold
+        if exceeded:
+            logger.warning("Memory of %s exceeds threshold: %.1f MB > %.1f MB",
+                           self._name, traced_memory / _MB, self._memory_threshold / _MB)
+        for stat in top_diff:
+            logger.log(logging.WARNING if exceeded else logging.DEBUG, "Memory diff of %s: %s", self._name, stat)
+
+        if self._state_threshold:
+            for state, size in state_sizes.items():
+                if size > self._state_threshold:
+                    logger.warning("State %s of %s exceeds threshold: %s > %s",
+                                   state, self._name, size, self._state_threshold)
+
+        return MemoryReport(traced_memory, peak_memory, top_diff, state_sizes)
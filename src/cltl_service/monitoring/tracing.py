@@ -0,0 +1,173 @@
+import contextvars
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from enum import Enum
+from typing import Optional
+
+from cltl.combot.infra.config import ConfigurationManager
+
+logger = logging.getLogger(__name__)
+
+
+_active_trace = contextvars.ContextVar("trace_id", default=None)
+
+
+class Tracer:
+    """
+    Records spans of sampled traces in the Chrome trace event format.
+
+    Traces are identified by a correlation id that is propagated through the events of the services, e.g.
+    the id of the text signal an utterance originates from. Whether a trace is sampled is derived from the
+    trace id, such that all services record the same traces for the same `sample_rate`.
+
+    Spans are appended as complete events (`"ph": "X"`) with wall clock timestamps to a JSON array in a local
+    file, which can be loaded in Perfetto or `chrome://tracing`. The trace id is stored in the arguments of
+    each span. Files of multiple services can be combined by concatenating their events.
+    """
+    @classmethod
+    def from_config(cls, name: str, config_manager: ConfigurationManager, config_name: str) -> Optional["Tracer"]:
+        if not config_manager.has_config(config_name):
+            return None
+
+        config = config_manager.get_config(config_name)
+        if "enabled" in config and not config.get_boolean("enabled"):
+            return None
+
+        path = config.get("path") if "path" in config else f"./traces/{name}.json"
+        sample_rate = config.get_float("sample_rate") if "sample_rate" in config else 1.0
+
+        return cls(name, path, sample_rate)
+
+    def __init__(self, name: str, path: str, sample_rate: float = 1.0):
+        """
+        Parameters
+        ----------
+        name : str
+            Name of the traced service, used as category of the spans.
+        path : str
+            Path of the trace file, spans are appended if the file exists.
+        sample_rate : float
+            Share of traces that is recorded, between 0 and 1.
+        """
+        self._name = name
+        self._path = path
+        self._sample_rate = sample_rate
+        self._pid = os.getpid()
+
+        self._file = None
+        self._lock = threading.Lock()
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    def is_sampled(self, trace_id: Optional[str]) -> bool:
+        if not trace_id or self._sample_rate <= 0:
+            return False
+        if self._sample_rate >= 1:
+            return True
+
+        digest = hashlib.sha1(str(trace_id).encode("utf-8")).digest()
+
+        return int.from_bytes(digest[:8], "big") / 2 ** 64 < self._sample_rate
+
+    @contextmanager
+    def activate(self, trace_id: Optional[str]):
+        """Make `trace_id` the active trace of the current context if it is sampled."""
+        token = _active_trace.set(trace_id if self.is_sampled(trace_id) else None)
+        try:
+            yield
+        finally:
+            _active_trace.reset(token)
+
+    @property
+    def active_trace(self) -> Optional[str]:
+        return _active_trace.get()
+
+    @contextmanager
+    def span(self, name: str, trace_id: str = None, **args):
+        """Record a span of the given or the active trace, if the trace is sampled."""
+        trace_id = trace_id if trace_id is not None else _active_trace.get()
+        if trace_id is None or not self.is_sampled(trace_id):
+            yield args
+            return
+
+        start = time.time()
+        try:
+            yield args
+        finally:
+            self.record(name, trace_id, start, time.time(), **args)
+
+    def record(self, name: str, trace_id: str, start: float, end: float, **args) -> None:
+        """Record a span with start and end in seconds since the epoch."""
+        span = {
+            "name": name,
+            "cat": self._name,
+            "ph": "X",
+            "ts": int(start * 1e6),
+            "dur": max(int((end - start) * 1e6), 0),
+            "pid": self._pid,
+            "tid": threading.get_ident(),
+            "args": dict(args, trace_id=trace_id),
+        }
+
+        line = json.dumps(span, default=str) + ",\n"
+        with self._lock:
+            try:
+                self._open().write(line)
+                self._file.flush()
+            except OSError:
+                logger.exception("Failed to write span %s to %s", name, self._path)
+
+    def _open(self):
+        if not self._file:
+            directory = os.path.dirname(os.path.abspath(self._path))
+            os.makedirs(directory, exist_ok=True)
+            self._file = open(self._path, "a")
+            if self._file.tell() == 0:
+                # The closing bracket is optional in the trace event format
+                self._file.write("[\n")
+
+        return self._file
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+
+
+def span(tracer: Optional[Tracer], name: str, **args):
+    """Span of the active trace of an optional tracer."""
+    return tracer.span(name, **args) if tracer else nullcontext(args)
+
+
+def activate(tracer: Optional[Tracer], trace_id: Optional[str]):
+    """Activate the trace of an optional tracer."""
+    return tracer.activate(trace_id) if tracer else nullcontext()
+
+
+def trace_serialization(tracer: Optional[Tracer], payload) -> None:
+    """
+    Record a span for the JSON serialization of the payload in the active trace.
+
+    The payload is serialized to JSON similar to the `cltl-json` serializer of the event bus, only if the
+    trace is sampled.
+    """
+    if not tracer or not tracer.active_trace:
+        return
+
+    with tracer.span("serialization") as args:
+        args["bytes"] = len(json.dumps(payload, default=_to_json))
+
+
+def _to_json(obj):
+    if isinstance(obj, Enum):
+        return obj.name
+
+    return vars(obj) if hasattr(obj, "__dict__") else str(obj)
@@ -0,0 +1,25 @@
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from cltl.combot.event.emissor import AnnotationEvent
+from emissor.representation.scenario import Mention
+
+
+@dataclass
+class IndexedAnnotationEvent(AnnotationEvent[Mention]):
+    """
+    :class:`AnnotationEvent` with mentions grouped by annotation type.
+
+    The `index` maps annotation types to the `[start, stop)` range of the mentions with that annotation type.
+    The `trace_id` correlates the event with the text signal it was created for, the `scenario_id` is the
+    scenario of that signal.
+    The event has the type of an `AnnotationEvent` and can be consumed as such.
+    """
+    index: Dict[str, Tuple[int, int]]
+    trace_id: Optional[str] = None
+    scenario_id: Optional[str] = None
+
+    @classmethod
+    def create(cls, mentions: List[Mention], index: Dict[str, Tuple[int, int]] = None, trace_id: str = None,
+               scenario_id: str = None):
+        return cls(AnnotationEvent.__name__, mentions, index if index is not None else {}, trace_id, scenario_id)
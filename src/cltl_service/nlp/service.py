@@ -1,20 +1,33 @@
 import logging
+import time
 import uuid
+from collections import OrderedDict
 from itertools import chain
+from typing import Optional
 
-from cltl.combot.event.emissor import TextSignalEvent, AnnotationEvent
+from cltl.combot.event.emissor import TextSignalEvent, ScenarioStarted, ScenarioStopped
 from cltl.combot.infra.config import ConfigurationManager
 from cltl.combot.infra.event import Event, EventBus
 from cltl.combot.infra.resource import ResourceManager
 from cltl.combot.infra.time_util import timestamp_now
-from cltl.combot.infra.topic_worker import TopicWorker
 from emissor.representation.scenario import Annotation, Mention
 
 from cltl.nlp.api import NLP, Token, NamedEntity, Entity
+from cltl.nlp.incremental import IncrementalNLP
+from cltl_service.monitoring.memory import MemoryWatchdog
+from cltl_service.monitoring.tracing import Tracer, activate, span, trace_serialization
+from cltl_service.nlp.schema import IndexedAnnotationEvent
+from cltl_service.publishing.coalescing import CoalescingEventBus
+from cltl_service.scheduling.staleness import StalenessPolicy, StalenessAwareTopicWorker
 
 logger = logging.getLogger(__name__)
 
 
+_LANGUAGE_ANNOTATION = "Language"
+_MAX_SCENARIO_LANGUAGES = 256
+_MAX_INCREMENTAL_SIGNALS = 64
+
+
 class NLPService:
     """
     Service used to integrate the component into applications.
@@ -23,40 +36,210 @@ class NLPService:
     def from_config(cls, nlp: NLP, event_bus: EventBus, resource_manager: ResourceManager,
                     config_manager: ConfigurationManager):
         config = config_manager.get_config("cltl.nlp.events")
+        incremental = config.get_boolean("incremental") if "incremental" in config else False
+        memory_watchdog = MemoryWatchdog.from_config(cls.__name__, config_manager, "cltl.nlp.memory")
+        staleness = StalenessPolicy.from_config(config_manager, "cltl.nlp.staleness")
+        # Batches are only published on topics listed explicitly in the coalescing configuration
+        event_bus = CoalescingEventBus.from_config(event_bus, config_manager, "cltl.nlp.coalescing", [])
+        tracer = Tracer.from_config(cls.__name__, config_manager, "cltl.nlp.tracing")
+        scenario_topic = config.get("topic_scenario") if "topic_scenario" in config else None
 
-        return cls(config.get("topic_in"), config.get("topic_out"), nlp, event_bus, resource_manager)
+        return cls(config.get("topic_in"), config.get("topic_out"), nlp, event_bus, resource_manager, incremental,
+                   memory_watchdog, staleness, tracer, scenario_topic)
 
     def __init__(self, input_topic: str, output_topic: str, nlp: NLP,
-                 event_bus: EventBus, resource_manager: ResourceManager):
+                 event_bus: EventBus, resource_manager: ResourceManager, incremental: bool = False,
+                 memory_watchdog: MemoryWatchdog = None, staleness: StalenessPolicy = None, tracer: Tracer = None,
+                 scenario_topic: str = None):
+        """
+        In `incremental` mode, for updates of a signal with growing text (e.g. partial ASR hypotheses with
+        the same signal id), only the text after the last completed sentence is analyzed and only the
+        annotations of sentences completed since the previous update are published. The annotations after
+        the last completed sentence are published when the signal is final, i.e. has a `final` attribute that
+        is set, when it is superseded by a signal with another id in the same scenario, when its scenario stops
+        (if a `scenario_topic` is provided) and when the service stops.
+
+        If a `memory_watchdog` is provided, it is run while the service is started and reports the number of
+        buffered input events.
+
+        With a `staleness` policy, events older than the budget of their topic are dropped before analysis.
+
+        If the `event_bus` is a :class:`CoalescingEventBus`, buffered events are flushed when the service is stopped.
+
+        Published annotation events carry the id of the text signal as `trace_id` and the scenario of the
+        text signal as `scenario_id`. With a `tracer`, spans for
+        the time in the queue, analysis, mention creation, serialization and publishing are recorded.
+
+        Text signals are analyzed with the NLP for their language (see :meth:`NLP.for_language`). The language
+        is taken from a `language` attribute or a `Language` annotation of the signal, or, if a `scenario_topic`
+        is provided, from the `language` of the context of the scenario. Otherwise the NLP decides, e.g. by
+        language identification.
+        """
         self._nlp = nlp
+        self._incremental_nlp = IncrementalNLP(nlp, max_signals=_MAX_INCREMENTAL_SIGNALS) if incremental else None
+        # Latest text signal per scenario that is analyzed incrementally
+        self._incremental_signals = OrderedDict()
 
         self._event_bus = event_bus
         self._resource_manager = resource_manager
 
         self._input_topic = input_topic
         self._output_topic = output_topic
+        self._scenario_topic = scenario_topic
+        self._scenario_languages = OrderedDict()
 
         self._topic_worker = None
         self._app = None
 
+        self._staleness = staleness
+        self._tracer = tracer
+
+        self._memory_watchdog = memory_watchdog
+        if self._memory_watchdog:
+            self._memory_watchdog.register_state("service", self._state_sizes)
+        if self._memory_watchdog and self._incremental_nlp:
+            self._memory_watchdog.register_state("incremental", self._incremental_nlp.state_sizes)
+
     def start(self, timeout=30):
-        self._topic_worker = TopicWorker([self._input_topic], self._event_bus, provides=[self._output_topic],
-                                         resource_manager=self._resource_manager, processor=self._process,
-                                         name=self.__class__.__name__)
+        if self._memory_watchdog:
+            self._memory_watchdog.start()
+        input_topics = [self._input_topic] + ([self._scenario_topic] if self._scenario_topic else [])
+        self._topic_worker = StalenessAwareTopicWorker(input_topics, self._event_bus,
+                                                       provides=[self._output_topic],
+                                                       resource_manager=self._resource_manager,
+                                                       processor=self._process,
+                                                       name=self.__class__.__name__,
+                                                       staleness=self._staleness,
+                                                       on_dequeue=self._trace_queue if self._tracer else None)
         self._topic_worker.start().wait()
 
     def stop(self):
         if not self._topic_worker:
-            pass
+            return
 
         self._topic_worker.stop()
         self._topic_worker.await_stop()
         self._topic_worker = None
 
+        for scenario_id in list(self._incremental_signals):
+            self._flush_signal(self._incremental_signals.pop(scenario_id))
+
+        if isinstance(self._event_bus, CoalescingEventBus):
+            self._event_bus.close()
+        if self._tracer:
+            self._tracer.close()
+        if self._memory_watchdog:
+            self._memory_watchdog.stop()
+
+    @property
+    def dropped(self) -> int:
+        """Number of input events dropped because the buffer was full or they were stale."""
+        topic_worker = self._topic_worker
+
+        return topic_worker.dropped if topic_worker else 0
+
+    def _state_sizes(self):
+        topic_worker = self._topic_worker
+
+        return {
+            "buffer": topic_worker.buffered if topic_worker else 0,
+            "scenario_languages": len(self._scenario_languages),
+            "incremental_signals": len(self._incremental_signals),
+        }
+
+    def _trace_queue(self, event: Event[TextSignalEvent], received: int):
+        if event.metadata.topic != self._input_topic:
+            return
+
+        trace_id = event.payload.signal.id
+        if received is not None and self._tracer.is_sampled(trace_id):
+            self._tracer.record("queue_wait", trace_id, received / 1000, time.time())
+
     def _process(self, event: Event[TextSignalEvent]):
-        text_signal = event.payload.signal
-        doc = self._nlp.analyze(text_signal.text)
+        if self._scenario_topic and event.metadata.topic == self._scenario_topic:
+            self._update_scenario_language(event.payload)
+            if self._incremental_nlp and event.payload.type == ScenarioStopped.__name__:
+                signal = self._incremental_signals.pop(event.payload.scenario.id, None)
+                if signal:
+                    self._flush_signal(signal)
+            return
+
+        if self._incremental_nlp:
+            self._track_signal(event.payload.signal)
 
+        with activate(self._tracer, event.payload.signal.id):
+            self._process_signal(event.payload.signal)
+
+    def _track_signal(self, text_signal):
+        """Flush the previous signal of the scenario if it is superseded and keep the signal if it is not final."""
+        scenario_id = getattr(getattr(text_signal, "time", None), "container_id", None)
+        previous = self._incremental_signals.pop(scenario_id, None)
+        if previous and previous.id != text_signal.id:
+            self._flush_signal(previous)
+
+        if not getattr(text_signal, "final", False):
+            self._incremental_signals[scenario_id] = text_signal
+            if len(self._incremental_signals) > _MAX_INCREMENTAL_SIGNALS:
+                _, evicted = self._incremental_signals.popitem(last=False)
+                self._flush_signal(evicted)
+
+    def _flush_signal(self, text_signal):
+        doc = self._incremental_nlp.flush(text_signal.id)
+        if doc:
+            with activate(self._tracer, text_signal.id):
+                self._publish(text_signal, doc)
+
+    def _update_scenario_language(self, payload):
+        scenario = payload.scenario
+        if payload.type == ScenarioStopped.__name__:
+            self._scenario_languages.pop(scenario.id, None)
+            return
+
+        language = getattr(getattr(scenario, "context", None), "language", None)
+        if payload.type == ScenarioStarted.__name__ and language:
+            self._scenario_languages[scenario.id] = language
+            if len(self._scenario_languages) > _MAX_SCENARIO_LANGUAGES:
+                self._scenario_languages.popitem(last=False)
+            logger.info("Set language of scenario %s to %s", scenario.id, language)
+
+    def _language(self, text_signal) -> Optional[str]:
+        language = getattr(text_signal, "language", None)
+        if language:
+            return language
+
+        for mention in getattr(text_signal, "mentions", None) or ():
+            for annotation in mention.annotations:
+                if annotation.type == _LANGUAGE_ANNOTATION:
+                    return annotation.value
+
+        scenario_id = getattr(getattr(text_signal, "time", None), "container_id", None)
+
+        return self._scenario_languages.get(scenario_id)
+
+    def _process_signal(self, text_signal):
+        with span(self._tracer, "analysis"):
+            language = self._language(text_signal)
+            if self._incremental_nlp:
+                _, doc = self._incremental_nlp.analyze(text_signal.id, text_signal.text, language,
+                                                       final=getattr(text_signal, "final", False))
+            else:
+                nlp = self._nlp.for_language(language) if language else self._nlp
+                doc = nlp.analyze(text_signal.text)
+
+        self._publish(text_signal, doc)
+
+    def _publish(self, text_signal, doc):
+        with span(self._tracer, "creation"):
+            mentions, index = self._create_mentions(text_signal, doc)
+
+        if mentions:
+            scenario_id = getattr(getattr(text_signal, "time", None), "container_id", None)
+            payload = IndexedAnnotationEvent.create(mentions, index, text_signal.id, scenario_id)
+            trace_serialization(self._tracer, payload)
+            with span(self._tracer, "publish"):
+                self._event_bus.publish(self._output_topic, Event.for_payload(payload))
+
+    def _create_mentions(self, text_signal, doc):
         # TODO recap emissor Annotation classes -> NER, Token, etc.
         token_segments, token_annotations = self._convert_to_segment_annotation(text_signal, Token.__name__, doc.tokens)
         ner_segments, ner_annotations = self._convert_to_segment_annotation(text_signal, NamedEntity.__name__, doc.named_entities)
@@ -68,8 +251,15 @@ class NLPService:
                              zip(ner_segments, ner_annotations),
                              zip(entity_segments, entity_annotations))]
 
-        if mentions:
-            self._event_bus.publish(self._output_topic, Event.for_payload(AnnotationEvent.create(mentions)))
+        token_end = len(token_annotations)
+        ner_end = token_end + len(ner_annotations)
+        index = {
+            Token.__name__: (0, token_end),
+            NamedEntity.__name__: (token_end, ner_end),
+            Entity.__name__: (ner_end, ner_end + len(entity_annotations)),
+        }
+
+        return mentions, index
 
     def _convert_to_segment_annotation(self, text_signal, type, collection):
         annotations = [Annotation(type, element, NLP.__name__, timestamp_now()) for element in collection]
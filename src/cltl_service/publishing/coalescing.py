@@ -0,0 +1,235 @@
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List
+
+from cltl.combot.infra.config import ConfigurationManager
+from cltl.combot.infra.event import Event, EventBus
+
+logger = logging.getLogger(__name__)
+
+
+ORDER_TOPIC = "topic"
+ORDER_GLOBAL = "global"
+
+
+@dataclass
+class BatchEvent:
+    """
+    Payloads published on a topic within the coalescing window of a :class:`CoalescingEventBus`.
+    """
+    type: str
+    payloads: List[Any]
+
+    @classmethod
+    def create(cls, payloads: List[Any]):
+        return cls(cls.__name__, payloads)
+
+
+def unbatch(event: Event) -> List[Event]:
+    """Split an event with a :class:`BatchEvent` payload into events for the single payloads."""
+    if getattr(event.payload, "type", None) != BatchEvent.__name__:
+        return [event]
+
+    return [Event.with_topic(Event.for_payload(payload), event.metadata.topic) for payload in event.payload.payloads]
+
+
+class CoalescingEventBus(EventBus):
+    """
+    EventBus that coalesces events published on selected topics into batches.
+
+    Events on coalesced topics are buffered per topic and published as one event with a :class:`BatchEvent`
+    payload when `max_items` events are buffered or `max_delay` seconds after the first buffered event,
+    whichever comes first. A buffer with a single event is published unchanged. Consumers split batches
+    with :func:`unbatch`. Events on other topics are passed on to the underlying EventBus unchanged.
+
+    Events are always published in order per topic. With `ordering` set to `global` all buffers are
+    flushed before an event on any other topic is published, such that the order across topics is
+    preserved as well. On :meth:`close` buffered events are published if `flush_on_stop` is set,
+    otherwise they are dropped.
+
+    Publishing reuses the connections and producers of the underlying EventBus, e.g. the connection
+    and producer pools of the `KombuEventBus`.
+    """
+    @classmethod
+    def from_config(cls, event_bus: EventBus, config_manager: ConfigurationManager, config_name: str,
+                    default_topics: Iterable[str]) -> EventBus:
+        """Wrap the `event_bus` if coalescing is enabled in the configuration, otherwise return it unchanged."""
+        if not config_manager.has_config(config_name):
+            return event_bus
+
+        config = config_manager.get_config(config_name)
+        if "enabled" in config and not config.get_boolean("enabled"):
+            return event_bus
+
+        topics = config.get("topics", multi=True) if "topics" in config else default_topics
+        max_items = config.get_int("max_items") if "max_items" in config else 32
+        max_delay = config.get_float("max_delay") if "max_delay" in config else 0.05
+        ordering = config.get("ordering") if "ordering" in config else ORDER_TOPIC
+        flush_on_stop = config.get_boolean("flush_on_stop") if "flush_on_stop" in config else True
+        report_interval = config.get_float("report_interval") if "report_interval" in config else 60.0
+
+        return cls(event_bus, topics, max_items, max_delay, ordering, flush_on_stop, report_interval)
+
+    def __init__(self, event_bus: EventBus, topics: Iterable[str], max_items: int = 32, max_delay: float = 0.05,
+                 ordering: str = ORDER_TOPIC, flush_on_stop: bool = True, report_interval: float = 60.0):
+        """
+        Parameters
+        ----------
+        event_bus : EventBus
+            The EventBus used to publish the batches.
+        topics : Iterable[str]
+            Topics on which events are coalesced.
+        max_items : int
+            Maximum number of events in a batch.
+        max_delay : float
+            Maximum time in seconds an event is buffered.
+        ordering : str
+            `topic` to preserve the order of events per topic, `global` to preserve the order across topics.
+        flush_on_stop : bool
+            Publish buffered events on :meth:`close` instead of dropping them.
+        report_interval : float
+            Interval in seconds in which the rate of published events before and after coalescing is logged.
+        """
+        if ordering not in (ORDER_TOPIC, ORDER_GLOBAL):
+            raise ValueError(f"Unsupported ordering {ordering}, expected one of {ORDER_TOPIC}, {ORDER_GLOBAL}")
+
+        self._event_bus = event_bus
+        self._topics = frozenset(topics)
+        self._max_items = max_items
+        self._max_delay = max_delay
+        self._global_order = ordering == ORDER_GLOBAL
+        self._flush_on_stop = flush_on_stop
+        self._report_interval = report_interval
+
+        self._buffers: Dict[str, List[Event]] = {}
+        self._deadlines: Dict[str, float] = {}
+        self._condition = threading.Condition(threading.RLock())
+        self._thread = None
+        self._closed = False
+
+        self._received = 0
+        self._published = 0
+        self._report_start = time.monotonic()
+        self._report_counts = (0, 0)
+
+    def publish(self, topic: str, event: Event) -> None:
+        with self._condition:
+            self._received += 1
+
+            if topic not in self._topics or self._closed:
+                if self._global_order:
+                    self._flush_all()
+                self._send(topic, [event])
+                return
+
+            if self._global_order:
+                self._flush_all(exclude=topic)
+
+            buffer = self._buffers.setdefault(topic, [])
+            buffer.append(event)
+            if len(buffer) >= self._max_items:
+                self._flush(topic)
+            elif len(buffer) == 1:
+                self._deadlines[topic] = time.monotonic() + self._max_delay
+                self._ensure_started()
+                self._condition.notify()
+
+    def flush(self) -> None:
+        """Publish all buffered events."""
+        with self._condition:
+            self._flush_all()
+
+    def close(self) -> None:
+        """Publish or drop the buffered events and stop the flush thread, it is restarted on the next event."""
+        with self._condition:
+            self._closed = True
+            if self._flush_on_stop:
+                self._flush_all()
+            else:
+                dropped = sum(len(buffer) for buffer in self._buffers.values())
+                self._buffers.clear()
+                self._deadlines.clear()
+                if dropped:
+                    logger.info("Dropped %s buffered events on close", dropped)
+            self._condition.notify()
+
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+        self._report()
+        with self._condition:
+            self._closed = False
+
+    def rates(self) -> Dict[str, float]:
+        """Events per second published to the coalescing EventBus and to the underlying EventBus."""
+        with self._condition:
+            duration = time.monotonic() - self._report_start
+            received = self._received - self._report_counts[0]
+            published = self._published - self._report_counts[1]
+
+        return {
+            "received": received / duration if duration else 0.0,
+            "published": published / duration if duration else 0.0,
+        }
+
+    def subscribe(self, topic: str, handler: Callable[[Event], None]) -> None:
+        self._event_bus.subscribe(topic, handler)
+
+    def unsubscribe(self, topic: str, handler: Callable[[Event], None] = None) -> None:
+        self._event_bus.unsubscribe(topic, handler)
+
+    @property
+    def topics(self) -> Iterable[str]:
+        return self._event_bus.topics
+
+    def _ensure_started(self):
+        if not self._thread:
+            self._thread = threading.Thread(target=self._run, name="CoalescingEventBus", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        with self._condition:
+            while not self._closed:
+                now = time.monotonic()
+                for topic in [topic for topic, deadline in self._deadlines.items() if deadline <= now]:
+                    self._flush(topic)
+
+                if self._report_interval and now - self._report_start >= self._report_interval:
+                    self._report()
+
+                deadline = min(self._deadlines.values(), default=None)
+                if self._report_interval:
+                    report_deadline = self._report_start + self._report_interval
+                    deadline = min(deadline, report_deadline) if deadline is not None else report_deadline
+                self._condition.wait(max(deadline - time.monotonic(), 0.0) if deadline is not None else None)
+
+    def _flush_all(self, exclude: str = None):
+        for topic in [topic for topic in self._buffers if topic != exclude]:
+            self._flush(topic)
+
+    def _flush(self, topic: str):
+        events = self._buffers.pop(topic, None)
+        self._deadlines.pop(topic, None)
+        if events:
+            self._send(topic, events)
+
+    def _send(self, topic: str, events: List[Event]):
+        # Publish while holding the lock to keep the order of events
+        event = events[0] if len(events) == 1 else Event.for_payload(BatchEvent.create(
+            [event.payload for event in events]))
+        try:
+            self._event_bus.publish(topic, event)
+            self._published += 1
+        except:
+            logger.exception("Failed to publish %s events on topic %s", len(events), topic)
+
+    def _report(self):
+        rates = self.rates()
+        logger.info("Published %.1f events/s, %.1f events/s after coalescing", rates["received"], rates["published"])
+
+        with self._condition:
+            self._report_start = time.monotonic()
+            self._report_counts = (self._received, self._published)
@@ -0,0 +1,335 @@
+import argparse
+import json
+import logging
+import statistics
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple, Any, Iterable
+
+from cltl.combot.event.emissor import ScenarioStarted, ScenarioStopped, TextSignalEvent
+from cltl.combot.infra.event import Event, EventBus
+from cltl.combot.infra.time_util import timestamp_now
+from emissor.persistence import ScenarioStorage
+from emissor.persistence.persistence import ScenarioController
+from emissor.representation.scenario import Modality, Mention, Scenario
+
+from cltl_service.publishing.coalescing import unbatch
+
+logger = logging.getLogger(__name__)
+
+
+# Annotation type -> (modality, event type) of mentions replayed as events, the topics are configured by event type
+_DEFAULT_MENTION_EVENTS = {
+    "VectorIdentity": (Modality.IMAGE, "VectorIdentityEvent"),
+    "python-type:cltl.object_recognition.api.Object": (Modality.IMAGE, "ObjectRecognitionEvent"),
+    "python-type:cltl.emotion_extraction.api.Emotion": (Modality.TEXT,
+        "python-type:cltl_service.emotion_extraction.schema.EmotionRecognitionEvent"),
+    "python-type:cltl.face_emotion_extraction.api.Emotion": (Modality.IMAGE,
+        "python-type:cltl_service.face_emotion_extraction.schema.EmotionRecognitionEvent"),
+}
+
+
+@dataclass
+class MentionEvent:
+    """Payload for replayed mentions, compatible with the mention events consumed by the MentionExtractionService."""
+    type: str
+    mentions: List[Mention]
+    scenario_id: str
+
+
+@dataclass
+class ReplayEvent:
+    timestamp: int
+    topic: str
+    payload: Any
+    keys: Tuple[str, ...]
+
+
+@dataclass
+class ReplayReport:
+    speed: Optional[float]
+    published: int
+    answered: int
+    unanswered: int
+    duration: float
+    latencies: List[int] = field(repr=False)
+    dropped: int = 0
+
+    @property
+    def throughput(self) -> float:
+        return self.published / self.duration if self.duration else 0.0
+
+    def percentile(self, percentile: float) -> Optional[int]:
+        if not self.latencies:
+            return None
+
+        latencies = sorted(self.latencies)
+        idx = min(len(latencies) - 1, int(round(percentile / 100 * (len(latencies) - 1))))
+
+        return latencies[idx]
+
+    def summary(self) -> dict:
+        return {
+            "speed": self.speed if self.speed else "max",
+            "published": self.published,
+            "answered": self.answered,
+            "unanswered": self.unanswered,
+            "dropped": self.dropped,
+            "throughput": round(self.throughput, 2),
+            "latency_mean": round(statistics.mean(self.latencies), 2) if self.latencies else None,
+            "latency_p50": self.percentile(50),
+            "latency_p90": self.percentile(90),
+            "latency_p99": self.percentile(99),
+            "latency_max": max(self.latencies) if self.latencies else None,
+        }
+
+
+def load_events(scenario: ScenarioController, text_topic: str, mention_topics: Dict[str, str],
+                mention_events: Dict[str, Tuple[Modality, str]] = _DEFAULT_MENTION_EVENTS) -> List[ReplayEvent]:
+    """
+    Load the events to replay from an emissor scenario, ordered by their timestamp.
+
+    Text signals are replayed as :class:`TextSignalEvent` on the `text_topic`. Mentions of text and image
+    signals with an annotation type in `mention_events` are replayed as :class:`MentionEvent` of the
+    respective event type on the topic configured for that event type in `mention_topics`.
+    """
+    events = []
+    for signal in scenario.get_signals(Modality.TEXT):
+        events.append(ReplayEvent(signal.time.start, text_topic, TextSignalEvent.create(signal), (signal.id,)))
+
+    for modality in (Modality.TEXT, Modality.IMAGE):
+        for signal in scenario.get_signals(modality):
+            events.extend(_mention_events(scenario.id, signal, mention_topics, mention_events))
+
+    return sorted(events, key=lambda event: event.timestamp)
+
+
+def _mention_events(scenario_id, signal, mention_topics, mention_events):
+    grouped = dict()
+    for mention in signal.mentions:
+        for annotation in mention.annotations:
+            if annotation.type in mention_events:
+                modality, event_type = mention_events[annotation.type]
+                if modality == signal.modality and event_type in mention_topics:
+                    grouped.setdefault(event_type, []).append(mention)
+                break
+
+    return [ReplayEvent(signal.time.start, mention_topics[event_type], MentionEvent(event_type, mentions, scenario_id),
+                        tuple(mention.id for mention in mentions))
+            for event_type, mentions in grouped.items()]
+
+
+def _output_keys(payload: Any) -> Iterable[str]:
+    for mention in payload:
+        for key in ("turn", "detection"):
+            value = mention.get(key) if isinstance(mention, dict) else getattr(mention, key, None)
+            if value:
+                yield value
+
+
+class ScenarioReplay:
+    """
+    Replays the events of a scenario on an EventBus and measures the latency until mentions are published.
+
+    Input events are correlated with the published mentions by the signal id for text signals and the
+    mention ids for image mentions. Inputs that did not result in a published mention are reported as
+    unanswered, this includes both events that were filtered by the mention detectors and events that were
+    dropped by the services. Events dropped by the services, e.g. because their buffer was full or they
+    were stale, are reported separately as the increase of the `drop_counters` during the replay.
+    """
+    def __init__(self, event_bus: EventBus, scenario: Scenario, events: List[ReplayEvent],
+                 scenario_topic: str, output_topic: str, drop_counters: Iterable[Callable[[], int]] = ()):
+        self._event_bus = event_bus
+        self._scenario = scenario
+        self._events = events
+        self._scenario_topic = scenario_topic
+        self._output_topic = output_topic
+        self._drop_counters = tuple(drop_counters)
+
+        self._lock = threading.Lock()
+        self._sent: Dict[str, int] = {}
+        self._received: Dict[str, int] = {}
+
+    def run(self, speed: Optional[float] = None, drain_timeout: float = 5.0) -> ReplayReport:
+        """
+        Replay the scenario.
+
+        Parameters
+        ----------
+        speed : Optional[float]
+            Replay speed relative to the original timing of the events, e.g. 1.0 for real-time or 10.0 for ten times
+            faster. If None, events are published as fast as possible.
+        drain_timeout : float
+            Time in seconds to wait for outstanding mentions after the last event was published.
+        """
+        with self._lock:
+            self._sent = {}
+            self._received = {}
+
+        dropped = self._dropped()
+        self._event_bus.subscribe(self._output_topic, self._on_output)
+        try:
+            self._event_bus.publish(self._scenario_topic, Event.for_payload(ScenarioStarted.create(self._scenario)))
+
+            start = time.monotonic()
+            self._publish_events(speed)
+            duration = time.monotonic() - start
+
+            self._await_outputs(drain_timeout)
+            self._event_bus.publish(self._scenario_topic, Event.for_payload(ScenarioStopped.create(self._scenario)))
+        finally:
+            self._event_bus.unsubscribe(self._output_topic, self._on_output)
+
+        with self._lock:
+            latencies = [self._received[key] - sent for key, sent in self._sent.items() if key in self._received]
+            answered = self._answered_events()
+
+        return ReplayReport(speed, len(self._events), answered, len(self._events) - answered, duration, latencies,
+                            self._dropped() - dropped)
+
+    def _dropped(self) -> int:
+        return sum(counter() for counter in self._drop_counters)
+
+    def _publish_events(self, speed):
+        if not self._events:
+            return
+
+        replay_start = time.monotonic()
+        first_timestamp = self._events[0].timestamp
+        for event in self._events:
+            if speed:
+                delay = (event.timestamp - first_timestamp) / 1000 / speed - (time.monotonic() - replay_start)
+                if delay > 0:
+                    time.sleep(delay)
+
+            with self._lock:
+                now = timestamp_now()
+                self._sent.update((key, now) for key in event.keys)
+            self._event_bus.publish(event.topic, Event.for_payload(event.payload))
+
+    def _await_outputs(self, timeout):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with self._lock:
+                if self._answered_events() == len(self._events):
+                    return
+            time.sleep(0.05)
+
+    def _answered_events(self) -> int:
+        return sum(1 for event in self._events if any(key in self._received for key in event.keys))
+
+    def _on_output(self, event: Event):
+        now = timestamp_now()
+        with self._lock:
+            for single_event in unbatch(event):
+                for key in _output_keys(single_event.payload):
+                    self._received.setdefault(key, now)
+
+
+def find_saturation(replay: ScenarioReplay, speeds: Iterable[float], latency_budget: int,
+                    drain_timeout: float = 5.0) -> Tuple[Optional[float], List[ReplayReport]]:
+    """
+    Replay a scenario at increasing speeds to find the speed at which the services saturate.
+
+    Speeds are replayed in increasing order, a speed of zero or None replays as fast as possible. The services
+    are considered saturated at the first speed at which the 90th percentile of the latency exceeds the
+    `latency_budget` in milliseconds, or the services drop more events than in the slowest run. Unanswered
+    inputs are not considered, as they include events that were filtered by the mention detectors.
+
+    Returns
+    -------
+    Tuple[Optional[float], List[ReplayReport]]
+        The saturation speed, or None if the services did not saturate, and the reports of all runs.
+    """
+    reports = []
+    for speed in sorted(speeds, key=lambda speed: speed if speed else float("inf")):
+        report = replay.run(speed, drain_timeout)
+        reports.append(report)
+        logger.info("Replayed at speed %s: %s", speed, report.summary())
+
+        p90 = report.percentile(90)
+        if (p90 is not None and p90 > latency_budget) or report.dropped > reports[0].dropped:
+            return speed, reports
+
+    return None, reports
+
+
+def _create_event_bus(kombu: bool) -> EventBus:
+    if not kombu:
+        from cltl.combot.infra.event.memory import SynchronousEventBus
+        return SynchronousEventBus()
+
+    from configparser import ConfigParser
+    from types import SimpleNamespace
+    from kombu.serialization import register
+    from cltl.combot.infra.config.local import LocalConfigurationManager
+    from cltl.combot.infra.event.kombu import KombuEventBus
+
+    register('cltl-json',
+             lambda x: json.dumps(x, default=vars),
+             lambda x: json.loads(x, object_hook=lambda d: SimpleNamespace(**d)),
+             content_type='application/json',
+             content_encoding='utf-8')
+    parser = ConfigParser()
+    parser.read_dict({"cltl.event.kombu": {"server": "memory://", "exchange": "cltl.replay",
+                                           "type": "direct", "compression": "bzip2"}})
+
+    return KombuEventBus('cltl-json', LocalConfigurationManager(parser))
+
+
+def main(emissor_path: str, scenario: str, model: str, speeds: List[float], latency_budget: int, kombu: bool):
+    from cltl.mention_extraction.default_extractor import DefaultMentionExtractor, TextMentionDetector, \
+        TextPerspectiveDetector, ImagePerspectiveDetector, NewFaceMentionDetector, ObjectMentionDetector
+    from cltl.nlp.spacy_nlp import SpacyNLP
+    from cltl_service.mention_extraction.service import MentionExtractionService
+    from cltl_service.nlp.service import NLPService
+
+    text_topic, nlp_topic, scenario_topic, intention_topic, output_topic = \
+        "replay.text", "replay.nlp", "replay.scenario", "replay.intention", "replay.mentions"
+    mention_topics = {event_type: "replay." + event_type.split(".")[-1] for _, event_type in _DEFAULT_MENTION_EVENTS.values()}
+
+    event_bus = _create_event_bus(kombu)
+    nlp_service = NLPService(text_topic, nlp_topic, SpacyNLP(model), event_bus, None)
+    extractor = DefaultMentionExtractor(TextMentionDetector(), TextPerspectiveDetector(), ImagePerspectiveDetector(0.5),
+                                        NewFaceMentionDetector(), ObjectMentionDetector())
+    mention_service = MentionExtractionService(extractor, scenario_topic, [nlp_topic] + list(mention_topics.values()),
+                                               output_topic, None, intention_topic, event_bus, None)
+
+    scenario_ctrl = ScenarioStorage(emissor_path).load_scenario(scenario)
+    events = load_events(scenario_ctrl, text_topic, mention_topics)
+    replay = ScenarioReplay(event_bus, scenario_ctrl.scenario, events, scenario_topic, output_topic,
+                            [lambda: nlp_service.dropped, lambda: mention_service.dropped])
+
+    nlp_service.start()
+    mention_service.start()
+    try:
+        saturation, reports = find_saturation(replay, speeds, latency_budget)
+    finally:
+        mention_service.stop()
+        nlp_service.stop()
+
+    for report in reports:
+        print(json.dumps(report.summary()))
+    print("Saturated at speed:", saturation if saturation else "not saturated")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Replay an emissor scenario through the NLP and mention extraction services')
+    parser.add_argument('--emissor-path', type=str, required=True, help="Path to the emissor folder")
+    parser.add_argument('--scenario', type=str, required=True, help="Identifier of the scenario")
+    parser.add_argument('--model', type=str, required=False, help="Spacy model used for processing",
+                        default='en_core_web_sm')
+    parser.add_argument('--speed', type=float, nargs='+', required=False, default=[1.0],
+                        help="Replay speeds relative to real-time, 0 replays as fast as possible")
+    parser.add_argument('--latency-budget', type=int, required=False, default=500,
+                        help="90th percentile latency in milliseconds above which services are considered saturated")
+    parser.add_argument('--kombu', action='store_true', help="Use the Kombu in-memory transport")
+
+    args, _ = parser.parse_known_args()
+    main(emissor_path=args.emissor_path,
+         scenario=args.scenario,
+         model=args.model,
+         speeds=args.speed,
+         latency_budget=args.latency_budget,
+         kombu=args.kombu)
@@ -0,0 +1,204 @@
+import logging
+import threading
+from collections import Counter, deque
+from queue import Queue
+from typing import Callable, Dict, Iterable, Optional
+
+from cltl.combot.infra.config import ConfigurationManager
+from cltl.combot.infra.event import Event
+from cltl.combot.infra.time_util import timestamp_now
+from cltl.combot.infra.topic_worker import TopicWorker, RejectionStrategy
+
+logger = logging.getLogger(__name__)
+
+
+_REPORT_INTERVAL = 100
+
+
+def _signal_timestamp(event: Event) -> Optional[int]:
+    signal = getattr(event.payload, "signal", None)
+    start = getattr(getattr(signal, "time", None), "start", None)
+
+    return start if isinstance(start, int) else None
+
+
+class StalenessPolicy:
+    """
+    Staleness budgets per topic.
+
+    Events on a topic with a budget are stale if they are older than the budget when they are about to be
+    processed. The age of an event is measured from the time it was received by the service, or, with
+    `signal_time`, from the start time of the signal contained in the event, if available.
+    Events on topics in `newest_first` are processed starting from the most recent event.
+    """
+    @classmethod
+    def from_config(cls, config_manager: ConfigurationManager, config_name: str) -> Optional["StalenessPolicy"]:
+        if not config_manager.has_config(config_name):
+            return None
+
+        config = config_manager.get_config(config_name)
+        budgets = {}
+        for budget in (config.get("budgets", multi=True) if "budgets" in config else []):
+            topic, seconds = budget.rsplit("=", 1)
+            budgets[topic.strip()] = float(seconds)
+        newest_first = config.get("newest_first", multi=True) if "newest_first" in config else []
+        signal_time = config.get_boolean("signal_time") if "signal_time" in config else False
+
+        return cls(budgets, newest_first, signal_time)
+
+    def __init__(self, budgets: Dict[str, float], newest_first: Iterable[str] = (), signal_time: bool = False):
+        """
+        Parameters
+        ----------
+        budgets : Dict[str, float]
+            Maximum age in seconds of events by topic.
+        newest_first : Iterable[str]
+            Topics for which the most recent event is processed first, e.g. sensor topics.
+        signal_time : bool
+            Measure the age of events from the start of the contained signal, if available.
+        """
+        self._budgets_ms = {topic: int(budget * 1000) for topic, budget in budgets.items()}
+        self._newest_first = frozenset(newest_first)
+        self._signal_time = signal_time
+
+        self._dropped = Counter()
+        self._lock = threading.Lock()
+
+    @property
+    def newest_first(self) -> frozenset:
+        return self._newest_first
+
+    @property
+    def dropped(self) -> Dict[str, int]:
+        """Number of dropped events by topic."""
+        with self._lock:
+            return dict(self._dropped)
+
+    def is_stale(self, event: Event, received: int = None, now: int = None) -> bool:
+        budget = self._budgets_ms.get(event.metadata.topic)
+        if budget is None:
+            return False
+
+        timestamp = _signal_timestamp(event) if self._signal_time else None
+        timestamp = timestamp if timestamp is not None else received
+        if timestamp is None:
+            return False
+
+        now = now if now is not None else timestamp_now()
+
+        return now - timestamp > budget
+
+    def drop(self, event: Event, received: int = None, now: int = None) -> bool:
+        """Count and return `True` if the event is stale and should be dropped."""
+        if not self.is_stale(event, received, now):
+            return False
+
+        with self._lock:
+            self._dropped[event.metadata.topic] += 1
+            total = sum(self._dropped.values())
+
+        logger.debug("Dropped stale event %s on topic %s", event.id, event.metadata.topic)
+        if total % _REPORT_INTERVAL == 0:
+            logger.info("Dropped %s stale events: %s", total, self.dropped)
+
+        return True
+
+
+class EventBuffer(Queue):
+    """
+    Buffer of a :class:`StalenessAwareTopicWorker`.
+
+    Keeps the time events were received. When the buffer is full the oldest event is dropped, equivalent to
+    the `OVERWRITE` rejection strategy of the :class:`TopicWorker`, and counted. Events on `newest_first` topics
+    are taken starting from the most recent event of the topic.
+    """
+    def __init__(self, buffer_size: int, newest_first: Iterable[str] = ()):
+        self._buffer_size = buffer_size
+        self._newest_first = frozenset(newest_first)
+        self._received = {}
+        self._overwritten = 0
+        super().__init__()
+
+    @property
+    def overwritten(self) -> int:
+        """Number of events dropped because the buffer was full."""
+        with self.mutex:
+            return self._overwritten
+
+    def _init(self, maxsize):
+        self.queue = deque()
+
+    def _qsize(self):
+        return len(self.queue)
+
+    def _put(self, event: Event):
+        self.queue.append(event)
+        self._received[event.id] = timestamp_now()
+
+        if self._buffer_size and len(self.queue) > self._buffer_size:
+            dropped = self.queue.popleft()
+            self._received.pop(dropped.id, None)
+            self._overwritten += 1
+            logger.debug("Overwrote event %s with %s", dropped.id, event.id)
+
+    def _get(self) -> Event:
+        event = self.queue[0]
+        if event.metadata.topic in self._newest_first:
+            for idx in range(len(self.queue) - 1, -1, -1):
+                if self.queue[idx].metadata.topic == event.metadata.topic:
+                    event = self.queue[idx]
+                    del self.queue[idx]
+                    return event
+
+        return self.queue.popleft()
+
+    def received(self, event: Event) -> Optional[int]:
+        """The time the event was received, can be retrieved once after the event was taken from the buffer."""
+        with self.mutex:
+            return self._received.pop(event.id, None)
+
+
+class StalenessAwareTopicWorker(TopicWorker):
+    """
+    :class:`TopicWorker` that drops stale events according to a :class:`StalenessPolicy` before processing.
+
+    If `on_dequeue` is provided, it is called with each event and the time it was received before the event
+    is processed, e.g. to measure the time events wait in the buffer.
+
+    With the `OVERWRITE` rejection strategy events are buffered in an :class:`EventBuffer`, which counts the
+    events dropped because the buffer was full, see :attr:`dropped`. Otherwise, without a policy and callback,
+    it behaves like the :class:`TopicWorker`.
+    """
+    def __init__(self, *args, staleness: StalenessPolicy = None,
+                 on_dequeue: Callable[[Event, Optional[int]], None] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        self._staleness = staleness
+        self._on_dequeue = on_dequeue
+        if self._staleness or self._on_dequeue or self._strategy == RejectionStrategy.OVERWRITE:
+            newest_first = self._staleness.newest_first if self._staleness else ()
+            self._buffer = EventBuffer(self._buffer.maxsize, newest_first)
+        self._stale = 0
+
+    @property
+    def dropped(self) -> int:
+        """Number of events dropped because the buffer was full or they were stale."""
+        overwritten = self._buffer.overwritten if isinstance(self._buffer, EventBuffer) else 0
+
+        return overwritten + self._stale
+
+    @property
+    def buffered(self) -> int:
+        """Number of events waiting in the buffer."""
+        return self._buffer.qsize()
+
+    def process(self, event: Optional[Event]) -> None:
+        if event and isinstance(self._buffer, EventBuffer):
+            received = self._buffer.received(event)
+            if self._staleness and self._staleness.drop(event, received):
+                self._stale += 1
+                return
+            if self._on_dequeue:
+                self._on_dequeue(event, received)
+
+        super().process(event)
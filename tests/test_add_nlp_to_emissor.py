@@ -0,0 +1,88 @@
+import os
+import tempfile
+import unittest
+
+from emissor.persistence import ScenarioStorage
+from emissor.representation.scenario import Modality, TextSignal, ScenarioContext
+
+from cltl.nlp.add_nlp_to_emissor import main
+from cltl.nlp.api import NLP, Doc, Token, POS
+from cltl.nlp.manifest import AnnotationManifest
+
+
+class CountingNLP(NLP):
+    def __init__(self):
+        self.texts = []
+
+    def analyze(self, text: str) -> Doc:
+        self.texts.append(text)
+        offset = 0
+        tokens = []
+        for word in text.split():
+            start = text.index(word, offset)
+            offset = start + len(word)
+            tokens.append(Token(word, POS.NOUN, (start, offset)))
+
+        return Doc(tokens, [], [])
+
+
+class TestAddNlpToEmissor(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.storage = ScenarioStorage(self.tmp_dir.name)
+        scenario = self.storage.create_scenario("test", 0, 1, ScenarioContext("agent"))
+        for idx in range(3):
+            scenario.append_signal(TextSignal.for_scenario("test", idx, idx + 1, None, f"text number {idx}"))
+        self.storage.save_scenario(scenario)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def annotate(self, streaming, **kwargs):
+        nlp = CountingNLP()
+        main(self.tmp_dir.name, "test", None, streaming=streaming, chunk_size=2, nlp=nlp, **kwargs)
+
+        return nlp.texts
+
+    def test_rerun_skips_annotated_signals(self):
+        for streaming in (False, True):
+            with self.subTest(streaming=streaming):
+                self.assertEqual(3 if not streaming else 0, len(self.annotate(streaming)))
+                self.assertEqual(0, len(self.annotate(streaming)))
+
+                signals = self.storage.load_modality("test", Modality.TEXT)
+                self.assertTrue(all(len(signal.mentions) == 3 for signal in signals))
+
+    def test_annotate_new_and_changed_signals(self):
+        self.annotate(True)
+
+        scenario = self.storage.load_scenario("test")
+        signals = scenario.get_signals(Modality.TEXT)
+        signals[0].text = "changed"
+        scenario.append_signal(TextSignal.for_scenario("test", 3, 4, None, "new signal"))
+        self.storage.save_scenario(scenario)
+
+        self.assertEqual(["changed", "new signal"], self.annotate(True))
+
+        signals = self.storage.load_modality("test", Modality.TEXT)
+        self.assertEqual([1, 3, 3, 2], [len(signal.mentions) for signal in signals])
+
+    def test_force_replaces_mentions(self):
+        self.annotate(False)
+
+        self.assertEqual(3, len(self.annotate(True, force=True)))
+
+        signals = self.storage.load_modality("test", Modality.TEXT)
+        self.assertTrue(all(len(signal.mentions) == 3 for signal in signals))
+
+    def test_manifest_keeps_permissions(self):
+        self.annotate(True)
+        path = os.path.join(self.tmp_dir.name, "test", AnnotationManifest.FILE_NAME)
+        os.chmod(path, 0o640)
+
+        scenario = self.storage.load_scenario("test")
+        scenario.append_signal(TextSignal.for_scenario("test", 3, 4, None, "new signal"))
+        self.storage.save_scenario(scenario)
+        self.assertEqual(["new signal"], self.annotate(True))
+
+        self.assertEqual(0o640, os.stat(path).st_mode & 0o777)
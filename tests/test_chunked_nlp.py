@@ -0,0 +1,128 @@
+import re
+import threading
+import unittest
+
+from cltl.nlp.api import NLP, Doc, Token, NamedEntity, Entity, POS, EntityType
+from cltl.nlp.chunked import ChunkedNLP, split
+
+
+class RegexNLP(NLP):
+    """Tokens for words, named entities for capitalized words and entities for 'I'."""
+    def __init__(self):
+        self.analyzed = []
+        self.threads = set()
+
+    def analyze(self, text: str) -> Doc:
+        self.analyzed.append(text)
+        self.threads.add(threading.get_ident())
+
+        words = list(re.finditer(r"\w+|[^\w\s]", text))
+        return Doc([Token(match.group(), POS.X, match.span()) for match in words],
+                   [NamedEntity(match.group(), "PERSON", match.span()) for match in words
+                    if match.group()[0].isupper() and match.group() != "I"],
+                   [Entity(match.group(), EntityType.SPEAKER, match.span()) for match in words
+                    if match.group() == "I"])
+
+
+def create_nlp():
+    return RegexNLP()
+
+
+SENTENCES = ["I met Piek today.", "Then I saw Thomas!", "Did I call Selene?", "I went home."]
+
+
+class TestSplit(unittest.TestCase):
+    def test_split_at_sentences(self):
+        text = " ".join(SENTENCES)
+
+        chunks = split(text, 20, 100)
+
+        self.assertEqual([sentence + " " for sentence in SENTENCES[:-1]] + [SENTENCES[-1]],
+                         [text[start:end] for start, end in chunks])
+
+    def test_combine_sentences(self):
+        text = " ".join(SENTENCES)
+
+        chunks = split(text, 40, 100)
+
+        self.assertEqual(2, len(chunks))
+        self.assertEqual(text, "".join(text[start:end] for start, end in chunks))
+
+    def test_split_at_paragraphs(self):
+        text = "Title\n\nSome text without punctuation\n\nEnd"
+
+        chunks = split(text, 10, 100)
+
+        self.assertEqual(["Title\n\n", "Some text without punctuation\n\n", "End"],
+                         [text[start:end] for start, end in chunks])
+
+    def test_max_length(self):
+        text = "word " * 50 + "x" * 30
+
+        chunks = split(text, 20, 20)
+
+        self.assertTrue(all(end - start <= 20 for start, end in chunks))
+        self.assertEqual(text, "".join(text[start:end] for start, end in chunks))
+        self.assertTrue(all(text[start:end].endswith(" ") for start, end in chunks[:-3]))
+
+
+class TestChunkedNLP(unittest.TestCase):
+    def setUp(self):
+        self.nlp = RegexNLP()
+        self.text = " ".join(SENTENCES * 10)
+
+    def test_short_texts_are_not_chunked(self):
+        chunked = ChunkedNLP(self.nlp, max_length=100, min_length=1000, workers=4)
+
+        chunked.analyze(self.text)
+
+        self.assertEqual([self.text], self.nlp.analyzed)
+
+    def test_offsets_are_remapped(self):
+        chunked = ChunkedNLP(self.nlp, max_length=100, min_length=50, workers=4)
+        self.addCleanup(chunked.close)
+
+        doc = chunked.analyze(self.text)
+        expected = RegexNLP().analyze(self.text)
+
+        self.assertGreater(len(self.nlp.analyzed), 1)
+        self.assertTrue(all(len(chunk) <= 100 for chunk in self.nlp.analyzed))
+        self.assertEqual(expected, doc)
+        for token in doc.tokens + doc.named_entities + doc.entities:
+            self.assertEqual(token.text, self.text[token.segment[0]:token.segment[1]])
+
+    def test_chunks_are_analyzed_in_parallel(self):
+        chunked = ChunkedNLP(self.nlp, max_length=1000, min_length=50, workers=4)
+        self.addCleanup(chunked.close)
+
+        chunked.analyze(self.text)
+
+        # About one chunk per worker, sentences are not split
+        self.assertIn(len(self.nlp.analyzed), (4, 5))
+        self.assertNotIn(threading.get_ident(), self.nlp.threads)
+
+    def test_analyze_in_worker_processes(self):
+        chunked = ChunkedNLP(self.nlp, max_length=100, min_length=50, workers=2, nlp_factory=create_nlp)
+        self.addCleanup(chunked.close)
+
+        doc = chunked.analyze(self.text)
+
+        self.assertEqual([], self.nlp.analyzed)
+        self.assertEqual(RegexNLP().analyze(self.text), doc)
+
+    def test_close(self):
+        closed = []
+        self.nlp.close = lambda: closed.append(True)
+        chunked = ChunkedNLP(self.nlp, max_length=100, min_length=50, workers=2, nlp_factory=create_nlp)
+        chunked.analyze(self.text)
+        executor = chunked._executor
+
+        chunked.close()
+
+        self.assertIsNone(chunked._executor)
+        with self.assertRaises(RuntimeError):
+            executor.submit(create_nlp)
+        self.assertEqual([True], closed)
+
+    def test_model_id(self):
+        self.assertEqual("RegexNLP+chunked100", ChunkedNLP(self.nlp, max_length=100).model_id)
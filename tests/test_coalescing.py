@@ -0,0 +1,84 @@
+import time
+import unittest
+
+from cltl.combot.infra.event import Event
+from cltl.combot.infra.event.memory import SynchronousEventBus
+
+from cltl_service.publishing.coalescing import CoalescingEventBus, BatchEvent, unbatch, ORDER_GLOBAL
+
+
+class TestCoalescingEventBus(unittest.TestCase):
+    def setUp(self):
+        self.event_bus = SynchronousEventBus()
+        self.received = []
+        for topic in ("out", "other"):
+            self.event_bus.subscribe(topic, self.received.append)
+
+    def payloads(self, topic=None):
+        return [single.payload for event in self.received
+                for single in unbatch(event) if topic is None or event.metadata.topic == topic]
+
+    def test_batch_on_max_items(self):
+        coalescing = CoalescingEventBus(self.event_bus, ["out"], max_items=3, max_delay=10)
+        for idx in range(7):
+            coalescing.publish("out", Event.for_payload(idx))
+
+        self.assertEqual(2, len(self.received))
+        self.assertEqual(BatchEvent.__name__, self.received[0].payload.type)
+        self.assertEqual(list(range(6)), self.payloads())
+
+        coalescing.close()
+        self.assertEqual(list(range(7)), self.payloads())
+        self.assertEqual(6, self.received[-1].payload)
+
+    def test_batch_on_max_delay(self):
+        coalescing = CoalescingEventBus(self.event_bus, ["out"], max_items=100, max_delay=0.01)
+        coalescing.publish("out", Event.for_payload(1))
+        coalescing.publish("out", Event.for_payload(2))
+
+        for _ in range(100):
+            if self.received:
+                break
+            time.sleep(0.01)
+
+        self.assertEqual([1, 2], self.payloads())
+        coalescing.close()
+
+    def test_other_topics_are_not_coalesced(self):
+        coalescing = CoalescingEventBus(self.event_bus, ["out"], max_items=10, max_delay=10)
+        coalescing.publish("out", Event.for_payload(1))
+        coalescing.publish("other", Event.for_payload(2))
+
+        self.assertEqual([2], self.payloads())
+        coalescing.close()
+
+    def test_global_ordering(self):
+        coalescing = CoalescingEventBus(self.event_bus, ["out"], max_items=10, max_delay=10, ordering=ORDER_GLOBAL)
+        coalescing.publish("out", Event.for_payload(1))
+        coalescing.publish("out", Event.for_payload(2))
+        coalescing.publish("other", Event.for_payload(3))
+
+        self.assertEqual([1, 2, 3], self.payloads())
+        coalescing.close()
+
+    def test_drop_on_stop(self):
+        coalescing = CoalescingEventBus(self.event_bus, ["out"], max_items=10, max_delay=10, flush_on_stop=False)
+        coalescing.publish("out", Event.for_payload(1))
+        coalescing.close()
+
+        self.assertEqual([], self.received)
+
+    def test_rates(self):
+        coalescing = CoalescingEventBus(self.event_bus, ["out"], max_items=5, max_delay=10)
+        for idx in range(10):
+            coalescing.publish("out", Event.for_payload(idx))
+
+        rates = coalescing.rates()
+        self.assertAlmostEqual(rates["received"] / 5, rates["published"])
+        coalescing.close()
+
+    def test_unbatch_keeps_topic(self):
+        event = Event.with_topic(Event.for_payload(BatchEvent.create([1, 2])), "out")
+
+        self.assertEqual([("out", 1), ("out", 2)],
+                         [(single.metadata.topic, single.payload) for single in unbatch(event)])
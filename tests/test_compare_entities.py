@@ -0,0 +1,47 @@
+import unittest
+
+from cltl.nlp.api import NLP, Doc, Entity, EntityType
+from cltl.nlp.compare_entities import compare
+
+
+class FixedNLP(NLP):
+    def __init__(self, entities):
+        self.entities = entities
+
+    def analyze(self, text: str) -> Doc:
+        return Doc([], [], self.entities.get(text, []))
+
+
+class TestCompareEntities(unittest.TestCase):
+    def test_compare(self):
+        speaker = Entity("I", EntityType.SPEAKER, (0, 1))
+        cup = Entity("cup", EntityType.OBJECT, (8, 11))
+        table = Entity("table", EntityType.OBJECT, (19, 24))
+        reference = FixedNLP({"I see a cup on the table": [speaker, cup], "You": [Entity("You", EntityType.HEARER, (0, 3))]})
+        candidate = FixedNLP({"I see a cup on the table": [speaker, cup, table]})
+
+        report = compare(reference, candidate, ["I see a cup on the table", "You", "ok"])
+
+        self.assertEqual(3, report.texts)
+        self.assertEqual(3, report.reference_entities)
+        self.assertEqual(3, report.candidate_entities)
+        self.assertEqual(2, report.matched_entities)
+        self.assertAlmostEqual(2 / 3, report.precision)
+        self.assertAlmostEqual(2 / 3, report.recall)
+        self.assertAlmostEqual(2 / 3, report.f1)
+        self.assertIn("f1: 0.667", report.summary())
+
+    def test_compare_matches_type(self):
+        reference = FixedNLP({"you": [Entity("you", EntityType.HEARER, (0, 3))]})
+        candidate = FixedNLP({"you": [Entity("you", EntityType.SPEAKER, (0, 3))]})
+
+        report = compare(reference, candidate, ["you"])
+
+        self.assertEqual(0, report.matched_entities)
+        self.assertEqual(0.0, report.f1)
+
+    def test_compare_without_entities(self):
+        report = compare(FixedNLP({}), FixedNLP({}), ["ok"])
+
+        self.assertEqual(1.0, report.precision)
+        self.assertEqual(1.0, report.recall)
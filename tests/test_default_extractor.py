@@ -0,0 +1,162 @@
+import unittest
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+from emissor.representation.scenario import Mention, Annotation
+
+from cltl.mention_extraction.default_extractor import NewFaceMentionDetector, ObjectMentionDetector, \
+    DefaultMentionExtractor, TextMentionDetector, TextPerspectiveDetector, ImagePerspectiveDetector, select_mentions
+from cltl.mention_extraction.salience import SalienceCache
+from cltl.nlp.api import Entity, EntityType
+
+
+def _mention(value):
+    return Mention("mention_id", [SimpleNamespace(bounds=(0, 0, 1, 1))], [Annotation("type", value, "source", 0)])
+
+
+def _object(label):
+    return _mention(SimpleNamespace(label=label, confidence=1.0))
+
+
+class TestNewFaceMentionDetector(unittest.TestCase):
+    def test_new_faces_per_scenario(self):
+        detector = NewFaceMentionDetector()
+
+        self.assertEqual(1, len(detector.filter_mentions([_mention("face_1")], "scenario_1")))
+        self.assertEqual(1, len(detector.filter_mentions([_mention("face_1")], "scenario_2")))
+        self.assertEqual(0, len(detector.filter_mentions([_mention("face_1")], "scenario_1")))
+        self.assertEqual(0, len(detector.filter_mentions([_mention("face_1")], "scenario_2")))
+
+    def test_filter_batch(self):
+        detector = NewFaceMentionDetector()
+        batch = [([_mention("face_1")], "scenario_1"), ([_mention("face_1")], "scenario_2"),
+                 ([_mention("face_1"), _mention("face_2")], "scenario_1")]
+
+        self.assertEqual([1, 1, 1], [len(mentions) for mentions in detector.filter_batch(batch)])
+        self.assertEqual(["face_1", "face_2"], detector.get_state("scenario_1"))
+
+    def test_clear_scenario(self):
+        detector = NewFaceMentionDetector()
+        detector.filter_mentions([_mention("face_1")], "scenario_1")
+        detector.clear_scenario("scenario_1")
+
+        self.assertEqual(1, len(detector.filter_mentions([_mention("face_1")], "scenario_1")))
+
+
+class TestObjectMentionDetector(unittest.TestCase):
+    def test_previous_objects_per_scenario(self):
+        detector = ObjectMentionDetector()
+
+        self.assertEqual(1, len(detector.filter_mentions([_object("book")], "scenario_1")))
+        self.assertEqual(1, len(detector.filter_mentions([_object("book")], "scenario_2")))
+        self.assertEqual(0, len(detector.filter_mentions([_object("book")], "scenario_1")))
+        self.assertEqual(1, len(detector.filter_mentions([_object("cup")], "scenario_2")))
+        self.assertEqual(1, len(detector.filter_mentions([_object("book")], "scenario_2")))
+
+    def test_filter_batch(self):
+        detector = ObjectMentionDetector()
+        batch = [([_object("book")], "scenario_1"), ([_object("book"), _object("cup")], "scenario_1"),
+                 ([_object("cup")], "scenario_1"), ([_object("book")], "scenario_1")]
+
+        self.assertEqual([1, 1, 0, 1], [len(mentions) for mentions in detector.filter_batch(batch)])
+        self.assertEqual(["book"], detector.get_state("scenario_1"))
+
+    def test_unknown_objects_are_ignored(self):
+        detector = ObjectMentionDetector()
+
+        self.assertEqual(0, len(detector.filter_mentions([_object("unicorn")], "scenario_1")))
+
+
+class TestTextMentionDetector(unittest.TestCase):
+    def _entity(self, text, entity_type=EntityType.OBJECT):
+        return Mention("mention_id", [], [Annotation(Entity.__name__, Entity(text, entity_type, (0, len(text))), "NLP", 0)])
+
+    def test_without_salience(self):
+        detector = TextMentionDetector()
+
+        self.assertEqual(1, len(detector.filter_mentions([self._entity("cup")], "scenario")))
+        self.assertEqual(1, len(detector.filter_mentions([self._entity("cup")], "scenario")))
+        self.assertEqual(0, len(detector.filter_mentions([self._entity("I", EntityType.SPEAKER)], "scenario")))
+
+    def test_with_salience(self):
+        detector = TextMentionDetector(SalienceCache(min_turns=2))
+
+        self.assertEqual(1, len(detector.filter_mentions([self._entity("cup")], "scenario")))
+        self.assertEqual(0, len(detector.filter_mentions([self._entity("Cup")], "scenario")))
+        self.assertEqual(1, len(detector.filter_mentions([self._entity("cup")], "scenario")))
+        self.assertEqual(1, detector.state_size())
+
+        detector.clear_scenario("scenario")
+        self.assertEqual(0, detector.state_size())
+
+
+class TestDefaultMentionExtractor(unittest.TestCase):
+    def setUp(self) -> None:
+        self.extractor = self._create_extractor()
+
+    def _create_extractor(self):
+        return DefaultMentionExtractor(TextMentionDetector(), TextPerspectiveDetector(),
+                                       ImagePerspectiveDetector(0.5), NewFaceMentionDetector(),
+                                       ObjectMentionDetector())
+
+    def test_scenario_state_transfer(self):
+        self.extractor.extract_face_mentions([_mention("face_1")], "scenario_1")
+        self.extractor.extract_object_mentions([_object("book")], "scenario_1")
+
+        state = self.extractor.get_scenario_state("scenario_1")
+        self.assertEqual({"face": ["face_1"], "object": ["book"]}, state)
+
+        other_extractor = self._create_extractor()
+        other_extractor.set_scenario_state("scenario_1", SimpleNamespace(**state))
+
+        self.assertEqual(0, len(other_extractor.extract_face_mentions([_mention("face_1")], "scenario_1")))
+        self.assertEqual(0, len(other_extractor.extract_object_mentions([_object("book")], "scenario_1")))
+
+    def test_clear_scenario(self):
+        self.extractor.extract_face_mentions([_mention("face_1")], "scenario_1")
+        self.extractor.clear_scenario("scenario_1")
+
+        self.assertEqual({}, self.extractor.get_scenario_state("scenario_1"))
+
+    def test_extract_batch(self):
+        batch = [([_mention("face_1"), _mention("face_2")], "scenario_1"),
+                 ([_mention("face_1")], "scenario_2"),
+                 ([_mention("face_1"), _mention("face_3")], "scenario_1")]
+
+        results = self.extractor.extract_face_mentions_batch(batch)
+
+        self.assertEqual([["face_1", "face_2"], ["face_1"], ["face_3"]],
+                         [[mention.item.id for mention in mentions] for mentions in results])
+        self.assertEqual(1, len({mention.timestamp for mentions in results for mention in mentions}))
+        self.assertEqual([["book"], []],
+                         [[mention.item.label for mention in mentions] for mentions
+                          in self.extractor.extract_object_mentions_batch([([_object("book")], "scenario_1"),
+                                                                           ([_object("book")], "scenario_1")])])
+
+    def test_stage_spans(self):
+        stages = []
+
+        @contextmanager
+        def span(name):
+            stages.append(name)
+            yield
+
+        extractor = DefaultMentionExtractor(TextMentionDetector(), TextPerspectiveDetector(),
+                                            ImagePerspectiveDetector(0.5), NewFaceMentionDetector(),
+                                            ObjectMentionDetector(), span=span)
+        extractor.extract_face_mentions([_mention("face_1")], "scenario_1")
+        extractor.extract_face_mentions_batch([([_mention("face_2")], "scenario_1")])
+
+        self.assertEqual(["filtering", "creation", "filtering", "creation"], stages)
+
+
+class TestSelectMentions(unittest.TestCase):
+    def test_select_mentions(self):
+        mentions = list(range(6))
+        index = {"Token": (0, 3), "NamedEntity": (3, 4), "Entity": (4, 6)}
+
+        self.assertEqual([3, 4, 5], select_mentions(mentions, index, ("Entity", "NamedEntity")))
+        self.assertEqual([3, 4, 5], select_mentions(mentions, SimpleNamespace(**index), ("NamedEntity", "Entity")))
+        self.assertEqual([], select_mentions(mentions, index, ("Other",)))
+        self.assertEqual(mentions, select_mentions(mentions, None, ("Entity",)))
+        self.assertEqual(mentions, select_mentions(mentions, index, None))
@@ -0,0 +1,165 @@
+import unittest
+from configparser import ConfigParser
+from types import SimpleNamespace
+
+from emissor.representation.scenario import Mention, Annotation
+
+from cltl.combot.infra.config.local import LocalConfigurationManager
+from cltl.mention_extraction.default_extractor import NewFaceMentionDetector, ObjectMentionDetector
+from cltl.mention_extraction.pipeline import DetectorPipeline, NoveltyStage, SamplingStage, SalienceStage, \
+    ThresholdStage, TypeStage, NOVELTY_PREVIOUS
+from cltl.mention_extraction.salience import SalienceCache
+from cltl.nlp.api import Entity, EntityType, ObjectType
+
+
+def _mention(value, mention_id="mention_id"):
+    return Mention(mention_id, [SimpleNamespace(bounds=(0, 0, 1, 1))], [Annotation("type", value, "source", 0)])
+
+
+def _object(label, confidence=1.0, mention_id="mention_id"):
+    return _mention(SimpleNamespace(label=label, confidence=confidence), mention_id)
+
+
+def _config(**options):
+    parser = ConfigParser()
+    parser.read_dict({"cltl.mention_extraction.pipeline.test": options})
+
+    return LocalConfigurationManager(parser)
+
+
+class TestDetectorPipeline(unittest.TestCase):
+    def test_novelty_per_scenario_as_face_detector(self):
+        pipeline = DetectorPipeline([NoveltyStage()])
+        detector = NewFaceMentionDetector()
+
+        for faces, scenario_id in [(["face_1"], "scenario_1"), (["face_1", "face_2"], "scenario_1"),
+                                   (["face_1"], "scenario_2"), (["face_2", None], "scenario_1")]:
+            mentions = [_mention(face) for face in faces]
+            self.assertEqual(detector.filter_mentions(mentions, scenario_id),
+                             pipeline.filter_mentions(mentions, scenario_id))
+
+    def test_novelty_to_previous_as_object_detector(self):
+        pipeline = DetectorPipeline([TypeStage([object_type.value for object_type in ObjectType]),
+                                     NoveltyStage(NOVELTY_PREVIOUS)])
+        detector = ObjectMentionDetector()
+
+        for labels, scenario_id in [(["book"], "scenario_1"), (["book", "cup"], "scenario_1"),
+                                    (["book"], "scenario_2"), (["cup"], "scenario_1"), (["book"], "scenario_1"),
+                                    (["unicorn"], "scenario_1")]:
+            mentions = [_object(label) for label in labels]
+            self.assertEqual(detector.filter_mentions(mentions, scenario_id),
+                             pipeline.filter_mentions(mentions, scenario_id))
+
+    def test_novelty_to_previous_remembers_rejected_mentions(self):
+        pipeline = DetectorPipeline([ThresholdStage(0.5), TypeStage([object_type.value for object_type in ObjectType]),
+                                     NoveltyStage(NOVELTY_PREVIOUS)])
+
+        self.assertEqual([], pipeline.filter_mentions([_object("book", 0.1)], "scenario_1"))
+        # The book was seen in the previous frame, though it was rejected by the threshold stage
+        self.assertEqual([], pipeline.filter_mentions([_object("book")], "scenario_1"))
+        self.assertEqual(1, len(pipeline.filter_mentions([_object("cup")], "scenario_1")))
+
+    def test_filter_batch_as_sequential_filtering(self):
+        pipeline = DetectorPipeline([NoveltyStage(NOVELTY_PREVIOUS)])
+        sequential = DetectorPipeline([NoveltyStage(NOVELTY_PREVIOUS)])
+        batch = [([_object("book")], "scenario_1"), ([_object("book"), _object("cup")], "scenario_1"),
+                 ([_object("book")], "scenario_2"), ([_object("cup")], "scenario_1")]
+
+        self.assertEqual([sequential.filter_mentions(mentions, scenario_id) for mentions, scenario_id in batch],
+                         pipeline.filter_batch(batch))
+        self.assertEqual(sequential.counters(), pipeline.counters())
+
+    def test_mentions_are_not_copied(self):
+        pipeline = DetectorPipeline([ThresholdStage(0.5), TypeStage()])
+        mentions = [_object("cup"), _object("book", 0.1)]
+
+        filtered = pipeline.filter_mentions(mentions, "scenario_1")
+
+        self.assertEqual(1, len(filtered))
+        self.assertIs(mentions[0], filtered[0])
+
+    def test_type_filter(self):
+        pipeline = DetectorPipeline([TypeStage(exclude=["speaker", "hearer"])])
+        mentions = [_mention(Entity("I", EntityType.SPEAKER, (0, 1))),
+                    _mention(Entity("cup", EntityType.OBJECT, (2, 5))),
+                    _mention(SimpleNamespace(text="you", type="HEARER"))]
+
+        self.assertEqual(mentions[1:2], pipeline.filter_mentions(mentions, "scenario_1"))
+
+    def test_sampling_is_deterministic(self):
+        pipeline = DetectorPipeline([SamplingStage(0.5)])
+        mentions = [_object("cup", mention_id=f"mention_{idx}") for idx in range(200)]
+
+        sampled = pipeline.filter_mentions(mentions, "scenario_1")
+
+        self.assertTrue(50 < len(sampled) < 150)
+        self.assertEqual(sampled, pipeline.filter_mentions(mentions, "scenario_1"))
+
+    def test_salience(self):
+        pipeline = DetectorPipeline([SalienceStage(SalienceCache(min_turns=2))])
+        mention = _mention(Entity("cup", EntityType.OBJECT, (0, 3)))
+
+        self.assertEqual(1, len(pipeline.filter_mentions([mention], "scenario_1")))
+        self.assertEqual(0, len(pipeline.filter_mentions([mention], "scenario_1")))
+        self.assertEqual(1, len(pipeline.filter_mentions([mention], "scenario_1")))
+
+    def test_counters(self):
+        pipeline = DetectorPipeline([ThresholdStage(0.5), NoveltyStage()])
+
+        pipeline.filter_mentions([_object("cup"), _object("cup"), _object("book", 0.1), _object("book")],
+                                 "scenario_1")
+
+        self.assertEqual({"received": 4, "threshold": 1, "novelty": 1, "accepted": 2}, pipeline.counters())
+
+    def test_state(self):
+        pipeline = DetectorPipeline([ThresholdStage(0.5), NoveltyStage()])
+        pipeline.filter_mentions([_mention("face_1")], "scenario_1")
+
+        state = pipeline.get_state("scenario_1")
+        restored = DetectorPipeline([ThresholdStage(0.5), NoveltyStage()])
+        restored.set_state("scenario_1", state)
+
+        self.assertEqual({"novelty": ["face_1"]}, state)
+        self.assertIsNone(pipeline.get_state("scenario_2"))
+        self.assertEqual([], restored.filter_mentions([_mention("face_1")], "scenario_1"))
+        self.assertEqual(1, restored.state_size())
+
+        restored.clear_scenario("scenario_1")
+        self.assertEqual(0, restored.state_size())
+
+    def test_unique_stage_names(self):
+        with self.assertRaises(ValueError):
+            DetectorPipeline([NoveltyStage(), NoveltyStage()])
+
+
+class TestDetectorPipelineConfig(unittest.TestCase):
+    def test_from_config(self):
+        config = _config(stages="threshold, types, novelty", threshold="0.5", types="cup, book",
+                         novelty="previous", annotation_types="ObjectAnnotation")
+
+        pipeline = DetectorPipeline.from_config(config, "cltl.mention_extraction.pipeline.test")
+
+        self.assertEqual(("ObjectAnnotation",), pipeline.annotation_types)
+        mentions = [_object("cup"), _object("book", 0.1), _object("chair")]
+        self.assertEqual(mentions[:1], pipeline.filter_mentions(mentions, "scenario_1"))
+        self.assertEqual([], pipeline.filter_mentions(mentions, "scenario_1"))
+
+    def test_default_types(self):
+        config = _config(stages="types")
+
+        pipeline = DetectorPipeline.from_config(config, "cltl.mention_extraction.pipeline.test",
+                                                default_types=["cup"])
+
+        self.assertEqual(1, len(pipeline.filter_mentions([_object("cup"), _object("chair")], "scenario_1")))
+
+    def test_disabled(self):
+        config = _config(enabled="False", stages="novelty")
+
+        self.assertIsNone(DetectorPipeline.from_config(config, "cltl.mention_extraction.pipeline.test"))
+        self.assertIsNone(DetectorPipeline.from_config(config, "cltl.mention_extraction.pipeline.other"))
+
+    def test_invalid_stages(self):
+        with self.assertRaises(ValueError):
+            DetectorPipeline.from_config(_config(stages="unknown"), "cltl.mention_extraction.pipeline.test")
+        with self.assertRaises(ValueError):
+            DetectorPipeline.from_config(_config(stages="salience"), "cltl.mention_extraction.pipeline.test")
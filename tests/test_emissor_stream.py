@@ -0,0 +1,94 @@
+import os
+import tempfile
+import unittest
+
+from emissor.persistence import ScenarioStorage
+from emissor.representation.scenario import Modality, TextSignal, Mention, Annotation, ScenarioContext
+
+from cltl.nlp.emissor_stream import chunked, read_signals, signal_path, SignalWriter
+
+
+class TestEmissorStream(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.storage = ScenarioStorage(self.tmp_dir.name)
+        scenario = self.storage.create_scenario("test", 0, 1, ScenarioContext("agent"))
+        for idx in range(10):
+            scenario.append_signal(TextSignal.for_scenario("test", idx, idx + 1, None, f"Text {idx}, [with] {{braces}}"))
+        self.storage.save_scenario(scenario)
+        self.path = signal_path(self.storage, scenario.scenario, Modality.TEXT)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_read_signals(self):
+        expected = self.storage.load_modality("test", Modality.TEXT)
+
+        for read_size in (7, 64, 1024 * 1024):
+            signals = list(read_signals(self.path, TextSignal, read_size=read_size))
+            self.assertEqual([signal.id for signal in expected], [signal.id for signal in signals])
+            self.assertEqual([signal.text for signal in expected], [signal.text for signal in signals])
+
+    def test_read_empty(self):
+        with open(self.path, "w") as json_file:
+            json_file.write("[ ]")
+
+        self.assertEqual([], list(read_signals(self.path, TextSignal, read_size=1)))
+
+    def test_read_truncated(self):
+        with open(self.path) as json_file:
+            content = json_file.read()
+        with open(self.path, "w") as json_file:
+            json_file.write(content[:len(content) // 2])
+
+        with self.assertRaises(ValueError):
+            list(read_signals(self.path, TextSignal, read_size=16))
+
+    def test_chunked(self):
+        self.assertEqual([[0, 1, 2], [3, 4]], list(chunked(range(5), 3)))
+        self.assertEqual([], list(chunked([], 3)))
+
+    def test_write_signals(self):
+        with SignalWriter(self.path, TextSignal) as writer:
+            for chunk in chunked(read_signals(self.path, TextSignal, read_size=64), 3):
+                for signal in chunk:
+                    signal.mentions.append(Mention("mention", [signal.ruler], [Annotation("Test", signal.text, "test", 1)]))
+                writer.write_all(chunk)
+
+        signals = self.storage.load_modality("test", Modality.TEXT)
+        self.assertEqual(10, len(signals))
+        self.assertTrue(all(len(signal.mentions) == 1 for signal in signals))
+        self.assertEqual(["test.json", "text.json"], sorted(os.listdir(os.path.join(self.tmp_dir.name, "test"))))
+
+    def test_write_keeps_permissions(self):
+        os.chmod(self.path, 0o644)
+
+        with SignalWriter(self.path, TextSignal) as writer:
+            writer.write_all(read_signals(self.path, TextSignal))
+
+        self.assertEqual(0o644, os.stat(self.path).st_mode & 0o777)
+
+    def test_write_new_file(self):
+        path = os.path.join(self.tmp_dir.name, "new.json")
+        umask = os.umask(0o022)
+        try:
+            with SignalWriter(path, TextSignal) as writer:
+                writer.write_all(read_signals(self.path, TextSignal))
+        finally:
+            os.umask(umask)
+
+        self.assertEqual(0o644, os.stat(path).st_mode & 0o777)
+        self.assertEqual(10, len(list(read_signals(path, TextSignal))))
+
+    def test_write_is_atomic(self):
+        with open(self.path) as json_file:
+            content = json_file.read()
+
+        with self.assertRaises(RuntimeError):
+            with SignalWriter(self.path, TextSignal) as writer:
+                writer.write_all(read_signals(self.path, TextSignal))
+                raise RuntimeError()
+
+        with open(self.path) as json_file:
+            self.assertEqual(content, json_file.read())
+        self.assertEqual(["test.json", "text.json"], sorted(os.listdir(os.path.join(self.tmp_dir.name, "test"))))
@@ -0,0 +1,79 @@
+import unittest
+from types import SimpleNamespace
+
+from emissor.representation.scenario import Mention
+
+from cltl.mention_extraction.api import ImageMention, ImagePerspective, Entity, Perspective, Source
+from cltl.mention_extraction.face_join import FaceJoin, KEY_IMAGE
+
+_SOURCE = Source("camera", ["sensor"], "uri")
+
+
+def _mention(mention_id, image="image_1", bounds=(0, 0, 1, 1)):
+    return Mention(mention_id, [SimpleNamespace(container_id=image, bounds=bounds)], [])
+
+
+def _identity(mention_id, timestamp=1):
+    return ImageMention(mention_id, mention_id, _SOURCE, mention_id, (0, 0, 1, 1),
+                        Entity("face", ["face"], "face", None), {}, 1.0, "scenario", timestamp)
+
+
+def _perspective(mention_id, timestamp=2):
+    return ImagePerspective(mention_id, mention_id, _SOURCE, mention_id, (0, 0, 1, 1),
+                            Entity("speaker", ["person"], "speaker", None), Perspective("EMOTION:joy", 0.9),
+                            "scenario", timestamp)
+
+
+class TestFaceJoin(unittest.TestCase):
+    def setUp(self):
+        self.join = FaceJoin(window=1.0, max_pending=10)
+
+    def test_join_identity_and_emotion(self):
+        self.assertEqual([], self.join.add_identities([_mention("m1")], [_identity("m1")], "scenario", now=0))
+
+        records = self.join.add_perspectives([_mention("m1")], [_perspective("m1")], "scenario", now=0.1)
+
+        self.assertEqual(1, len(records))
+        self.assertIsInstance(records[0], ImageMention)
+        self.assertEqual("face", records[0].item.id)
+        self.assertEqual({"emotion": "EMOTION:joy", "confidence": 0.9}, records[0].perspective)
+        self.assertEqual(2, records[0].timestamp)
+        self.assertEqual(0, len(self.join))
+
+    def test_filtered_side_is_not_awaited(self):
+        self.join.add_identities([_mention("m1")], [], "scenario", now=0)
+        records = self.join.add_perspectives([_mention("m1")], [_perspective("m1")], "scenario", now=0.1)
+
+        self.assertEqual([_perspective("m1")], records)
+
+    def test_expire(self):
+        self.join.add_identities([_mention("m1")], [_identity("m1")], "scenario", now=0)
+        self.join.add_perspectives([_mention("m2")], [], "scenario", now=0.5)
+
+        self.assertEqual([], self.join.expire(now=0.9))
+        self.assertEqual([_identity("m1")], self.join.expire(now=1.0))
+        self.assertEqual([], self.join.expire(now=2.0))
+        self.assertEqual(0, len(self.join))
+
+    def test_max_pending(self):
+        join = FaceJoin(window=1.0, max_pending=2)
+        records = join.add_identities([_mention(f"m{idx}") for idx in range(3)],
+                                      [_identity(f"m{idx}") for idx in range(3)], "scenario", now=0)
+
+        self.assertEqual([_identity("m0")], records)
+        self.assertEqual(2, len(join))
+
+    def test_flush_scenario(self):
+        self.join.add_identities([_mention("m1")], [_identity("m1")], "scenario_1", now=0)
+        self.join.add_identities([_mention("m2")], [_identity("m2")], "scenario_2", now=0)
+
+        self.assertEqual([_identity("m1")], self.join.flush("scenario_1"))
+        self.assertEqual([_identity("m2")], self.join.flush())
+
+    def test_image_key(self):
+        join = FaceJoin(window=1.0, key=KEY_IMAGE)
+        join.add_identities([_mention("m1")], [_identity("m1")], "scenario", now=0)
+        records = join.add_perspectives([_mention("m2")], [_perspective("m2")], "scenario", now=0)
+
+        self.assertEqual(1, len(records))
+        self.assertEqual({"emotion": "EMOTION:joy", "confidence": 0.9}, records[0].perspective)
@@ -0,0 +1,105 @@
+import re
+import unittest
+
+from cltl.nlp.api import NLP, Doc, Token, POS, Entity, EntityType
+from cltl.nlp.incremental import IncrementalNLP
+
+
+class WhitespaceNLP(NLP):
+    def __init__(self):
+        self.analyzed = []
+
+    def analyze(self, text: str) -> Doc:
+        self.analyzed.append(text)
+        tokens = [Token(match.group(), POS.PUNCT if match.group() in ".!?" else POS.X, match.span())
+                  for match in re.finditer(r"\w+|[^\w\s]", text)]
+        entities = [Entity(token.text, EntityType.OBJECT, token.segment) for token in tokens if token.text == "book"]
+
+        return Doc(tokens, [], entities)
+
+
+class TestIncrementalNLP(unittest.TestCase):
+    def setUp(self) -> None:
+        self.nlp = WhitespaceNLP()
+        self.incremental = IncrementalNLP(self.nlp)
+
+    def test_analyze_growing_text(self):
+        _, delta = self.incremental.analyze("signal", "I see a book.")
+        self.assertEqual(["I", "see", "a", "book", "."], [token.text for token in delta.tokens])
+
+        self.incremental.analyze("signal", "I see a book. And")
+        doc, delta = self.incremental.analyze("signal", "I see a book. And a book")
+
+        self.assertEqual(["I see a book.", "I see a book. And", "And a book"], self.nlp.analyzed)
+
+        full_text = "I see a book. And a book"
+        self.assertEqual([full_text[slice(*token.segment)] for token in doc.tokens],
+                         [token.text for token in doc.tokens])
+        self.assertEqual(["I", "see", "a", "book", ".", "And", "a", "book"], [token.text for token in doc.tokens])
+        self.assertEqual([(8, 12), (20, 24)], [entity.segment for entity in doc.entities])
+
+        # The last sentence is not completed yet
+        self.assertEqual(Doc([], [], []), delta)
+
+        _, delta = self.incremental.analyze("signal", "I see a book. And a book. So")
+        self.assertEqual(["And", "a", "book", "."], [token.text for token in delta.tokens])
+        self.assertEqual([(20, 24)], [entity.segment for entity in delta.entities])
+
+    def test_provisional_annotations_are_published_once(self):
+        deltas = [self.incremental.analyze("signal", text)[1]
+                  for text in ["A book", "A book and", "A book and a book", "A book and a book."]]
+
+        self.assertEqual([[], [], [], [(2, 6), (13, 17)]],
+                         [[entity.segment for entity in delta.entities] for delta in deltas])
+
+    def test_final_text_without_sentence_boundary(self):
+        _, delta = self.incremental.analyze("signal", "A book. And a book")
+        self.assertEqual([(2, 6)], [entity.segment for entity in delta.entities])
+
+        _, delta = self.incremental.analyze("signal", "A book. And a book", final=True)
+
+        self.assertEqual([(14, 18)], [entity.segment for entity in delta.entities])
+        self.assertEqual({"prefixes": 0}, self.incremental.state_sizes())
+
+    def test_flush(self):
+        self.incremental.analyze("signal", "A book. And a book")
+
+        self.assertEqual([(14, 18)], [entity.segment for entity in self.incremental.flush("signal").entities])
+        self.assertIsNone(self.incremental.flush("signal"))
+
+    def test_analyze_with_language(self):
+        nlp = self.nlp
+        other_nlp = WhitespaceNLP()
+
+        class LanguageNLP(WhitespaceNLP):
+            def for_language(self, language):
+                return other_nlp if language == "nl" else nlp
+
+        incremental = IncrementalNLP(LanguageNLP())
+        incremental.analyze("signal", "Een boek. En", "nl")
+        incremental.analyze("signal", "Een boek. En een boek", "nl")
+
+        self.assertEqual(["Een boek. En", "En een boek"], other_nlp.analyzed)
+        self.assertEqual([], nlp.analyzed)
+
+    def test_analyze_changed_prefix(self):
+        self.incremental.analyze("signal", "I see a book. And")
+        doc, delta = self.incremental.analyze("signal", "I saw a book. And")
+
+        self.assertEqual("I saw a book. And", self.nlp.analyzed[-1])
+        self.assertEqual(["I", "saw", "a", "book", "."], [token.text for token in delta.tokens])
+        self.assertEqual(["I", "saw", "a", "book", ".", "And"], [token.text for token in doc.tokens])
+
+    def test_signals_are_independent(self):
+        self.incremental.analyze("signal_1", "A book. And")
+        self.incremental.analyze("signal_2", "A book. And more")
+
+        self.assertEqual(["A book. And", "A book. And more"], self.nlp.analyzed)
+
+    def test_max_signals(self):
+        incremental = IncrementalNLP(self.nlp, max_signals=1)
+        incremental.analyze("signal_1", "A book. And")
+        incremental.analyze("signal_2", "A book. And")
+        incremental.analyze("signal_1", "A book. And more")
+
+        self.assertEqual("A book. And more", self.nlp.analyzed[-1])
@@ -0,0 +1,80 @@
+import logging
+import tracemalloc
+import unittest
+
+from cltl_service.monitoring.memory import MemoryWatchdog
+
+
+class TestMemoryWatchdog(unittest.TestCase):
+    def setUp(self):
+        self.watchdog = MemoryWatchdog("test", interval=3600, top_n=5, state_threshold=2)
+        self.state = {"faces": 1}
+        self.watchdog.register_state("detector", lambda: dict(self.state))
+
+    def tearDown(self):
+        self.watchdog.stop()
+
+    def test_check_reports_state_sizes(self):
+        self.watchdog.start()
+
+        report = self.watchdog.check()
+
+        self.assertEqual({"detector.faces": 1}, report.state_sizes)
+        self.assertGreater(report.traced_memory, 0)
+
+    def test_check_reports_allocation_diff(self):
+        self.watchdog.start()
+
+        data = [bytearray(1024) for _ in range(1000)]
+        report = self.watchdog.check()
+
+        self.assertTrue(report.top_diff)
+        self.assertLessEqual(len(report.top_diff), 5)
+        self.assertEqual(1000, len(data))
+
+    def test_check_warns_on_state_threshold(self):
+        self.watchdog.start()
+        self.state["faces"] = 3
+
+        with self.assertLogs("cltl_service.monitoring.memory", level=logging.WARNING) as logs:
+            self.watchdog.check()
+
+        self.assertIn("detector.faces", logs.output[0])
+
+    def test_check_warns_with_allocation_diff_on_memory_threshold(self):
+        watchdog = MemoryWatchdog("test", interval=3600, top_n=5, memory_threshold=1)
+        self.addCleanup(watchdog.stop)
+        watchdog.start()
+
+        data = [bytearray(1024) for _ in range(1000)]
+        with self.assertLogs("cltl_service.monitoring.memory", level=logging.WARNING) as logs:
+            report = watchdog.check()
+
+        self.assertIn("exceeds threshold", logs.output[0])
+        self.assertEqual(report.top_diff, [output.split("Memory diff of test: ", 1)[1] for output in logs.output[1:]])
+        self.assertTrue(report.top_diff)
+        self.assertEqual(1000, len(data))
+
+    def test_stop_without_start(self):
+        self.watchdog.stop()
+
+    def test_tracing_is_shared_by_watchdogs(self):
+        other = MemoryWatchdog("other", interval=3600)
+        self.watchdog.start()
+        other.start()
+
+        self.watchdog.stop()
+        self.assertTrue(tracemalloc.is_tracing())
+        self.assertIsNotNone(other.check())
+
+        other.stop()
+        self.assertFalse(tracemalloc.is_tracing())
+
+    def test_tracing_started_externally_is_not_stopped(self):
+        tracemalloc.start()
+        self.addCleanup(tracemalloc.stop)
+
+        self.watchdog.start()
+        self.watchdog.stop()
+
+        self.assertTrue(tracemalloc.is_tracing())
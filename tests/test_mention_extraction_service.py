@@ -0,0 +1,429 @@
+import json
+import os
+import tempfile
+import time
+import unittest
+from types import SimpleNamespace
+
+from cltl.combot.event.emissor import ScenarioStarted, ScenarioStopped
+from cltl.combot.infra.event import Event
+from cltl.combot.infra.event.memory import SynchronousEventBus
+from cltl.combot.infra.resource.threaded import ThreadedResourceManager
+from cltl.combot.infra.time_util import timestamp_now
+from cltl_service.vector_id.schema import VectorIdentityEvent
+from emissor.representation.scenario import Annotation, Mention
+
+from cltl.mention_extraction.face_join import FaceJoin
+from cltl.mention_extraction.default_extractor import DefaultMentionExtractor, TextMentionDetector, \
+    TextPerspectiveDetector, ImagePerspectiveDetector, NewFaceMentionDetector, ObjectMentionDetector
+from cltl.nlp.api import Entity, EntityType
+from cltl_service.mention_extraction.service import MentionExtractionService
+from cltl_service.mention_extraction.sharding import ScenarioShard, ShardedEventBus
+from cltl_service.mention_extraction.snapshot import ScenarioSnapshot, ServiceSnapshot, SnapshotStore
+from cltl_service.monitoring.memory import MemoryWatchdog
+from cltl_service.monitoring.tracing import Tracer
+from cltl_service.nlp.schema import IndexedAnnotationEvent
+from cltl_service.publishing.coalescing import BatchEvent, CoalescingEventBus, unbatch
+from cltl_service.scheduling.staleness import StalenessPolicy
+
+
+def _extractor(span=None):
+    return DefaultMentionExtractor(TextMentionDetector(), TextPerspectiveDetector(), ImagePerspectiveDetector(0.5),
+                                   NewFaceMentionDetector(), ObjectMentionDetector(), span=span)
+
+
+def _scenario_event(event_type, scenario_id):
+    return event_type.create(SimpleNamespace(id=scenario_id))
+
+
+def _text_event(scenario_id, text="cup", signal_id="signal_1"):
+    mention = Mention(f"{scenario_id}_{text}", [SimpleNamespace(container_id=signal_id, start=0, stop=len(text))],
+                      [Annotation(Entity.__name__, Entity(text, EntityType.OBJECT, (0, len(text))), "NLP", 0)])
+
+    return IndexedAnnotationEvent.create([mention], {Entity.__name__: (0, 1)}, signal_id, scenario_id)
+
+
+def _image_signal_event(image_id, scenario_id):
+    return SimpleNamespace(type="ImageSignalEvent",
+                           signal=SimpleNamespace(id=image_id, time=SimpleNamespace(container_id=scenario_id)))
+
+
+def _face_mention(face_id, image_id, mention_id=None):
+    return Mention(mention_id if mention_id else f"{image_id}_{face_id}",
+                   [SimpleNamespace(container_id=image_id, bounds=(0, 0, 1, 1))],
+                   [Annotation("VectorIdentity", face_id, "face_recognition", 0)])
+
+
+def _face_event(face_id, image_id, start=None, scenario_id=None):
+    payload = SimpleNamespace(type=VectorIdentityEvent.__name__, mentions=[_face_mention(face_id, image_id)])
+    if start is not None:
+        payload.signal = SimpleNamespace(time=SimpleNamespace(container_id=scenario_id, start=start))
+
+    return payload
+
+
+class MentionExtractionServiceTestCase(unittest.TestCase):
+    def setUp(self):
+        self.event_bus = SynchronousEventBus()
+        self.resource_manager = ThreadedResourceManager()
+        self.output = []
+        self.event_bus.subscribe("output", self.output.append)
+        self.service = None
+
+    def tearDown(self):
+        if self.service:
+            self.service.stop()
+
+    def start_service(self, **kwargs):
+        self.service = self.create_service(**kwargs)
+        self.service.start()
+
+        return self.service
+
+    def create_service(self, extractor=None, event_bus=None, intentions=(), **kwargs):
+        return MentionExtractionService(extractor if extractor else _extractor(), "scenario", ["text", "face"],
+                                        "output", list(intentions), "intention",
+                                        event_bus if event_bus else self.event_bus, self.resource_manager,
+                                        signal_topics=["image"], **kwargs)
+
+    def publish(self, topic, payload):
+        self.event_bus.publish(topic, Event.for_payload(payload))
+
+    def mentions(self):
+        return [mention for event in self.output for mention in event.payload]
+
+    def wait_for(self, condition, timeout=2.0):
+        deadline = time.monotonic() + timeout
+        while not condition():
+            if time.monotonic() > deadline:
+                self.fail("Timeout")
+            time.sleep(0.01)
+
+
+class TestScenarioPartitioning(MentionExtractionServiceTestCase):
+    def test_interleaved_scenarios(self):
+        self.start_service()
+        self.publish("scenario", _scenario_event(ScenarioStarted, "scenario_1"))
+        self.publish("scenario", _scenario_event(ScenarioStarted, "scenario_2"))
+        self.publish("image", _image_signal_event("image_1", "scenario_1"))
+        self.publish("image", _image_signal_event("image_2", "scenario_2"))
+
+        self.publish("text", _text_event("scenario_1", "cup"))
+        self.publish("face", _face_event("face_1", "image_1"))
+        self.publish("text", _text_event("scenario_2", "book"))
+        self.publish("face", _face_event("face_1", "image_2"))
+        # Known face in scenario_1 and a face without scenario are not mentioned
+        self.publish("face", _face_event("face_1", "image_1"))
+        self.publish("face", _face_event("face_2", "image_unknown"))
+        self.publish("text", _text_event("scenario_1", "chair"))
+        self.wait_for(lambda: len(self.mentions()) == 5)
+
+        by_scenario = {}
+        for mention in self.mentions():
+            by_scenario.setdefault(mention["context_id"], []).append(mention["item"]["label"])
+
+        self.assertEqual({"scenario_1": ["cup", "face_1", "chair"], "scenario_2": ["book", "face_1"]}, by_scenario)
+
+    def test_single_scenario_without_scenario_information(self):
+        self.start_service()
+        self.publish("scenario", _scenario_event(ScenarioStarted, "scenario_1"))
+        self.publish("face", _face_event("face_1", "image_unknown"))
+        self.wait_for(lambda: len(self.mentions()) == 1)
+
+        self.assertEqual("scenario_1", self.mentions()[0]["context_id"])
+
+    def test_warn_without_signal_topics(self):
+        with self.assertLogs("cltl_service.mention_extraction.service", "WARNING"):
+            MentionExtractionService(_extractor(), "scenario", ["text", "face"], "output", [], "intention",
+                                     self.event_bus, self.resource_manager)
+
+    def test_stopped_scenario(self):
+        self.start_service()
+        self.publish("scenario", _scenario_event(ScenarioStarted, "scenario_1"))
+        self.publish("scenario", _scenario_event(ScenarioStarted, "scenario_2"))
+        self.publish("scenario", _scenario_event(ScenarioStopped, "scenario_1"))
+        self.publish("text", _text_event("scenario_1", "cup"))
+        self.publish("text", _text_event("scenario_2", "book"))
+        self.wait_for(lambda: len(self.mentions()) == 1)
+
+        self.assertEqual("scenario_2", self.mentions()[0]["context_id"])
+
+
+class TestLifecycle(MentionExtractionServiceTestCase):
+    def test_deprecated_language(self):
+        with self.assertWarns(DeprecationWarning):
+            service = MentionExtractionService(_extractor(), "scenario", ["text", "face"], "output", [], "intention",
+                                               self.event_bus, self.resource_manager, "en", 3, signal_topics=["image"])
+
+        self.assertEqual(3, service._object_rate)
+
+    def test_stop_stopped_service(self):
+        service = self.start_service()
+        service.stop()
+        self.service = None
+
+        service.stop()
+
+
+class TestIntentions(MentionExtractionServiceTestCase):
+    def publish_intentions(self, *labels, scenario_id=None):
+        payload = SimpleNamespace(type="IntentionEvent", intentions=[SimpleNamespace(label=label) for label in labels])
+        if scenario_id:
+            payload.scenario_id = scenario_id
+        self.publish("intention", payload)
+
+    def labels(self):
+        return [(mention["item"]["label"], mention["context_id"]) for mention in self.mentions()]
+
+    def test_intentions_without_scenario_apply_to_all_scenarios(self):
+        self.start_service(intentions=["chat"])
+        self.publish("scenario", _scenario_event(ScenarioStarted, "scenario_1"))
+        self.publish("scenario", _scenario_event(ScenarioStarted, "scenario_2"))
+        self.publish("text", _text_event("scenario_1", "cup"))
+        self.publish_intentions("chat")
+        self.publish("text", _text_event("scenario_1", "book"))
+        self.publish("text", _text_event("scenario_2", "chair"))
+        # Scenarios started later use the intentions as well
+        self.publish("scenario", _scenario_event(ScenarioStarted, "scenario_3"))
+        self.publish("text", _text_event("scenario_3", "table"))
+        self.wait_for(lambda: len(self.mentions()) == 3)
+        time.sleep(0.1)
+
+        self.assertEqual([("book", "scenario_1"), ("chair", "scenario_2"), ("table", "scenario_3")], self.labels())
+
+    def test_intentions_of_scenario(self):
+        self.start_service(intentions=["chat"])
+        self.publish("scenario", _scenario_event(ScenarioStarted, "scenario_1"))
+        self.publish("scenario", _scenario_event(ScenarioStarted, "scenario_2"))
+        self.publish_intentions("chat")
+        self.publish_intentions("game", scenario_id="scenario_1")
+        self.publish("text", _text_event("scenario_1", "cup"))
+        self.publish("text", _text_event("scenario_2", "book"))
+        self.wait_for(lambda: len(self.mentions()) == 1)
+        time.sleep(0.1)
+
+        self.assertEqual([("book", "scenario_2")], self.labels())
+
+
+class TestShardForwarding(MentionExtractionServiceTestCase):
+    def setUp(self):
+        super().setUp()
+        self.services = []
+
+    def tearDown(self):
+        super().tearDown()
+        for service in self.services:
+            service.stop()
+
+    def start_replica(self, replica_id, members):
+        shard = ScenarioShard(replica_id, members)
+        event_bus = ShardedEventBus(self.event_bus, shard, ["scenario", "text", "face"])
+        service = self.create_service(event_bus=event_bus, shard=shard)
+        service.start()
+        self.services.append(service)
+
+        return service
+
+    def test_broadcast_events_are_processed_by_owner(self):
+        self.start_replica("a", ["a", "b"])
+        self.start_replica("b", ["a", "b"])
+        shard = ScenarioShard("a", ["a", "b"])
+        scenarios = {shard.owner(f"scenario_{idx}"): f"scenario_{idx}" for idx in range(100)}
+        self.assertEqual({"a", "b"}, set(scenarios))
+
+        sharded_bus = ShardedEventBus(self.event_bus, shard, ["scenario", "text", "face"])
+        for scenario_id in scenarios.values():
+            sharded_bus.publish("scenario", Event.for_payload(_scenario_event(ScenarioStarted, scenario_id)))
+            self.publish("image", _image_signal_event(f"image_{scenario_id}", scenario_id))
+            # Without scenario id, published to all replicas
+            sharded_bus.publish("face", Event.for_payload(_face_event("face_1", f"image_{scenario_id}")))
+        self.wait_for(lambda: len(self.mentions()) == 2)
+        time.sleep(0.1)
+
+        self.assertEqual(sorted(scenarios.values()), sorted(mention["context_id"] for mention in self.mentions()))
+
+    def test_unresolved_events_are_dropped(self):
+        self.start_replica("a", ["a", "b"])
+        self.start_replica("b", ["a", "b"])
+        sharded_bus = ShardedEventBus(self.event_bus, ScenarioShard("a", ["a", "b"]), ["scenario", "text", "face"])
+
+        sharded_bus.publish("scenario", Event.for_payload(_scenario_event(ScenarioStarted, "scenario_1")))
+        sharded_bus.publish("face", Event.for_payload(_face_event("face_1", "image_unknown")))
+        sharded_bus.publish("text", Event.for_payload(_text_event("scenario_1")))
+        self.wait_for(lambda: len(self.mentions()) == 1)
+        time.sleep(0.1)
+
+        self.assertEqual(["cup"], [mention["item"]["label"] for mention in self.mentions()])
+
+    def test_batched_events_are_forwarded_once(self):
+        # Replicas with conflicting membership forward events of all scenarios to each other
+        self.start_replica("a", ["b"])
+        self.start_replica("b", ["a"])
+
+        for payload in [_scenario_event(ScenarioStarted, "scenario_1"),
+                        BatchEvent.create([_text_event("scenario_1", "cup"), _text_event("scenario_1", "book")])]:
+            topic = "scenario" if payload.type == ScenarioStarted.__name__ else "text"
+            self.publish(ScenarioShard.routing_topic(topic, "a"), payload)
+        self.wait_for(lambda: len(self.mentions()) == 2)
+        time.sleep(0.1)
+
+        self.assertEqual(["cup", "book"], [mention["item"]["label"] for mention in self.mentions()])
+
+
+class BatchRecordingExtractor(DefaultMentionExtractor):
+    def __init__(self):
+        super().__init__(TextMentionDetector(), TextPerspectiveDetector(), ImagePerspectiveDetector(0.5),
+                         NewFaceMentionDetector(), ObjectMentionDetector())
+        self.batches = []
+
+    def extract_face_mentions_batch(self, batch):
+        self.batches.append(len(batch))
+        return super().extract_face_mentions_batch(batch)
+
+    def extract_text_mentions_batch(self, batch, indices=None):
+        self.batches.append(len(batch))
+        return super().extract_text_mentions_batch(batch, indices)
+
+
+class TestBatchedInput(MentionExtractionServiceTestCase):
+    def test_consecutive_events_are_extracted_together(self):
+        extractor = BatchRecordingExtractor()
+        self.start_service(extractor=extractor)
+        self.publish("scenario", _scenario_event(ScenarioStarted, "scenario_1"))
+        self.publish("image", _image_signal_event("image_1", "scenario_1"))
+        self.publish("face", BatchEvent.create([_face_event("face_1", "image_1"), _face_event("face_1", "image_1"),
+                                                _face_event("face_2", "image_1")]))
+        self.wait_for(lambda: len(self.mentions()) == 2)
+
+        self.assertEqual([3], extractor.batches)
+        # Mentions are published per input event
+        self.assertEqual([["face_1"], ["face_2"]], [[mention["item"]["label"] for mention in event.payload]
+                                                    for event in self.output])
+
+    def test_control_events_are_applied_in_order(self):
+        extractor = BatchRecordingExtractor()
+        self.start_service(extractor=extractor)
+        self.publish("scenario", _scenario_event(ScenarioStarted, "scenario_1"))
+        self.publish("scenario", _scenario_event(ScenarioStarted, "scenario_2"))
+        self.publish("text", BatchEvent.create([_text_event("scenario_1", "cup"), _text_event("scenario_2", "book"),
+                                                _scenario_event(ScenarioStopped, "scenario_1"),
+                                                _text_event("scenario_1", "chair"),
+                                                _text_event("scenario_2", "table")]))
+        self.wait_for(lambda: len(self.mentions()) == 3)
+        time.sleep(0.1)
+
+        self.assertEqual([2, 1], extractor.batches)
+        self.assertEqual(["cup", "book", "table"], [mention["item"]["label"] for mention in self.mentions()])
+
+
+class TestBatchedOutput(MentionExtractionServiceTestCase):
+    def test_output_is_published_in_batches(self):
+        event_bus = CoalescingEventBus(self.event_bus, ["output"], max_items=2, max_delay=10)
+        self.start_service(event_bus=event_bus)
+        self.publish("scenario", _scenario_event(ScenarioStarted, "scenario_1"))
+        for face_id in ["face_1", "face_2", "face_3"]:
+            self.publish("face", _face_event(face_id, "image_1"))
+        self.wait_for(lambda: len(self.output) == 1)
+
+        self.assertEqual(BatchEvent.__name__, self.output[0].payload.type)
+
+        # Remaining events are flushed when the service stops
+        self.service.stop()
+        self.service = None
+
+        self.assertEqual(["face_1", "face_2", "face_3"], [mention["item"]["label"]
+                                                         for event in self.output for single_event in unbatch(event)
+                                                         for mention in single_event.payload])
+
+
+class TestTracing(MentionExtractionServiceTestCase):
+    def setUp(self):
+        super().setUp()
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.path = os.path.join(self.tmp_dir.name, "trace.json")
+
+    def spans(self):
+        with open(self.path) as trace_file:
+            return json.loads(trace_file.read().rstrip(",\n") + "]")
+
+    def test_spans_per_trace(self):
+        tracer = Tracer("test", self.path)
+        self.start_service(extractor=_extractor(tracer.span), tracer=tracer)
+        self.publish("scenario", _scenario_event(ScenarioStarted, "scenario_1"))
+        self.publish("text", BatchEvent.create([_text_event("scenario_1", "cup", "signal_1"),
+                                                _text_event("scenario_1", "book", "signal_2")]))
+        self.wait_for(lambda: len(self.mentions()) == 2)
+        self.service.stop()
+        self.service = None
+
+        spans_by_trace = {}
+        for trace_span in self.spans():
+            spans_by_trace.setdefault(trace_span["args"]["trace_id"], []).append(trace_span["name"])
+
+        self.assertEqual({"signal_1", "signal_2"}, set(spans_by_trace))
+        for names in spans_by_trace.values():
+            self.assertEqual(["queue_wait", "filtering", "creation", "serialization", "publish"], names)
+        self.assertEqual(["signal_1", "signal_2"], [mention["turn"] for mention in self.mentions()])
+
+
+class TestFaceJoin(MentionExtractionServiceTestCase):
+    def test_pending_faces_are_published_when_scenario_stops(self):
+        self.start_service(face_join=FaceJoin(window=60))
+        self.publish("scenario", _scenario_event(ScenarioStarted, "scenario_1"))
+        self.publish("image", _image_signal_event("image_1", "scenario_1"))
+        self.publish("face", _face_event("face_1", "image_1"))
+        time.sleep(0.1)
+
+        self.assertEqual([], self.mentions())
+
+        self.publish("scenario", _scenario_event(ScenarioStopped, "scenario_1"))
+        self.wait_for(lambda: len(self.mentions()) == 1)
+
+        self.assertEqual(("face_1", "scenario_1"),
+                         (self.mentions()[0]["item"]["label"], self.mentions()[0]["context_id"]))
+
+
+class TestSnapshots(MentionExtractionServiceTestCase):
+    def test_restore_on_start(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        store = SnapshotStore(os.path.join(tmp_dir.name, "snapshot.json"))
+        store.write(ServiceSnapshot.create(set(), [ScenarioSnapshot("scenario_1", [], 0, {"face": ["face_1"]})]))
+
+        self.start_service(snapshots=store)
+        self.publish("image", _image_signal_event("image_1", "scenario_1"))
+        self.publish("face", _face_event("face_1", "image_1"))
+        self.publish("face", _face_event("face_2", "image_1"))
+        self.wait_for(lambda: len(self.mentions()) == 1)
+        time.sleep(0.1)
+
+        self.assertEqual([("face_2", "scenario_1")],
+                         [(mention["item"]["label"], mention["context_id"]) for mention in self.mentions()])
+
+
+class TestMemoryWatchdog(MentionExtractionServiceTestCase):
+    def test_report_state_sizes(self):
+        watchdog = MemoryWatchdog("test", interval=3600)
+        self.start_service(memory_watchdog=watchdog)
+        self.publish("scenario", _scenario_event(ScenarioStarted, "scenario_1"))
+        self.publish("face", _face_event("face_1", "image_1"))
+        self.wait_for(lambda: len(self.mentions()) == 1)
+
+        state_sizes = watchdog.check().state_sizes
+
+        self.assertEqual(0, state_sizes["service.buffer"])
+        self.assertEqual(1, state_sizes["service.scenarios"])
+        self.assertEqual(1, state_sizes["extractor.face"])
+
+
+class TestStaleness(MentionExtractionServiceTestCase):
+    def test_stale_events_are_dropped(self):
+        self.start_service(staleness=StalenessPolicy({"face": 1}, signal_time=True))
+        self.publish("scenario", _scenario_event(ScenarioStarted, "scenario_1"))
+        self.publish("face", _face_event("face_1", "image_1", timestamp_now() - 5000, "scenario_1"))
+        self.publish("face", _face_event("face_2", "image_2", timestamp_now(), "scenario_1"))
+        self.wait_for(lambda: len(self.mentions()) == 1)
+
+        self.assertEqual("face_2", self.mentions()[0]["item"]["label"])
+        self.assertEqual(1, self.service.dropped)
@@ -0,0 +1,128 @@
+import multiprocessing
+import os
+import tempfile
+import unittest
+
+from emissor.persistence import ScenarioStorage
+from emissor.representation.scenario import TextSignal, ScenarioContext
+
+from cltl.nlp.api import NLP, Doc, Token, NamedEntity, Entity, POS, EntityType
+from cltl.nlp.cache import NLPCache, CachedNLP, serialize_doc, deserialize_doc, warm
+
+
+class CountingNLP(NLP):
+    def __init__(self, model_id="counting-1"):
+        self._model_id = model_id
+        self.texts = []
+
+    @property
+    def model_id(self) -> str:
+        return self._model_id
+
+    def analyze(self, text: str) -> Doc:
+        self.texts.append(text)
+        return Doc([Token(text, POS.PRON, (0, len(text)))],
+                   [NamedEntity(text, "PERSON", (0, len(text)))],
+                   [Entity(text, EntityType.SPEAKER, (0, len(text)))])
+
+
+def _fill(path, offset):
+    cache = NLPCache(path)
+    nlp = CountingNLP()
+    for idx in range(50):
+        cache.put(nlp.model_id, f"text {offset + idx}", nlp.analyze(f"text {offset + idx}"))
+    cache.close()
+
+
+class TestNLPCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "cache", "nlp.db")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_serialization(self):
+        doc = CountingNLP().analyze("I")
+
+        self.assertEqual(doc, deserialize_doc(serialize_doc(doc)))
+
+    def test_cached_analysis(self):
+        nlp = CountingNLP()
+        cached = CachedNLP(nlp, NLPCache(self.path))
+
+        first = cached.analyze("I")
+        second = cached.analyze("I")
+
+        self.assertEqual(first, second)
+        self.assertEqual(["I"], nlp.texts)
+        self.assertEqual((1, 1), (cached.hits, cached.misses))
+
+    def test_persistent_across_instances(self):
+        CachedNLP(CountingNLP(), NLPCache(self.path)).analyze("I")
+
+        nlp = CountingNLP()
+        CachedNLP(nlp, NLPCache(self.path)).analyze("I")
+        self.assertEqual([], nlp.texts)
+
+        other_model = CountingNLP("counting-2")
+        CachedNLP(other_model, NLPCache(self.path)).analyze("I")
+        self.assertEqual(["I"], other_model.texts)
+
+    def test_eviction(self):
+        nlp = CountingNLP()
+        cache = NLPCache(self.path)
+        for idx in range(10):
+            cache.put(nlp.model_id, f"text {idx}", nlp.analyze(f"text {idx}"))
+        entry_size = cache.size() // 10
+
+        cache = NLPCache(self.path, max_size=entry_size * 5, touch_interval=0)
+        cache.get(nlp.model_id, "text 0")
+        cache.evict()
+
+        self.assertLessEqual(cache.size(), entry_size * 5)
+        self.assertIsNotNone(cache.get(nlp.model_id, "text 0"))
+        self.assertIsNone(cache.get(nlp.model_id, "text 1"))
+
+    def test_access_time_is_updated_after_interval(self):
+        nlp = CountingNLP()
+        cache = NLPCache(self.path, touch_interval=3600)
+        cache.put(nlp.model_id, "I", nlp.analyze("I"))
+
+        def accessed():
+            return cache._connection().execute("SELECT accessed FROM docs").fetchone()[0]
+
+        stored = accessed()
+        cache.get(nlp.model_id, "I")
+        self.assertEqual(stored, accessed())
+
+        cache._touch_interval = 0
+        cache.get(nlp.model_id, "I")
+        self.assertGreater(accessed(), stored)
+
+    def test_concurrent_processes(self):
+        NLPCache(self.path)
+        processes = [multiprocessing.Process(target=_fill, args=(self.path, idx * 50)) for idx in range(4)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+
+        self.assertTrue(all(process.exitcode == 0 for process in processes))
+        self.assertEqual(200, len(NLPCache(self.path)))
+
+    def test_warm(self):
+        emissor_path = os.path.join(self.tmp_dir.name, "emissor")
+        storage = ScenarioStorage(emissor_path)
+        for scenario_id in ("first", "second"):
+            scenario = storage.create_scenario(scenario_id, 0, 1, ScenarioContext("agent"))
+            scenario.append_signal(TextSignal.for_scenario(scenario_id, 0, 1, None, "same text"))
+            scenario.append_signal(TextSignal.for_scenario(scenario_id, 0, 1, None, f"{scenario_id} text"))
+            storage.save_scenario(scenario)
+
+        nlp = CountingNLP()
+        cached = CachedNLP(nlp, NLPCache(self.path))
+        warm(cached, emissor_path)
+
+        self.assertEqual(3, len(nlp.texts))
+        self.assertEqual((1, 3), (cached.hits, cached.misses))
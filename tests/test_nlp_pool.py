@@ -0,0 +1,129 @@
+import unittest
+from unittest import mock
+
+from cltl.nlp.api import NLP, Doc
+from cltl.nlp.pool import NLPPool, StopWordLanguageDetector
+
+
+class LanguageNLP(NLP):
+    def __init__(self, language):
+        self.language = language
+        self.analyzed = []
+        self.closed = False
+
+    @property
+    def model_id(self) -> str:
+        return f"{self.language}_model"
+
+    def analyze(self, text: str) -> Doc:
+        self.analyzed.append(text)
+        return Doc([], [], [])
+
+    def tokenize(self, text: str) -> Doc:
+        return Doc([], [], [])
+
+    def close(self) -> None:
+        self.closed = True
+
+
+class TestNLPPool(unittest.TestCase):
+    def setUp(self):
+        self.created = []
+
+    def factory(self, language):
+        def create():
+            self.created.append(language)
+            return LanguageNLP(language)
+
+        return create
+
+    def pool(self, **kwargs):
+        return NLPPool({language: self.factory(language) for language in ("en", "nl", "de")}, "en", **kwargs)
+
+    def test_models_are_loaded_on_first_use(self):
+        pool = self.pool()
+        self.assertEqual([], self.created)
+
+        self.assertEqual("nl", pool.for_language("nl").language)
+        self.assertEqual("nl", pool.for_language("nl").language)
+        self.assertEqual(["nl"], self.created)
+        self.assertEqual(["nl"], list(pool.loaded))
+
+    def test_unknown_language_uses_default(self):
+        pool = self.pool()
+
+        self.assertEqual("en", pool.for_language("fr").language)
+        self.assertEqual("en", pool.for_language(None).language)
+        self.assertEqual(["en"], self.created)
+
+    def test_default_language_requires_model(self):
+        with self.assertRaises(ValueError):
+            NLPPool({"nl": self.factory("nl")}, "en")
+
+    def test_least_recently_used_model_is_released(self):
+        pool = self.pool(max_models=2)
+
+        pool.for_language("en")
+        pool.for_language("nl")
+        pool.for_language("en")
+        pool.for_language("de")
+
+        self.assertEqual(["en", "de"], list(pool.loaded))
+
+        pool.for_language("nl")
+        self.assertEqual(["en", "nl", "de", "nl"], self.created)
+
+    def test_close_releases_models(self):
+        pool = self.pool(max_models=1)
+        models = [pool.for_language("en"), pool.for_language("nl")]
+
+        self.assertEqual([True, False], [model.closed for model in models])
+
+        pool.close()
+
+        self.assertEqual([True, True], [model.closed for model in models])
+        self.assertEqual({}, pool.loaded)
+
+    def test_models_are_released_when_memory_budget_is_exceeded(self):
+        memory = iter([0, 100, 100, 250, 250, 350])
+        with mock.patch("cltl.nlp.pool._resident_memory", lambda: next(memory)):
+            pool = self.pool(memory_budget=260)
+            pool.for_language("en")
+            pool.for_language("nl")
+            self.assertEqual({"en": 100, "nl": 150}, pool.loaded)
+
+            pool.for_language("de")
+            self.assertEqual({"nl": 150, "de": 100}, pool.loaded)
+
+    def test_model_exceeding_memory_budget_is_kept(self):
+        memory = iter([0, 500])
+        with mock.patch("cltl.nlp.pool._resident_memory", lambda: next(memory)):
+            pool = self.pool(memory_budget=100)
+            self.assertEqual("nl", pool.for_language("nl").language)
+
+        self.assertEqual({"nl": 500}, pool.loaded)
+
+    def test_analyze_with_detected_language(self):
+        pool = self.pool(detect_language=lambda text: "nl" if text.startswith("de") else None)
+
+        pool.analyze("de kat")
+        pool.analyze("the cat")
+
+        self.assertEqual(["de kat"], pool.for_language("nl").analyzed)
+        self.assertEqual(["the cat"], pool.for_language("en").analyzed)
+
+    def test_model_id_of_default_language(self):
+        self.assertEqual("en_model", self.pool().model_id)
+
+
+class TestStopWordLanguageDetector(unittest.TestCase):
+    def setUp(self):
+        self.detector = StopWordLanguageDetector(["en", "nl"])
+
+    def test_detect_language(self):
+        self.assertEqual("nl", self.detector("De kat zit op de mat en kijkt naar mij."))
+        self.assertEqual("en", self.detector("The cat is sitting on the mat and looks at me."))
+
+    def test_no_stop_words(self):
+        self.assertIsNone(self.detector("Piek"))
+        self.assertIsNone(self.detector(""))
@@ -0,0 +1,122 @@
+import re
+import time
+import unittest
+from types import SimpleNamespace
+
+from cltl.combot.event.emissor import ScenarioStopped, TextSignalEvent
+from cltl.combot.infra.event import Event
+from cltl.combot.infra.event.memory import SynchronousEventBus
+from cltl.combot.infra.resource.threaded import ThreadedResourceManager
+from emissor.representation.scenario import TextSignal
+
+from cltl.nlp.api import NLP, Doc, Token, POS, Entity, EntityType
+from cltl_service.nlp.service import NLPService
+
+
+class WhitespaceNLP(NLP):
+    def __init__(self, analyzed, languages=None):
+        self.analyzed = analyzed
+        self.languages = languages if languages else {}
+
+    def analyze(self, text: str) -> Doc:
+        self.analyzed.append(text)
+        tokens = [Token(match.group(), POS.PUNCT if match.group() in ".!?" else POS.X, match.span())
+                  for match in re.finditer(r"\w+|[^\w\s]", text)]
+        entities = [Entity(token.text, EntityType.OBJECT, token.segment) for token in tokens
+                    if token.text in ("book", "boek")]
+
+        return Doc(tokens, [], entities)
+
+    def for_language(self, language):
+        return self.languages.get(language, self)
+
+
+class TestIncrementalNLPService(unittest.TestCase):
+    def setUp(self):
+        self.event_bus = SynchronousEventBus()
+        self.output = []
+        self.event_bus.subscribe("output", self.output.append)
+        self.analyzed = []
+        self.service = None
+
+    def tearDown(self):
+        if self.service:
+            self.service.stop()
+
+    def start_service(self, nlp, scenario_topic=None):
+        self.service = NLPService("input", "output", nlp, self.event_bus, ThreadedResourceManager(), incremental=True,
+                                  scenario_topic=scenario_topic)
+        self.service.start()
+
+    def publish_updates(self, texts, language=None, signal_id="signal_1", final=False):
+        # Wait for each update to be analyzed, as the service skips queued updates
+        analyzed = len(self.analyzed)
+        for idx, text in enumerate(texts):
+            signal = TextSignal.for_scenario("scenario_1", 0, 1, "file", text, signal_id=signal_id)
+            if language:
+                signal.language = language
+            if final and idx == len(texts) - 1:
+                signal.final = True
+            self.event_bus.publish("input", Event.for_payload(TextSignalEvent.for_agent(signal)))
+            self.wait_for(lambda: len(self.analyzed) == analyzed + idx + 1)
+
+    def entities(self):
+        return [(mention.annotations[0].value.text, event.payload.scenario_id)
+                for event in self.output for mention in event.payload.mentions
+                if mention.annotations[0].type == Entity.__name__]
+
+    def wait_for(self, condition, timeout=2.0):
+        deadline = time.monotonic() + timeout
+        while not condition():
+            if time.monotonic() > deadline:
+                self.fail("Timeout")
+            time.sleep(0.01)
+
+    def test_provisional_entities_are_published_once(self):
+        self.start_service(WhitespaceNLP(self.analyzed))
+        self.publish_updates(["A book", "A book and", "A book and a book", "A book and a book. And",
+                              "A book and a book. And more."])
+        self.wait_for(lambda: len(self.output) == 2)
+
+        self.assertEqual([("book", "scenario_1"), ("book", "scenario_1")], self.entities())
+
+    def test_unpunctuated_final_hypothesis(self):
+        self.start_service(WhitespaceNLP(self.analyzed))
+        self.publish_updates(["A book. And a", "A book. And a book"], final=True)
+        self.wait_for(lambda: len(self.output) == 2)
+
+        self.assertEqual([("book", "scenario_1"), ("book", "scenario_1")], self.entities())
+
+    def test_superseded_signal_is_flushed(self):
+        self.start_service(WhitespaceNLP(self.analyzed))
+        self.publish_updates(["A book. And a", "A book. And a book"])
+        self.wait_for(lambda: len(self.output) == 1)
+        self.publish_updates(["Een boek"], signal_id="signal_2")
+        self.wait_for(lambda: len(self.output) == 2)
+
+        self.assertEqual([("book", "scenario_1"), ("book", "scenario_1")], self.entities())
+
+        # The last signal is flushed when the service stops
+        self.service.stop()
+        self.service = None
+
+        self.assertEqual([("book", "scenario_1"), ("book", "scenario_1"), ("boek", "scenario_1")], self.entities())
+
+    def test_signal_is_flushed_when_scenario_stops(self):
+        self.start_service(WhitespaceNLP(self.analyzed), scenario_topic="scenario")
+        self.publish_updates(["A book"])
+        self.event_bus.publish("scenario", Event.for_payload(
+            SimpleNamespace(type=ScenarioStopped.__name__, scenario=SimpleNamespace(id="scenario_1"))))
+        self.wait_for(lambda: len(self.output) == 1)
+
+        self.assertEqual([("book", "scenario_1")], self.entities())
+
+    def test_incremental_with_language(self):
+        dutch_analyzed = []
+        self.start_service(WhitespaceNLP(self.analyzed, languages={"nl": WhitespaceNLP(dutch_analyzed)}))
+        self.analyzed = dutch_analyzed
+        self.publish_updates(["Een boek.", "Een boek. En een boek."], language="nl")
+        self.wait_for(lambda: len(self.output) == 2)
+
+        self.assertEqual(["Een boek.", "Een boek. En een boek."], dutch_analyzed)
+        self.assertEqual([("boek", "scenario_1"), ("boek", "scenario_1")], self.entities())
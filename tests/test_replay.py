@@ -0,0 +1,165 @@
+import os
+import unittest
+from types import SimpleNamespace
+
+from cltl.combot.infra.event import Event
+from cltl.combot.infra.event.memory import SynchronousEventBus
+from cltl.combot.infra.resource.threaded import ThreadedResourceManager
+from emissor.persistence import ScenarioStorage
+from emissor.representation.scenario import Annotation, Mention
+
+from cltl.mention_extraction.default_extractor import DefaultMentionExtractor, TextMentionDetector, \
+    TextPerspectiveDetector, ImagePerspectiveDetector, NewFaceMentionDetector, ObjectMentionDetector
+from cltl_service.mention_extraction.service import MentionExtractionService
+from cltl_service.replay.replay import ScenarioReplay, ReplayEvent, MentionEvent, load_events, find_saturation
+
+DATA_PATH = os.path.join(os.path.dirname(__file__), "..", "data")
+SCENARIO_ID = "2022-05-09-16:35:39"
+
+
+class EchoService:
+    def __init__(self, event_bus, skip=(), drop=False):
+        self.event_bus = event_bus
+        self.skip = skip
+        self.drop = drop
+        self.dropped = 0
+        self.event_bus.subscribe("text", self.process)
+
+    def process(self, event):
+        if self.drop:
+            self.dropped += 1
+        elif event.payload.signal.id not in self.skip:
+            self.event_bus.publish("output", Event.for_payload([{"turn": event.payload.signal.id}]))
+
+
+def _face_event(scenario_id, mention_id, face_id, timestamp):
+    mention = Mention(mention_id, [SimpleNamespace(container_id="image", bounds=(0, 0, 1, 1))],
+                      [Annotation("VectorIdentity", face_id, "face_recognition", timestamp)])
+
+    return ReplayEvent(timestamp, "face", MentionEvent("VectorIdentityEvent", [mention], scenario_id), (mention_id,))
+
+
+class TestScenarioReplay(unittest.TestCase):
+    def setUp(self) -> None:
+        self.event_bus = SynchronousEventBus()
+        self.scenario = ScenarioStorage(DATA_PATH).load_scenario(SCENARIO_ID)
+
+    def test_load_events(self):
+        events = load_events(self.scenario, "text", {})
+
+        self.assertEqual(1, len(events))
+        self.assertEqual("text", events[0].topic)
+        self.assertEqual("I am from Amsterdam and I like cats.", events[0].payload.signal.text)
+
+    def test_replay(self):
+        EchoService(self.event_bus)
+        events = load_events(self.scenario, "text", {})
+        replay = ScenarioReplay(self.event_bus, self.scenario.scenario, events, "scenario", "output")
+
+        report = replay.run(drain_timeout=0.1)
+
+        self.assertEqual(1, report.published)
+        self.assertEqual(1, report.answered)
+        self.assertEqual(0, report.unanswered)
+        self.assertEqual(1, len(report.latencies))
+
+    def test_replay_unanswered(self):
+        events = load_events(self.scenario, "text", {})
+        EchoService(self.event_bus, skip={events[0].payload.signal.id})
+        replay = ScenarioReplay(self.event_bus, self.scenario.scenario, events, "scenario", "output")
+
+        report = replay.run(drain_timeout=0.1)
+
+        self.assertEqual(0, report.answered)
+        self.assertEqual(1, report.unanswered)
+        self.assertEqual(0, report.dropped)
+        self.assertIsNone(report.percentile(90))
+
+    def test_replay_dropped(self):
+        service = EchoService(self.event_bus, drop=True)
+        events = load_events(self.scenario, "text", {})
+        replay = ScenarioReplay(self.event_bus, self.scenario.scenario, events, "scenario", "output",
+                                [lambda: service.dropped])
+
+        report = replay.run(drain_timeout=0.1)
+
+        self.assertEqual(1, report.unanswered)
+        self.assertEqual(1, report.dropped)
+
+    def test_find_saturation(self):
+        EchoService(self.event_bus)
+        events = load_events(self.scenario, "text", {})
+        replay = ScenarioReplay(self.event_bus, self.scenario.scenario, events, "scenario", "output")
+
+        saturation, reports = find_saturation(replay, [0, 10, 1], latency_budget=1000, drain_timeout=0.1)
+
+        self.assertIsNone(saturation)
+        self.assertEqual([1, 10, 0], [report.speed for report in reports])
+
+    def test_find_saturation_ignores_filtered_events(self):
+        events = load_events(self.scenario, "text", {})
+        service = EchoService(self.event_bus)
+        replay = ScenarioReplay(self.event_bus, self.scenario.scenario, events, "scenario", "output",
+                                [lambda: service.dropped])
+
+        # Filtered only in the fastest run
+        reports = []
+
+        def run(speed, drain_timeout):
+            service.skip = () if speed else {events[0].payload.signal.id}
+            reports.append(ScenarioReplay.run(replay, speed, drain_timeout))
+            return reports[-1]
+
+        replay.run = run
+
+        saturation, _ = find_saturation(replay, [1, 0], latency_budget=1000, drain_timeout=0.1)
+
+        self.assertIsNone(saturation)
+        self.assertEqual([0, 1], [report.unanswered for report in reports])
+
+    def test_find_saturation_on_dropped_events(self):
+        events = load_events(self.scenario, "text", {})
+        service = EchoService(self.event_bus)
+        replay = ScenarioReplay(self.event_bus, self.scenario.scenario, events, "scenario", "output",
+                                [lambda: service.dropped])
+
+        def run(speed, drain_timeout):
+            service.drop = speed == 10
+            return ScenarioReplay.run(replay, speed, drain_timeout)
+
+        replay.run = run
+
+        saturation, reports = find_saturation(replay, [1, 10, 0], latency_budget=1000, drain_timeout=0.1)
+
+        self.assertEqual(10, saturation)
+        self.assertEqual([0, 1], [report.dropped for report in reports])
+
+
+class TestMentionExtractionServiceReplay(unittest.TestCase):
+    def setUp(self) -> None:
+        self.event_bus = SynchronousEventBus()
+        self.scenario = ScenarioStorage(DATA_PATH).load_scenario(SCENARIO_ID).scenario
+        extractor = DefaultMentionExtractor(TextMentionDetector(), TextPerspectiveDetector(),
+                                            ImagePerspectiveDetector(0.5), NewFaceMentionDetector(),
+                                            ObjectMentionDetector())
+        self.service = MentionExtractionService(extractor, "scenario", ["face"], "output", [], "intention",
+                                                self.event_bus, ThreadedResourceManager())
+        self.service.start()
+
+    def tearDown(self) -> None:
+        self.service.stop()
+
+    def test_replay(self):
+        events = [_face_event(self.scenario.id, "mention_1", "face_1", 1000),
+                  _face_event(self.scenario.id, "mention_2", "face_2", 1010),
+                  # Known face, filtered by the detector
+                  _face_event(self.scenario.id, "mention_3", "face_1", 1020)]
+        replay = ScenarioReplay(self.event_bus, self.scenario, events, "scenario", "output",
+                                [lambda: self.service.dropped])
+
+        saturation, reports = find_saturation(replay, [1, 0], latency_budget=1000, drain_timeout=0.5)
+
+        self.assertIsNone(saturation)
+        self.assertEqual([2, 2], [report.answered for report in reports])
+        self.assertEqual([1, 1], [report.unanswered for report in reports])
+        self.assertEqual([0, 0], [report.dropped for report in reports])
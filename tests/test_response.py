@@ -0,0 +1,79 @@
+import random
+import time
+import unittest
+
+from cltl.combot.infra.event import Event
+from cltl.combot.infra.event.memory import SynchronousEventBus
+from cltl.combot.infra.resource.threaded import ThreadedResourceManager
+from cltl.commons.discrete import UtteranceType
+
+from cltl.mention_extraction.response import PhraseResponseGenerator
+from cltl_service.mention_extraction.response import ObjectResponseService
+from cltl_service.publishing.coalescing import BatchEvent
+
+
+def _object_mention(label, scenario_id="scenario_1"):
+    return {"utterance_type": UtteranceType.IMAGE_MENTION, "context_id": scenario_id,
+            "item": {"label": label, "type": ["object"]}}
+
+
+class TestPhraseResponseGenerator(unittest.TestCase):
+    def test_respond_english(self):
+        generator = PhraseResponseGenerator("en", random.Random(0))
+
+        response = generator.respond(["book", "cup", "book"])
+
+        self.assertTrue(response.endswith(" 2 books and a cup"))
+
+    def test_respond_english_single_object(self):
+        generator = PhraseResponseGenerator("en", random.Random(0))
+
+        response = generator.respond(["book"])
+
+        self.assertTrue(response.endswith(" a book"))
+        self.assertNotIn(" and ", response)
+
+    def test_greet_persons(self):
+        generator = PhraseResponseGenerator("en", random.Random(0))
+
+        self.assertTrue(generator.respond(["person"]).endswith("a person. Nice to see you human!"))
+        self.assertTrue(generator.respond(["person", "person"]).endswith("2 persons. Nice to see you folks!"))
+
+    def test_respond_dutch(self):
+        generator = PhraseResponseGenerator("nl", random.Random(0))
+
+        response = generator.respond(["teddy bear", "teddy bear", "cell phone"])
+
+        self.assertIn(" 2 knuffelberen en een telefoon. ", response)
+
+    def test_respond_empty(self):
+        self.assertIsNone(PhraseResponseGenerator("en").respond([]))
+
+    def test_unsupported_language(self):
+        with self.assertRaises(ValueError):
+            PhraseResponseGenerator("xx")
+
+
+class TestObjectResponseService(unittest.TestCase):
+    def setUp(self):
+        self.event_bus = SynchronousEventBus()
+        self.output = []
+        self.event_bus.subscribe("response", self.output.append)
+        self.service = ObjectResponseService("mentions", "response", PhraseResponseGenerator("en", random.Random(0)),
+                                             self.event_bus, ThreadedResourceManager())
+        self.service.start()
+
+    def tearDown(self):
+        self.service.stop()
+
+    def test_respond_to_batched_mentions(self):
+        self.event_bus.publish("mentions", Event.for_payload(BatchEvent.create([
+            [_object_mention("book")], [_object_mention("cup", "scenario_2")]])))
+
+        deadline = time.monotonic() + 2
+        while len(self.output) < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        self.assertEqual(2, len(self.output))
+        self.assertTrue(self.output[0].payload.signal.text.endswith(" a book"))
+        self.assertEqual("scenario_2", self.output[1].payload.signal.time.container_id)
@@ -0,0 +1,84 @@
+import unittest
+from configparser import ConfigParser
+from types import SimpleNamespace
+
+from cltl.combot.infra.config.local import LocalConfigurationManager
+from cltl.mention_extraction.salience import SalienceCache, salience_key
+from cltl.nlp.api import Entity, EntityType, NamedEntity
+
+
+class TestSalienceCache(unittest.TestCase):
+    def test_salience_key(self):
+        self.assertEqual(("the cup", "object"),
+                         salience_key(Entity("The  Cup", EntityType.OBJECT, (0, 7))))
+        self.assertEqual(("piek", "person"), salience_key(NamedEntity("Piek", "PERSON", (0, 4))))
+        self.assertEqual(("cup", "object"), salience_key(SimpleNamespace(text="cup", type="object", segment=[0, 3])))
+
+    def test_suppress_repeated_mentions(self):
+        cache = SalienceCache()
+
+        self.assertTrue(cache.is_salient("scenario_1", ("cup", "object"), now=0))
+        self.assertFalse(cache.is_salient("scenario_1", ("cup", "object"), now=0))
+        self.assertTrue(cache.is_salient("scenario_2", ("cup", "object"), now=0))
+        self.assertEqual(1, cache.suppressed)
+
+    def test_salient_after_turns(self):
+        cache = SalienceCache(min_turns=2)
+        cache.next_turn("scenario")
+        self.assertTrue(cache.is_salient("scenario", ("cup", "object"), now=0))
+        cache.next_turn("scenario")
+        self.assertFalse(cache.is_salient("scenario", ("cup", "object"), now=0))
+        cache.next_turn("scenario")
+        self.assertTrue(cache.is_salient("scenario", ("cup", "object"), now=0))
+
+    def test_salient_after_seconds(self):
+        cache = SalienceCache(min_seconds=1)
+
+        self.assertTrue(cache.is_salient("scenario", ("cup", "object"), now=0))
+        self.assertFalse(cache.is_salient("scenario", ("cup", "object"), now=999))
+        self.assertTrue(cache.is_salient("scenario", ("cup", "object"), now=1000))
+
+    def test_salient_with_higher_confidence(self):
+        cache = SalienceCache()
+
+        self.assertTrue(cache.is_salient("scenario", ("cup", "object"), 0.5, now=0))
+        self.assertFalse(cache.is_salient("scenario", ("cup", "object"), 0.5, now=0))
+        self.assertTrue(cache.is_salient("scenario", ("cup", "object"), 0.8, now=0))
+
+    def test_bounded(self):
+        cache = SalienceCache(max_entities=2)
+        for text in ("cup", "book", "cup", "vase"):
+            cache.is_salient("scenario", (text, "object"), now=0)
+
+        self.assertEqual(2, cache.size())
+        self.assertTrue(cache.is_salient("scenario", ("book", "object"), now=0))
+        self.assertFalse(cache.is_salient("scenario", ("vase", "object"), now=0))
+
+    def test_state(self):
+        cache = SalienceCache(min_turns=2)
+        cache.next_turn("scenario")
+        cache.is_salient("scenario", ("cup", "object"), now=0)
+
+        restored = SalienceCache(min_turns=2)
+        restored.set_state("scenario", cache.get_state("scenario"))
+
+        self.assertFalse(restored.is_salient("scenario", ("cup", "object"), now=0))
+        restored.next_turn("scenario")
+        restored.next_turn("scenario")
+        self.assertTrue(restored.is_salient("scenario", ("cup", "object"), now=0))
+
+    def test_from_config(self):
+        parser = ConfigParser()
+        parser.read_dict({"cltl.mention_extraction.salience": {"enabled": "True", "min_turns": "2"},
+                          "cltl.mention_extraction.disabled": {"enabled": "False"}})
+        config = LocalConfigurationManager(parser)
+
+        cache = SalienceCache.from_config(config, "cltl.mention_extraction.salience")
+        cache.is_salient("scenario", ("cup", "object"), now=0)
+        cache.next_turn("scenario")
+        cache.next_turn("scenario")
+
+        self.assertTrue(cache.is_salient("scenario", ("cup", "object"), now=0))
+        self.assertIsNot(cache, SalienceCache.from_config(config, "cltl.mention_extraction.salience"))
+        self.assertIsNone(SalienceCache.from_config(config, "cltl.mention_extraction.disabled"))
+        self.assertIsNone(SalienceCache.from_config(config, "cltl.mention_extraction.other"))
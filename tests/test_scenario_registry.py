@@ -0,0 +1,57 @@
+import unittest
+
+from cltl_service.mention_extraction.scenario import ScenarioRegistry
+
+
+class TestScenarioRegistry(unittest.TestCase):
+    def setUp(self) -> None:
+        self.removed = []
+
+    def test_start_and_get(self):
+        registry = ScenarioRegistry(on_remove=self.removed.append)
+
+        state = registry.start("scenario_1", {"chat"})
+
+        self.assertIn("scenario_1", registry)
+        self.assertEqual(state, registry.get("scenario_1"))
+        self.assertEqual({"chat"}, state.active_intentions)
+        self.assertIsNone(registry.get("unknown"))
+
+    def test_current_is_most_recently_active(self):
+        registry = ScenarioRegistry()
+        registry.start("scenario_1")
+        registry.start("scenario_2")
+        self.assertEqual("scenario_2", registry.current.scenario_id)
+
+        registry.get("scenario_1")
+        self.assertEqual("scenario_1", registry.current.scenario_id)
+
+    def test_max_scenarios_evicts_least_recently_active(self):
+        registry = ScenarioRegistry(max_scenarios=2, on_remove=self.removed.append)
+        registry.start("scenario_1")
+        registry.start("scenario_2")
+        registry.get("scenario_1")
+        registry.start("scenario_3")
+
+        self.assertEqual(2, len(registry))
+        self.assertEqual(["scenario_2"], self.removed)
+        self.assertEqual(("scenario_1", "scenario_3"), registry.scenario_ids)
+
+    def test_evict_idle(self):
+        registry = ScenarioRegistry(idle_timeout=1, on_remove=self.removed.append)
+        registry.start("scenario_1").last_active = 0
+        registry.start("scenario_2").last_active = 1500
+
+        registry.evict_idle(now=2000)
+
+        self.assertEqual(["scenario_1"], self.removed)
+        self.assertEqual(("scenario_2",), registry.scenario_ids)
+
+    def test_remove(self):
+        registry = ScenarioRegistry(on_remove=self.removed.append)
+        registry.start("scenario_1")
+        registry.remove("scenario_1")
+        registry.remove("scenario_1")
+
+        self.assertEqual(0, len(registry))
+        self.assertEqual(["scenario_1"], self.removed)
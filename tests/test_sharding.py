@@ -0,0 +1,137 @@
+import json
+import threading
+import unittest
+from configparser import ConfigParser
+from types import SimpleNamespace
+
+from kombu.serialization import register
+
+from cltl.combot.infra.config.local import LocalConfigurationManager
+from cltl.combot.infra.event import Event
+from cltl.combot.infra.event.memory import SynchronousEventBus
+
+from cltl_service.mention_extraction.sharding import HashRing, ScenarioShard, ShardedEventBus, ShardRouter
+
+
+SCENARIOS = [f"scenario_{idx}" for idx in range(100)]
+
+
+def _payload(scenario_id=None):
+    return SimpleNamespace(type="TestEvent", scenario_id=scenario_id)
+
+
+class TestHashRing(unittest.TestCase):
+    def test_owner_is_stable(self):
+        ring = HashRing(["a", "b", "c"])
+        other_ring = HashRing(["c", "b", "a"])
+
+        self.assertEqual([ring.owner(key) for key in SCENARIOS], [other_ring.owner(key) for key in SCENARIOS])
+
+    def test_all_members_own_keys(self):
+        ring = HashRing(["a", "b", "c"])
+
+        self.assertEqual({"a", "b", "c"}, {ring.owner(key) for key in SCENARIOS})
+
+    def test_adding_member_moves_keys_only_to_new_member(self):
+        ring = HashRing(["a", "b"])
+        extended_ring = HashRing(["a", "b", "c"])
+
+        moved = [key for key in SCENARIOS if ring.owner(key) != extended_ring.owner(key)]
+
+        self.assertTrue(moved)
+        self.assertTrue(all(extended_ring.owner(key) == "c" for key in moved))
+
+    def test_empty_ring(self):
+        with self.assertRaises(ValueError):
+            HashRing([])
+
+
+class TestShardedEventBus(unittest.TestCase):
+    def setUp(self) -> None:
+        self.event_bus = SynchronousEventBus()
+        self.replicas = ["a", "b", "c"]
+        self.buses = {replica: ShardedEventBus(self.event_bus, ScenarioShard(replica, self.replicas), ["input"])
+                      for replica in self.replicas}
+        self.received = {replica: [] for replica in self.replicas}
+        for replica, bus in self.buses.items():
+            bus.subscribe("input", self.received[replica].append)
+
+    def test_events_are_routed_to_owner(self):
+        for scenario_id in SCENARIOS:
+            self.buses["a"].publish("input", Event.for_payload(_payload(scenario_id)))
+
+        shard = ScenarioShard("a", self.replicas)
+        for replica, events in self.received.items():
+            self.assertTrue(events)
+            self.assertTrue(all(shard.owner(event.payload.scenario_id) == replica for event in events))
+            self.assertTrue(all(event.metadata.topic == "input" for event in events))
+        self.assertEqual(len(SCENARIOS), sum(len(events) for events in self.received.values()))
+
+    def test_events_without_scenario_are_broadcast(self):
+        self.buses["a"].publish("input", Event.for_payload(_payload()))
+
+        self.assertTrue(all(len(events) == 1 for events in self.received.values()))
+
+    def test_other_topics_are_not_sharded(self):
+        received = []
+        self.buses["a"].subscribe("output", received.append)
+        self.buses["b"].publish("output", Event.for_payload(_payload("scenario_1")))
+
+        self.assertEqual(1, len(received))
+
+    def test_router(self):
+        router = ShardRouter(self.event_bus, self.buses["a"], ["input"])
+        router.start()
+        self.event_bus.publish("input", Event.for_payload(_payload("scenario_1")))
+        router.stop()
+
+        owner = self.buses["a"].shard.owner("scenario_1")
+        self.assertEqual(1, len(self.received[owner]))
+
+
+class TestShardedKombuEventBus(unittest.TestCase):
+    def setUp(self) -> None:
+        from cltl.combot.infra.event.kombu import KombuEventBus
+
+        register('cltl-json',
+                 lambda x: json.dumps(x, default=vars),
+                 lambda x: json.loads(x, object_hook=lambda d: SimpleNamespace(**d)),
+                 content_type='application/json',
+                 content_encoding='utf-8')
+
+        parser = ConfigParser()
+        parser.read_dict({"cltl.event.kombu": {"server": "memory://", "exchange": "cltl.test",
+                                               "type": "direct", "compression": "bzip2"}})
+        self.event_bus = KombuEventBus("cltl-json", LocalConfigurationManager(parser))
+
+    def test_events_are_routed_to_owner(self):
+        replicas = ["a", "b"]
+        buses = {replica: ShardedEventBus(self.event_bus, ScenarioShard(replica, replicas), ["input"])
+                 for replica in replicas}
+
+        received = {replica: [] for replica in replicas}
+        done = threading.Semaphore(0)
+
+        def handler(replica):
+            def handle(event):
+                received[replica].append(event)
+                done.release()
+            return handle
+
+        for replica, bus in buses.items():
+            bus.subscribe("input", handler(replica))
+
+        scenarios = SCENARIOS[:10]
+        for scenario_id in scenarios:
+            buses["a"].publish("input", Event.for_payload(_payload(scenario_id)))
+
+        for _ in scenarios:
+            self.assertTrue(done.acquire(timeout=5))
+
+        for replica, bus in buses.items():
+            bus.unsubscribe("input")
+
+        shard = ScenarioShard("a", replicas)
+        self.assertEqual(len(scenarios), sum(len(events) for events in received.values()))
+        for replica, events in received.items():
+            self.assertTrue(all(shard.owner(event.payload.scenario_id) == replica for event in events))
@@ -0,0 +1,102 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+
+from cltl.mention_extraction.default_extractor import NewFaceMentionDetector, ObjectMentionDetector
+from cltl_service.mention_extraction.snapshot import ScenarioSnapshot, ServiceSnapshot, SnapshotStore, \
+    SNAPSHOT_VERSION
+
+
+def _snapshot(faces=("piek",), timestamp=None):
+    face_detector = NewFaceMentionDetector()
+    face_detector.set_state("scenario_1", list(faces))
+    object_detector = ObjectMentionDetector()
+    object_detector.set_state("scenario_1", ["cup"])
+
+    snapshot = ServiceSnapshot.create({"chat"}, [
+        ScenarioSnapshot("scenario_1", ["chat"], 3, {"face": face_detector.get_state("scenario_1"),
+                                                     "object": object_detector.get_state("scenario_1")})
+    ])
+    if timestamp is not None:
+        snapshot.timestamp = timestamp
+
+    return snapshot
+
+
+class TestSnapshotStore(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.path = os.path.join(self.directory.name, "snapshots", "service.json")
+
+    def test_write_and_load(self):
+        store = SnapshotStore(self.path)
+        snapshot = _snapshot()
+
+        self.assertTrue(store.write(snapshot))
+        loaded = SnapshotStore(self.path).load()
+
+        self.assertEqual(snapshot, loaded)
+        face_detector = NewFaceMentionDetector()
+        face_detector.set_state("scenario_1", loaded.scenarios[0].extractor_state["face"])
+        self.assertEqual(["piek"], face_detector.get_state("scenario_1"))
+
+    def test_write_compressed(self):
+        path = self.path + ".gz"
+        snapshot = _snapshot()
+
+        SnapshotStore(path).write(snapshot)
+
+        self.assertEqual(snapshot, SnapshotStore(path).load())
+
+    def test_unchanged_snapshot_is_not_written(self):
+        store = SnapshotStore(self.path)
+
+        self.assertTrue(store.write(_snapshot(timestamp=1)))
+        self.assertFalse(store.write(_snapshot(timestamp=2)))
+        self.assertTrue(store.write(_snapshot(faces=("piek", "selene"), timestamp=3)))
+
+        self.assertEqual(3, store.load().timestamp)
+
+    def test_missing_snapshot(self):
+        self.assertIsNone(SnapshotStore(self.path).load())
+
+    def test_unsupported_version_is_ignored(self):
+        os.makedirs(os.path.dirname(self.path))
+        with open(self.path, "w") as snapshot_file:
+            json.dump({"version": SNAPSHOT_VERSION + 1, "timestamp": 0, "default_intentions": [], "scenarios": []},
+                      snapshot_file)
+
+        self.assertIsNone(SnapshotStore(self.path).load())
+
+    def test_invalid_snapshot_is_ignored(self):
+        os.makedirs(os.path.dirname(self.path))
+        with open(self.path, "w") as snapshot_file:
+            snapshot_file.write('{"version": 1, "timest')
+
+        self.assertIsNone(SnapshotStore(self.path).load())
+
+    def test_outdated_snapshot_is_ignored(self):
+        store = SnapshotStore(self.path, max_age=10)
+        store.write(_snapshot(timestamp=1000))
+
+        self.assertIsNotNone(store.load(now=5000))
+        self.assertIsNone(store.load(now=20000))
+
+    def test_snapshots_are_written_periodically_and_on_stop(self):
+        store = SnapshotStore(self.path, interval=0.01)
+        captured = threading.Event()
+        faces = ["piek"]
+
+        def capture():
+            captured.set()
+            return _snapshot(faces)
+
+        store.start(capture)
+        self.assertTrue(captured.wait(1))
+        faces.append("selene")
+        store.stop()
+
+        self.assertEqual(["piek", "selene"], store.load().scenarios[0].extractor_state["face"])
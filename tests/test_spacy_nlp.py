@@ -73,3 +73,43 @@ class TestSpacyNLP(unittest.TestCase):
         self.assertEqual(EntityType.SPEAKER, doc.entities[0].type)
         self.assertEqual(EntityType.HEARER, doc.entities[1].type)
 
+
+    def test_analyze_multi_word_object_entities(self):
+        doc = self.nlp.analyze("I see a teddy bear.")
+
+        self.assertEqual(2, len(doc.entities))
+        self.assertEqual(EntityType.SPEAKER, doc.entities[0].type)
+        self.assertEqual(EntityType.OBJECT, doc.entities[1].type)
+        self.assertEqual("teddy bear", doc.entities[1].text)
+        self.assertEqual((8, 18), doc.entities[1].segment)
+
+    def test_analyze_object_entities_with_synonyms(self):
+        nlp = SpacyNLP(object_synonyms={"book": ["tome"]})
+        doc = nlp.analyze("I read the tome.")
+
+        self.assertEqual(2, len(doc.entities))
+        self.assertEqual(EntityType.OBJECT, doc.entities[1].type)
+        self.assertEqual("tome", doc.entities[1].text)
+
+    def test_analyze_english_without_dutch_synonyms(self):
+        for text in ["I drink beer.", "My boot is wet.", "The bank is closed."]:
+            doc = self.nlp.analyze(text)
+
+            self.assertEqual([], [entity.text for entity in doc.entities if entity.type == EntityType.OBJECT], text)
+
+    def test_tokenize(self):
+        doc = self.nlp.tokenize("Okay, 2 more.")
+
+        self.assertEqual(["Okay", ",", "2", "more", "."], [token.text for token in doc.tokens])
+        self.assertEqual([POS.X, POS.PUNCT, POS.NUM, POS.X, POS.PUNCT], [token.pos for token in doc.tokens])
+        self.assertEqual((6, 7), doc.tokens[2].segment)
+        self.assertEqual([], doc.entities)
+
+    def test_analyze_entities_without_parser(self):
+        nlp = SpacyNLP(parser=False)
+        doc = nlp.analyze("I put the book on the table, do you see the book shelf?")
+
+        self.assertEqual([EntityType.SPEAKER, EntityType.OBJECT, EntityType.HEARER],
+                         [entity.type for entity in doc.entities])
+        self.assertEqual(["I", "book", "you"], [entity.text for entity in doc.entities])
+        self.assertTrue(nlp.model_id.endswith("-noparser"))
@@ -0,0 +1,73 @@
+import unittest
+from types import SimpleNamespace
+
+from cltl.combot.infra.event import Event
+
+from cltl_service.scheduling.staleness import StalenessPolicy, EventBuffer
+
+
+def event(event_id, topic, signal_start=None):
+    payload = SimpleNamespace(signal=SimpleNamespace(time=SimpleNamespace(start=signal_start)))
+    return Event.with_topic(Event(event_id, payload), topic)
+
+
+class TestStalenessPolicy(unittest.TestCase):
+    def setUp(self):
+        self.policy = StalenessPolicy({"image": 1.0, "text": 10.0})
+
+    def test_is_stale(self):
+        self.assertFalse(self.policy.is_stale(event("1", "image"), received=1000, now=2000))
+        self.assertTrue(self.policy.is_stale(event("1", "image"), received=1000, now=2001))
+        self.assertFalse(self.policy.is_stale(event("1", "text"), received=1000, now=2001))
+
+    def test_without_budget_is_not_stale(self):
+        self.assertFalse(self.policy.is_stale(event("1", "scenario"), received=0, now=100000))
+        self.assertFalse(self.policy.is_stale(event("1", "image"), received=None, now=100000))
+
+    def test_signal_time(self):
+        policy = StalenessPolicy({"image": 1.0}, signal_time=True)
+
+        self.assertTrue(policy.is_stale(event("1", "image", signal_start=500), received=1900, now=2000))
+        self.assertFalse(policy.is_stale(event("1", "image"), received=1900, now=2000))
+
+    def test_drop_counts(self):
+        self.assertTrue(self.policy.drop(event("1", "image"), received=0, now=5000))
+        self.assertTrue(self.policy.drop(event("2", "image"), received=0, now=5000))
+        self.assertFalse(self.policy.drop(event("3", "text"), received=0, now=5000))
+
+        self.assertEqual({"image": 2}, self.policy.dropped)
+
+
+class TestEventBuffer(unittest.TestCase):
+    def test_fifo(self):
+        buffer = EventBuffer(10)
+        for idx in range(3):
+            buffer.put(event(str(idx), "text"))
+
+        self.assertEqual(["0", "1", "2"], [buffer.get().id for _ in range(3)])
+
+    def test_newest_first(self):
+        buffer = EventBuffer(10, newest_first=["image"])
+        for event_id, topic in [("1", "image"), ("2", "scenario"), ("3", "image"), ("4", "image")]:
+            buffer.put(event(event_id, topic))
+
+        self.assertEqual(["4", "3", "1", "2"], [buffer.get().id for _ in range(4)])
+
+    def test_overwrite_oldest(self):
+        buffer = EventBuffer(2)
+        for idx in range(3):
+            buffer.put(event(str(idx), "text"))
+
+        self.assertEqual(2, buffer.qsize())
+        self.assertEqual(1, buffer.overwritten)
+        self.assertIsNone(buffer.received(event("0", "text")))
+        self.assertEqual(["1", "2"], [buffer.get().id for _ in range(2)])
+
+    def test_received(self):
+        buffer = EventBuffer(2)
+        buffer.put(event("1", "text"))
+
+        taken = buffer.get()
+
+        self.assertIsNotNone(buffer.received(taken))
+        self.assertIsNone(buffer.received(taken))
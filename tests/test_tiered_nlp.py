@@ -0,0 +1,61 @@
+import re
+import unittest
+
+from cltl.nlp.api import NLP, Doc, Token, POS
+from cltl.nlp.tiered import TieredNLP, TIER_TOKENS, TIER_FULL
+
+
+class RecordingNLP(NLP):
+    def __init__(self):
+        self.analyzed = []
+        self.tokenized = []
+
+    def analyze(self, text: str) -> Doc:
+        self.analyzed.append(text)
+        return Doc(self._tokens(text), [], [])
+
+    def tokenize(self, text: str) -> Doc:
+        self.tokenized.append(text)
+        return Doc(self._tokens(text), [], [])
+
+    def _tokens(self, text):
+        return [Token(match.group(), POS.X, match.span()) for match in re.finditer(r"\S+", text)]
+
+
+class TestTieredNLP(unittest.TestCase):
+    def setUp(self):
+        self.nlp = RecordingNLP()
+        self.tiered = TieredNLP(self.nlp, max_tokens=3)
+
+    def test_backchannels_are_tokenized(self):
+        for text in ("ok", "Yes.", "mm-hmm", "Oh, okay then", ""):
+            self.assertEqual(TIER_TOKENS, self.tiered.tier(text), text)
+
+    def test_short_commands_are_tokenized(self):
+        for text in ("Stop", "turn left", "Go on please"):
+            self.assertEqual(TIER_TOKENS, self.tiered.tier(text), text)
+
+    def test_entity_indicators_are_analyzed(self):
+        for text in ("I did", "Do you?", "a cup", "two bottles", "Meet Piek", "in 2022",
+                     "This is a longer sentence about the weather"):
+            self.assertEqual(TIER_FULL, self.tiered.tier(text), text)
+
+    def test_dutch(self):
+        tiered = TieredNLP(self.nlp, max_tokens=3, language="nl")
+
+        self.assertEqual(TIER_FULL, tiered.tier("De fles"))
+        self.assertEqual(TIER_TOKENS, tiered.tier("Dat is niet zo"))
+        self.assertEqual(TIER_FULL, self.tiered.tier("Dat is niet zo"))
+        self.assertEqual(TIER_TOKENS, self.tiered.tier("De fles"))
+
+    def test_analyze_uses_tier(self):
+        doc = self.tiered.analyze("okay")
+        self.tiered.analyze("I see a cup")
+
+        self.assertEqual(["okay"], [token.text for token in doc.tokens])
+        self.assertEqual(["okay"], self.nlp.tokenized)
+        self.assertEqual(["I see a cup"], self.nlp.analyzed)
+        self.assertEqual({TIER_TOKENS: 0.5, TIER_FULL: 0.5}, self.tiered.tier_shares())
+
+    def test_model_id(self):
+        self.assertEqual("RecordingNLP+tiered", self.tiered.model_id)
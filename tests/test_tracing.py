@@ -0,0 +1,64 @@
+import json
+import os
+import tempfile
+import unittest
+
+from cltl_service.monitoring.tracing import Tracer, activate, span, trace_serialization
+
+
+class TestTracer(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "traces", "trace.json")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def spans(self):
+        with open(self.path) as trace_file:
+            return json.loads(trace_file.read().rstrip(",\n") + "]")
+
+    def test_spans_of_active_trace(self):
+        tracer = Tracer("test", self.path)
+        with tracer.activate("signal"):
+            with tracer.span("analysis"):
+                pass
+            trace_serialization(tracer, {"text": "abc"})
+        with tracer.span("untraced"):
+            pass
+        tracer.close()
+
+        spans = self.spans()
+        self.assertEqual(["analysis", "serialization"], [span["name"] for span in spans])
+        self.assertTrue(all(span["args"]["trace_id"] == "signal" for span in spans))
+        self.assertTrue(all(span["ph"] == "X" and span["cat"] == "test" for span in spans))
+        self.assertEqual(len(json.dumps({"text": "abc"})), spans[1]["args"]["bytes"])
+
+    def test_append(self):
+        for name in ("first", "second"):
+            tracer = Tracer("test", self.path)
+            tracer.record(name, "signal", 1.0, 1.5)
+            tracer.close()
+
+        spans = self.spans()
+        self.assertEqual(["first", "second"], [span["name"] for span in spans])
+        self.assertEqual((1000000, 500000), (spans[0]["ts"], spans[0]["dur"]))
+
+    def test_sampling_is_deterministic(self):
+        tracer = Tracer("test", self.path, sample_rate=0.5)
+        other = Tracer("other", self.path, sample_rate=0.5)
+
+        sampled = [tracer.is_sampled(str(idx)) for idx in range(1000)]
+
+        self.assertEqual(sampled, [other.is_sampled(str(idx)) for idx in range(1000)])
+        self.assertTrue(400 < sum(sampled) < 600)
+        self.assertFalse(Tracer("test", self.path, sample_rate=0).is_sampled("signal"))
+        self.assertFalse(tracer.is_sampled(None))
+
+    def test_without_tracer(self):
+        with activate(None, "signal"):
+            with span(None, "analysis") as args:
+                args["size"] = 1
+        trace_serialization(None, {})
+
+        self.assertFalse(os.path.exists(self.path))